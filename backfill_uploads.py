@@ -0,0 +1,89 @@
+# ---------------------------
+# File: backfill_uploads.py
+# ---------------------------
+"""
+One-shot migration of legacy uploads into the content-addressed store.
+
+Before uploads were indexed, files were written as
+    uploads/{project_id}_{filename}              (project files)
+    uploads/chat_files/{project_id}_{filename}   (chat files)
+This copies each one into uploads/objects/ and creates its uploaded_files row.
+Files already recorded are skipped, so it is safe to run more than once.
+
+    python backfill_uploads.py [--remove-legacy]
+"""
+
+import mimetypes
+import os
+import sys
+from datetime import datetime
+
+from database import SessionLocal
+from models import Project, UploadedFile
+from services.file_store import UPLOAD_DIR, store_file
+
+# ---------------------------
+# Legacy locations and the upload kind stored there
+# ---------------------------
+LEGACY_DIRS = [
+    (UPLOAD_DIR, "project"),
+    (os.path.join(UPLOAD_DIR, "chat_files"), "chat"),
+]
+
+
+def legacy_files():
+    """Yield (path, project_id, filename, kind) for every legacy `{project_id}_{name}` file."""
+    for folder, kind in LEGACY_DIRS:
+        if not os.path.isdir(folder):
+            continue
+        for entry in sorted(os.listdir(folder)):
+            path = os.path.join(folder, entry)
+            prefix, sep, filename = entry.partition("_")
+            if os.path.isfile(path) and sep and prefix.isdigit() and filename:
+                yield path, int(prefix), filename, kind
+
+
+def main():
+    remove_legacy = "--remove-legacy" in sys.argv
+    db = SessionLocal()
+    migrated = skipped = orphaned = 0
+    try:
+        project_ids = {pid for (pid,) in db.query(Project.id).all()}
+        for path, project_id, filename, kind in legacy_files():
+            if project_id not in project_ids:
+                orphaned += 1
+                print(f"skip {path}: project {project_id} no longer exists")
+                continue
+
+            blob = store_file(path)
+            exists = db.query(UploadedFile.id).filter(
+                UploadedFile.project_id == project_id,
+                UploadedFile.kind == kind,
+                UploadedFile.filename == filename,
+                UploadedFile.sha256 == blob.sha256
+            ).first()
+            if exists:
+                skipped += 1
+            else:
+                db.add(UploadedFile(
+                    project_id=project_id,
+                    kind=kind,
+                    filename=filename,
+                    sha256=blob.sha256,
+                    size=blob.size,
+                    content_type=mimetypes.guess_type(filename)[0],
+                    created_at=datetime.utcfromtimestamp(os.path.getmtime(path)),  # Keep original upload time
+                ))
+                db.commit()
+                migrated += 1
+
+            if remove_legacy:
+                os.remove(path)
+    finally:
+        db.close()
+
+    print(f"Backfill complete: {migrated} migrated, {skipped} already indexed, {orphaned} orphaned")
+
+
+if __name__ == "__main__":
+    main()
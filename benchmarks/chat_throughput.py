@@ -0,0 +1,79 @@
+# ---------------------------
+# File: benchmarks/chat_throughput.py
+# ---------------------------
+"""
+Concurrent chat throughput through the pooled upstream client.
+
+Starts benchmarks.fake_llm in a subprocess, points services.llm_client at it
+and fires --requests completions with --concurrency in flight.
+
+    python -m benchmarks.chat_throughput --requests 500 --concurrency 50 --latency 0.2
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+
+def wait_for_port(host, port, timeout=10.0):
+    import socket
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"{host}:{port} did not come up")
+
+
+async def run(requests, concurrency):
+    from services import llm_client
+
+    await llm_client.start_client()
+    semaphore = asyncio.Semaphore(concurrency)
+    payload = {"model": "fake", "messages": [{"role": "user", "content": "hello"}], "max_tokens": 16}
+
+    async def one():
+        async with semaphore:
+            await llm_client.chat_completion(payload)
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(one() for _ in range(requests)))
+    finally:
+        await llm_client.close_client()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--port", type=int, default=9100)
+    args = parser.parse_args()
+
+    server = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.fake_llm",
+        "--port", str(args.port), "--latency", str(args.latency),
+    ])
+    try:
+        wait_for_port("127.0.0.1", args.port)
+        # Must be set before services.llm_client is imported
+        os.environ["CHAT_API_URL"] = f"http://127.0.0.1:{args.port}/openai/v1/chat/completions"
+        elapsed = asyncio.run(run(args.requests, args.concurrency))
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, upstream latency {args.latency}s")
+    print(f"elapsed {elapsed:.2f}s  ->  {args.requests / elapsed:.1f} req/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# ---------------------------
+# File: benchmarks/conditional_get.py
+# ---------------------------
+"""
+What a polling client pays for GET /prompts/ and GET /projects/: full
+response, compressed response, and a 304 revalidation with If-None-Match.
+
+Seeds a throwaway SQLite database with one user owning --projects projects
+and --prompts prompts, then sends --requests sequential requests of each
+kind in-process (httpx ASGITransport) and reports p50 latency and bytes on
+the wire per response.
+
+    python -m benchmarks.conditional_get --prompts 20000 --requests 300
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+
+def seed(projects: int, prompts: int):
+    from sqlalchemy import insert
+    from database import SessionLocal
+    from models import Project, Prompt, User
+    from routers.auth import create_access_token
+
+    db = SessionLocal()
+    try:
+        user = User(name="bench", email="bench@example.com", password_hash="x")
+        db.add(user)
+        db.flush()
+        project_list = [Project(name=f"project {i}", description="x" * 200, user_id=user.id) for i in range(projects)]
+        db.add_all(project_list)
+        db.flush()
+        db.execute(insert(Prompt), [
+            {"project_id": project_list[n % projects].id, "text": f"prompt {n}: " + "answer briefly and politely. " * 8}
+            for n in range(prompts)
+        ])
+        db.commit()
+        return create_access_token(user)
+    finally:
+        db.close()
+
+
+async def measure(client, path: str, requests: int, headers: dict) -> tuple[float, int, int]:
+    """(p50 seconds, bytes on the wire, status) of `requests` GETs of `path`."""
+    samples, size, status = [], 0, 0
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = await client.get(path, headers=headers)
+        samples.append(time.perf_counter() - started)
+        size = int(response.headers.get("content-length", len(response.content)))
+        status = response.status_code
+    return statistics.median(samples), size, status
+
+
+async def run(token: str, requests: int):
+    import httpx
+    from database import async_engine
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    auth = {"Authorization": f"Bearer {token}"}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=auth) as client:
+        for path in ("/prompts/?limit=200", "/projects/?limit=200"):
+            etag = (await client.get(path)).headers["etag"]
+            for label, headers in (
+                ("full", {"Accept-Encoding": "identity"}),
+                ("compressed", {"Accept-Encoding": "br, gzip"}),
+                ("If-None-Match", {"Accept-Encoding": "identity", "If-None-Match": etag}),
+            ):
+                p50, size, status = await measure(client, path, requests, headers)
+                print(f"{path:22} {label:14} {status}  p50 {p50 * 1000:7.2f} ms  {size:>8} bytes")
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--projects", type=int, default=200)
+    parser.add_argument("--prompts", type=int, default=20_000)
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="chatbot-etag-")
+    # Must be set before the app modules are imported
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.sqlite3')}"
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    os.environ.setdefault("SECRET_KEY", "bench")
+
+    from create_tables import upgrade_database
+    upgrade_database()
+    token = seed(args.projects, args.prompts)
+    asyncio.run(run(token, args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# ---------------------------
+# File: benchmarks/crud_throughput.py
+# ---------------------------
+"""
+Sync vs async request throughput on the project CRUD read endpoints.
+
+Seeds a SQLite database (or the one in DATABASE_URL), then drives
+GET /projects/ and GET /projects/{id} with --concurrency requests in flight:
+once against the async routers, once against equivalent sync handlers that
+use the blocking SessionLocal on the threadpool.
+
+    python -m benchmarks.crud_throughput --requests 2000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+
+def build_sync_app():
+    """Sync twins of the project read routes, as they were before the async port."""
+    from fastapi import Depends, FastAPI, HTTPException
+    from sqlalchemy.orm import Session
+    from database import get_db
+    from models import Project
+    from routers.auth import get_current_user
+    from routers.projects import ProjectOut
+
+    app = FastAPI()
+
+    @app.get("/projects/", response_model=list[ProjectOut])
+    def list_projects(current_user=Depends(get_current_user), db: Session = Depends(get_db)):
+        return db.query(Project).filter(Project.user_id == current_user.id) \
+            .order_by(Project.created_at, Project.id).limit(50).all()
+
+    @app.get("/projects/{project_id}", response_model=ProjectOut)
+    def get_project(project_id: int, current_user=Depends(get_current_user), db: Session = Depends(get_db)):
+        project = db.query(Project).filter(Project.id == project_id, Project.user_id == current_user.id).first()
+        if not project:
+            raise HTTPException(status_code=404, detail="Project not found")
+        return project
+
+    return app
+
+
+def seed(projects):
+    from database import Base, SessionLocal, engine
+    from models import Project, User
+    from routers.auth import create_access_token
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user = User(name="bench", email=f"bench-{time.time_ns()}@example.com", password_hash="x")
+        db.add(user)
+        db.commit()
+        db.add_all([Project(name=f"project {i}", description="x" * 200, user_id=user.id) for i in range(projects)])
+        db.commit()
+        first = db.query(Project.id).filter(Project.user_id == user.id).order_by(Project.id).first()[0]
+        return create_access_token(user), first
+    finally:
+        db.close()
+
+
+async def drive(app, token, project_ids, requests, concurrency):
+    import httpx
+
+    semaphore = asyncio.Semaphore(concurrency)
+    headers = {"Authorization": f"Bearer {token}"}
+    transport = httpx.ASGITransport(app=app)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+        for label, path_for in (("GET /projects/", lambda i: "/projects/"),
+                                ("GET /projects/{id}", lambda i: f"/projects/{project_ids[i % len(project_ids)]}")):
+            async def one(i):
+                async with semaphore:
+                    response = await client.get(path_for(i))
+                    response.raise_for_status()
+
+            started = time.perf_counter()
+            await asyncio.gather(*(one(i) for i in range(requests)))
+            results[label] = requests / (time.perf_counter() - started)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--projects", type=int, default=100)
+    args = parser.parse_args()
+
+    # Must be set before database.py is imported
+    if not os.getenv("DATABASE_URL"):
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.sqlite3"
+    os.environ.setdefault("SECRET_KEY", "bench")
+
+    from database import async_engine
+    from main import app as async_app
+
+    token, first_id = seed(args.projects)
+    project_ids = list(range(first_id, first_id + args.projects))
+
+    async def run_all():
+        # One event loop for both runs: the async engine's pool is bound to it
+        for name, app in (("sync", build_sync_app()), ("async", async_app)):
+            results = await drive(app, token, project_ids, args.requests, args.concurrency)
+            for label, rate in results.items():
+                print(f"{name:5s}  {label:20s} {rate:8.1f} req/s")
+        await async_engine.dispose()
+
+    print(f"{args.requests} requests per endpoint, concurrency {args.concurrency}")
+    asyncio.run(run_all())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# ---------------------------
+# File: benchmarks/fake_llm.py
+# ---------------------------
+"""
+Local stand-in for the Groq OpenAI-compatible chat endpoint.
+
+Answers POST /openai/v1/chat/completions after a configurable delay so the
+chat path can be benchmarked without network access or API quota. It can
+also misbehave on purpose to exercise the gateway's retries, circuit breaker
+and failover: fail a fraction of requests (or the first N) with a given
+status and Retry-After, or hang without answering.
+
+    python -m benchmarks.fake_llm --port 9100 --latency 0.5
+    python -m benchmarks.fake_llm --port 9101 --fail-rate 0.3 --fail-status 503 --retry-after 1
+
+Failure settings can be changed while it runs:
+
+    curl -X POST localhost:9101/_fake/config -d '{"fail_rate": 1.0}'
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Runtime behaviour (overridable per run with the CLI flags or POST /_fake/config)
+CONFIG = {
+    "latency": float(os.getenv("FAKE_LLM_LATENCY", "0.2")),              # Seconds before answering
+    "token_latency": float(os.getenv("FAKE_LLM_TOKEN_LATENCY", "0.02")),  # Seconds between streamed tokens
+    "fail_rate": float(os.getenv("FAKE_LLM_FAIL_RATE", "0")),            # Fraction of requests that fail
+    "fail_first": int(os.getenv("FAKE_LLM_FAIL_FIRST", "0")),            # Fail this many requests, then recover
+    "fail_status": int(os.getenv("FAKE_LLM_FAIL_STATUS", "503")),        # Status of failed requests
+    "retry_after": os.getenv("FAKE_LLM_RETRY_AFTER"),                    # Retry-After header on failures
+    "hang_rate": float(os.getenv("FAKE_LLM_HANG_RATE", "0")),            # Fraction that never answer
+}
+STATS = {"requests": 0, "failed": 0, "hung": 0}
+
+app = FastAPI(title="Fake LLM upstream")
+
+
+@app.post("/_fake/config")
+async def configure(request: Request):
+    CONFIG.update(await request.json())
+    return {"config": CONFIG, "stats": STATS}
+
+
+@app.get("/_fake/stats")
+async def stats():
+    return STATS
+
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    STATS["requests"] += 1
+    if random.random() < CONFIG["hang_rate"]:
+        STATS["hung"] += 1
+        while not await request.is_disconnected():  # Until the caller gives up
+            await asyncio.sleep(0.1)
+        return JSONResponse({}, status_code=499)
+    await asyncio.sleep(CONFIG["latency"])
+
+    if STATS["requests"] <= CONFIG["fail_first"] or random.random() < CONFIG["fail_rate"]:
+        STATS["failed"] += 1
+        headers = {"Retry-After": str(CONFIG["retry_after"])} if CONFIG["retry_after"] is not None else {}
+        return JSONResponse({"error": {"message": "fake upstream failure"}}, status_code=CONFIG["fail_status"],
+                            headers=headers)
+
+    last = body["messages"][-1]["content"]
+    reply = f"echo: {last}"
+    if body.get("stream"):
+        return StreamingResponse(_stream(reply, body.get("model", "fake")), media_type="text/event-stream")
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "fake"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": len(last.split()), "completion_tokens": len(reply.split()),
+                  "total_tokens": len(last.split()) + len(reply.split())},
+    }
+
+
+async def _stream(reply, model):
+    for i, word in enumerate(reply.split(" ")):
+        chunk = {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion.chunk",
+            "model": model,
+            "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None}],
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+        await asyncio.sleep(CONFIG["token_latency"])
+    yield "data: [DONE]\n\n"
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=CONFIG["latency"])
+    parser.add_argument("--token-latency", type=float, default=CONFIG["token_latency"])
+    parser.add_argument("--fail-rate", type=float, default=CONFIG["fail_rate"])
+    parser.add_argument("--fail-first", type=int, default=CONFIG["fail_first"])
+    parser.add_argument("--fail-status", type=int, default=CONFIG["fail_status"])
+    parser.add_argument("--retry-after", default=CONFIG["retry_after"])
+    parser.add_argument("--hang-rate", type=float, default=CONFIG["hang_rate"])
+    args = parser.parse_args()
+
+    CONFIG.update({key: value for key, value in vars(args).items() if key in CONFIG})
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
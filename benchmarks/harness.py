@@ -0,0 +1,278 @@
+# ---------------------------
+# File: benchmarks/harness.py
+# ---------------------------
+"""
+End-to-end load test of the API against a local fake LLM upstream.
+
+Starts benchmarks.fake_llm and the app (uvicorn subprocess) on SQLite or the
+database given with --database, then runs --users virtual users, at most
+--concurrency at a time, through:
+
+    register -> login -> create project -> create prompt
+             -> --chats chat turns -> list projects -> get project
+
+It prints p50/p95/p99 latency and requests per second for every endpoint
+(503/429 answers are retried after Retry-After and counted as retries) and
+writes them as JSON (--output). With --baseline it compares against a saved
+result and exits 1 if any endpoint's p95 or throughput regressed by more
+than --max-regression.
+
+    python -m benchmarks.harness --users 200 --concurrency 50 --chats 3 --output bench.json
+    python -m benchmarks.harness --baseline bench.json --max-regression 0.15
+    python -m benchmarks.harness --database postgresql://user:pw@localhost/chatbot_bench
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+
+from benchmarks.chat_throughput import wait_for_port
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ---------------------------
+# Recording
+# ---------------------------
+class Recorder:
+    """Latencies (seconds), error and retry counts per endpoint label."""
+
+    def __init__(self, max_retries: int = 5):
+        self.max_retries = max_retries
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+        self.retries: dict[str, int] = {}
+
+    async def call(self, label: str, send):
+        """
+        Time `send()` (returns an httpx request coroutine) under `label`.
+        503/429 answers are retried after their Retry-After, as a real client
+        would; the wait counts towards the latency. Returns the response or None.
+        """
+        started = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await send()
+            except Exception:
+                response = None
+            if response is None or response.status_code not in (429, 503) or attempt == self.max_retries:
+                break
+            self.retries[label] = self.retries.get(label, 0) + 1
+            await asyncio.sleep(float(response.headers.get("retry-after", "1")))
+        self.latencies.setdefault(label, []).append(time.perf_counter() - started)
+        if response is None or response.status_code >= 400:
+            self.errors[label] = self.errors.get(label, 0) + 1
+            return None
+        return response
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    rank = max(1, int(round(q / 100 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(samples: list[float], errors: int, retries: int, elapsed: float) -> dict:
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "errors": errors,
+        "retries": retries,
+        "rps": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+    }
+
+
+# ---------------------------
+# Virtual user
+# ---------------------------
+async def user_flow(client, recorder: Recorder, run_id: str, n: int, chats: int):
+    email = f"bench-{run_id}-{n}@example.com"
+    password = "bench-password"
+
+    if not await recorder.call("POST /auth/register", lambda: client.post(
+        "/auth/register", json={"name": f"bench {n}", "email": email, "password": password}
+    )):
+        return
+    login = await recorder.call("POST /auth/login", lambda: client.post(
+        "/auth/login", json={"email": email, "password": password}
+    ))
+    if not login:
+        return
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+    project = await recorder.call("POST /projects/", lambda: client.post(
+        "/projects/", json={"name": f"bench project {n}", "description": "load test"}, headers=headers
+    ))
+    if not project:
+        return
+    project_id = project.json()["id"]
+
+    await recorder.call("POST /prompts/", lambda: client.post(
+        "/prompts/", json={"text": "You are a concise assistant.", "project_id": project_id}, headers=headers
+    ))
+
+    conversation_id = None
+    for turn in range(chats):
+        body = {"project_id": project_id, "message": f"question {turn} from user {n}",
+                "conversation_id": conversation_id}
+        reply = await recorder.call("POST /chat/", lambda: client.post("/chat/", json=body, headers=headers))
+        if reply:
+            conversation_id = reply.json()["conversation_id"]
+
+    await recorder.call("GET /projects/", lambda: client.get("/projects/", headers=headers))
+    await recorder.call("GET /projects/{project_id}", lambda: client.get(f"/projects/{project_id}", headers=headers))
+
+
+async def drive(base_url: str, users: int, concurrency: int, chats: int, timeout: float):
+    import httpx
+
+    recorder = Recorder()
+    run_id = uuid.uuid4().hex[:8]  # Unique emails, so reruns against one database do not collide
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        async def one(n):
+            async with semaphore:
+                await user_flow(client, recorder, run_id, n, chats)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(n) for n in range(users)))
+        elapsed = time.perf_counter() - started
+    return recorder, elapsed
+
+
+# ---------------------------
+# Baseline comparison
+# ---------------------------
+def compare(result: dict, baseline: dict, max_regression: float) -> bool:
+    """Print per-endpoint deltas; return False if any endpoint regressed beyond the limit."""
+    ok = True
+    print(f"\n{'endpoint':32} {'p95 base':>9} {'p95 now':>9} {'delta':>8} {'rps base':>9} {'rps now':>9} {'delta':>8}")
+    for label, now in result["endpoints"].items():
+        base = baseline.get("endpoints", {}).get(label)
+        if not base:
+            print(f"{label:32} (not in baseline)")
+            continue
+        p95_delta = now["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0.0
+        rps_delta = now["rps"] / base["rps"] - 1 if base["rps"] else 0.0
+        regressed = p95_delta > max_regression or rps_delta < -max_regression
+        ok = ok and not regressed
+        print(f"{label:32} {base['p95_ms']:9.1f} {now['p95_ms']:9.1f} {p95_delta:+8.1%} "
+              f"{base['rps']:9.1f} {now['rps']:9.1f} {rps_delta:+8.1%}{'  REGRESSED' if regressed else ''}")
+    return ok
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ---------------------------
+# Entry point
+# ---------------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100, help="virtual users, each runs the whole flow once")
+    parser.add_argument("--concurrency", type=int, default=20, help="virtual users in flight")
+    parser.add_argument("--chats", type=int, default=3, help="chat turns per user")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake upstream latency in seconds")
+    parser.add_argument("--database", help="DATABASE_URL for the app (default: fresh SQLite file)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument("--app-port", type=int, default=8765)
+    parser.add_argument("--llm-port", type=int, default=9100)
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request client timeout")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against a previous --output file")
+    parser.add_argument("--max-regression", type=float, default=0.15,
+                        help="allowed fractional p95 increase / rps decrease vs the baseline")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="chatbot-bench-")
+    database = args.database or f"sqlite:///{os.path.join(workdir, 'bench.sqlite3')}"
+    env = {
+        **os.environ,
+        "DATABASE_URL": database,
+        "SECRET_KEY": os.getenv("SECRET_KEY", "bench-secret"),
+        "CHAT_API_URL": f"http://127.0.0.1:{args.llm_port}/openai/v1/chat/completions",
+        "CHAT_PROJECT_API_KEY": "bench",
+        "UPLOAD_DIR": os.path.join(workdir, "uploads"),
+        "BCRYPT_ROUNDS": str(args.bcrypt_rounds),
+    }
+    env.pop("ASYNC_DATABASE_URL", None)
+
+    subprocess.run([sys.executable, "create_tables.py"], cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+    processes = [
+        subprocess.Popen([sys.executable, "-m", "benchmarks.fake_llm",
+                          "--port", str(args.llm_port), "--latency", str(args.latency)], cwd=ROOT, env=env),
+        subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.app_port),
+                          "--workers", str(args.workers), "--log-level", "warning"], cwd=ROOT, env=env),
+    ]
+    try:
+        wait_for_port("127.0.0.1", args.llm_port)
+        wait_for_port("127.0.0.1", args.app_port, timeout=60.0)
+        recorder, elapsed = asyncio.run(drive(
+            f"http://127.0.0.1:{args.app_port}", args.users, args.concurrency, args.chats, args.timeout
+        ))
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+    all_samples = [s for samples in recorder.latencies.values() for s in samples]
+    result = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "database": database.split(":", 1)[0],
+            "users": args.users,
+            "concurrency": args.concurrency,
+            "chats_per_user": args.chats,
+            "upstream_latency_s": args.latency,
+            "workers": args.workers,
+            "bcrypt_rounds": args.bcrypt_rounds,
+            "elapsed_s": round(elapsed, 3),
+        },
+        "total": summarize(all_samples, sum(recorder.errors.values()), sum(recorder.retries.values()), elapsed),
+        "endpoints": {
+            label: summarize(samples, recorder.errors.get(label, 0), recorder.retries.get(label, 0), elapsed)
+            for label, samples in recorder.latencies.items()
+        },
+    }
+
+    print(f"{'endpoint':32} {'count':>6} {'errors':>6} {'retries':>7} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for label, row in [*result["endpoints"].items(), ("total", result["total"])]:
+        print(f"{label:32} {row['count']:6} {row['errors']:6} {row['retries']:7} {row['rps']:8.1f} "
+              f"{row['p50_ms']:8.1f} {row['p95_ms']:8.1f} {row['p99_ms']:8.1f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nresults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if not compare(result, baseline, args.max_regression):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
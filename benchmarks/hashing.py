@@ -0,0 +1,54 @@
+# ---------------------------
+# File: benchmarks/hashing.py
+# ---------------------------
+"""
+Login throughput of the bcrypt process pool.
+
+Runs --logins password verifications at the configured BCRYPT_ROUNDS for each
+pool size from 1 to --max-workers and reports logins/s and logins/s per core.
+
+    python -m benchmarks.hashing --logins 200 --rounds 12
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+
+async def run(logins, workers, rounds):
+    from services import hashing
+
+    hashing.HASH_WORKERS = workers
+    hashing.HASH_MAX_PENDING = logins
+    hashing.BCRYPT_ROUNDS = rounds
+    hashing.start_pool()
+    try:
+        stored = await hashing.hash_password("correct horse battery staple")
+        # Warm every worker process before timing
+        await asyncio.gather(*(hashing.verify_password("x", stored) for _ in range(workers)))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(hashing.verify_password("correct horse battery staple", stored)
+                               for _ in range(logins)))
+        return time.perf_counter() - started
+    finally:
+        hashing.stop_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    print(f"bcrypt rounds={args.rounds}, {args.logins} logins per run")
+    for workers in range(1, args.max_workers + 1):
+        elapsed = asyncio.run(run(args.logins, workers, args.rounds))
+        rate = args.logins / elapsed
+        print(f"workers={workers:2d}  {rate:8.1f} logins/s  {rate / workers:8.1f} logins/s/core")
+
+
+if __name__ == "__main__":
+    main()
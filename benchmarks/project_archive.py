@@ -0,0 +1,101 @@
+# ---------------------------
+# File: benchmarks/project_archive.py
+# ---------------------------
+"""
+Export and import throughput of services.project_archive, and peak memory.
+
+Seeds a throwaway SQLite database with one project of --prompts prompts
+and --files uploaded files, exports it to a temporary tar file, imports
+that file back as a new project, and reports time, rows/second and the
+process's peak RSS after each phase (it should not grow with --prompts).
+
+    python -m benchmarks.project_archive --prompts 300000 --files 5 --file-size 5000000
+"""
+
+import argparse
+import asyncio
+import os
+import resource
+import tempfile
+import time
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux reports KiB
+
+
+async def run(prompts: int, files: int, file_size: int, archive_path: str):
+    from sqlalchemy import func, insert, select
+    from database import AsyncSessionLocal, async_engine
+    from models import Project, Prompt, User
+    from services import file_store, project_archive
+
+    async with AsyncSessionLocal() as db:
+        user = User(name="bench", email="bench@example.com", password_hash="x")
+        db.add(user)
+        await db.flush()
+        project = Project(name="bench", user_id=user.id, system_prompt="You are a benchmark.")
+        db.add(project)
+        await db.flush()
+        batch = 10_000
+        for start in range(0, prompts, batch):
+            await db.execute(insert(Prompt), [
+                {"project_id": project.id, "text": f"prompt {n}: " + "lorem ipsum " * 10}
+                for n in range(start, min(prompts, start + batch))
+            ])
+        await db.commit()
+        for n in range(files):
+            content = os.urandom(file_size)
+
+            async def chunks():
+                for i in range(0, len(content), file_store.UPLOAD_CHUNK_SIZE):
+                    yield content[i:i + file_store.UPLOAD_CHUNK_SIZE]
+            await file_store.store_project_file(db, project.id, "project", f"file{n}.bin", None, chunks())
+        user_id, project_id = user.id, project.id
+    print(f"seeded {prompts} prompts and {files} files; peak RSS {peak_rss_mb():.0f} MB")
+
+    started = time.perf_counter()
+    size = 0
+    with open(archive_path, "wb") as f:
+        async for chunk in project_archive.export_tar(project_id):
+            size += len(chunk)
+            f.write(chunk)
+    elapsed = time.perf_counter() - started
+    print(f"export: {size / 1e6:.1f} MB in {elapsed:.2f}s ({prompts / elapsed:,.0f} prompts/s); "
+          f"peak RSS {peak_rss_mb():.0f} MB")
+
+    async def read_file():
+        with open(archive_path, "rb") as f:
+            while chunk := f.read(64 * 1024):
+                yield chunk
+
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        imported, counts = await project_archive.import_tar(db, user_id, read_file(), name="imported")
+        stored = await db.scalar(select(func.count()).select_from(Prompt).where(Prompt.project_id == imported.id))
+    elapsed = time.perf_counter() - started
+    print(f"import: {counts} ({stored} rows stored) in {elapsed:.2f}s ({prompts / elapsed:,.0f} prompts/s); "
+          f"peak RSS {peak_rss_mb():.0f} MB")
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prompts", type=int, default=100_000)
+    parser.add_argument("--files", type=int, default=2)
+    parser.add_argument("--file-size", type=int, default=1_000_000, help="bytes per file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="chatbot-archive-")
+    # Must be set before the app modules are imported
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.sqlite3')}"
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    os.environ["UPLOAD_DIR"] = os.path.join(workdir, "uploads")
+
+    from create_tables import upgrade_database
+    upgrade_database()
+    asyncio.run(run(args.prompts, args.files, args.file_size, os.path.join(workdir, "export.tar")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# ---------------------------
+# File: benchmarks/search.py
+# ---------------------------
+"""
+Full-text prompt search against the client-side alternative.
+
+Seeds a throwaway SQLite database with --prompts prompts spread over
+--projects projects of one user (the FTS5 triggers index them as they are
+inserted), then times --queries searches through services.search and the
+same searches done by reading every prompt of the user and filtering in
+Python, which is what a client had to do before /prompts/search.
+Reports insert throughput and p50/p95/p99 latency in milliseconds.
+
+    python -m benchmarks.search --prompts 200000 --queries 200
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from itertools import accumulate
+
+
+def vocabulary(rng: random.Random, size: int) -> tuple[list[str], list[float]]:
+    """Random words and their cumulative Zipf weights, like natural text."""
+    words = ["".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(3, 9))) for _ in range(size)]
+    return words, list(accumulate(1 / rank for rank in range(1, size + 1)))
+
+
+def percentiles(samples: list[float]) -> str:
+    cuts = statistics.quantiles(samples, n=100)
+    return f"p50 {cuts[49] * 1000:.1f} ms, p95 {cuts[94] * 1000:.1f} ms, p99 {cuts[98] * 1000:.1f} ms"
+
+
+async def run(prompts: int, projects: int, queries: int, limit: int):
+    from sqlalchemy import insert, select
+    from database import AsyncSessionLocal, async_engine
+    from models import Project, Prompt, User
+    from services import search
+
+    rng = random.Random(0)
+    words, cum_weights = vocabulary(rng, 20_000)
+    async with AsyncSessionLocal() as db:
+        user = User(name="bench", email="bench@example.com", password_hash="x")
+        db.add(user)
+        await db.flush()
+        project_ids = []
+        for n in range(projects):
+            project = Project(name=f"bench {n}", user_id=user.id)
+            db.add(project)
+            await db.flush()
+            project_ids.append(project.id)
+        started = time.perf_counter()
+        batch = 10_000
+        for start in range(0, prompts, batch):
+            await db.execute(insert(Prompt), [
+                {"project_id": rng.choice(project_ids),
+                 "text": " ".join(rng.choices(words, cum_weights=cum_weights, k=20))}
+                for _ in range(start, min(prompts, start + batch))
+            ])
+        await db.commit()
+        elapsed = time.perf_counter() - started
+        print(f"inserted {prompts} prompts in {elapsed:.2f}s ({prompts / elapsed:,.0f}/s, FTS triggers included)")
+        user_id = user.id
+
+    base = select(Prompt.id, Prompt.text, Prompt.project_id, Prompt.created_at) \
+        .join(Project, Prompt.project_id == Project.id) \
+        .where(Project.user_id == user_id)
+    # One common and one rarer word, as a user narrowing a search would type
+    terms = [f"{rng.choice(words[:50])} {rng.choice(words[50:2000])}" for _ in range(queries)]
+
+    indexed = []
+    async with AsyncSessionLocal() as db:
+        for q in terms:
+            started = time.perf_counter()
+            await search.ranked_page(db, base, Prompt.text, q, None, limit)
+            indexed.append(time.perf_counter() - started)
+    print(f"indexed search ({queries} queries, limit {limit}): {percentiles(indexed)}")
+
+    scanned = []
+    async with AsyncSessionLocal() as db:
+        for q in terms[:max(2, queries // 10)]:  # Far slower; a sample is enough
+            started = time.perf_counter()
+            wanted = q.split()
+            rows = (await db.execute(base)).all()
+            [row for row in rows if all(word in row.text.split() for word in wanted)][:limit]
+            scanned.append(time.perf_counter() - started)
+    print(f"list + client-side filter ({len(scanned)} queries): {percentiles(scanned)}")
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prompts", type=int, default=100_000)
+    parser.add_argument("--projects", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=50, help="page size")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="chatbot-search-")
+    # Must be set before the app modules are imported
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.sqlite3')}"
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    os.environ["UPLOAD_DIR"] = os.path.join(workdir, "uploads")
+
+    from create_tables import upgrade_database
+    upgrade_database()
+    asyncio.run(run(args.prompts, args.projects, args.queries, args.limit))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# ---------------------------
+# File: benchmarks/semantic_cache.py
+# ---------------------------
+"""
+Hit rate, wrong answers and lookup cost of the semantic answer cache.
+
+Traffic: --questions distinct questions, each with --variants paraphrases
+(case, punctuation, filler words, word order, one word dropped). Questions
+are built in pairs that share most of their words, so a loose threshold
+returns the neighbour's answer. --requests messages are drawn with Zipf
+popularity and sent through SemanticCache.lookup/store (no upstream, no
+HTTP). For each threshold the script prints:
+
+    hit rate    lookups answered from the cache
+    wrong       hits that returned another question's answer
+    exact       hit rate of an exact-match cache on the same traffic
+
+Then it prints the lookup time (embed + matrix product) for one project
+holding --entries answers.
+
+    python -m benchmarks.semantic_cache --questions 2000 --requests 20000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+FILLERS = ["please", "hey", "so", "quick question:", "hi,", "i was wondering"]
+
+
+def make_questions(count: int, rng: random.Random) -> list[list[str]]:
+    vocab = [f"{rng.choice('bcdfghklmnprstvw')}{rng.choice('aeiou')}{rng.choice('bcdfgklmnprst')}{i}" for i in range(4000)]
+    questions = []
+    for _ in range(count // 2):
+        words = rng.sample(vocab, 7)
+        questions.append(words)
+        neighbour = list(words)
+        neighbour[rng.randrange(7)] = rng.choice(vocab)  # Same topic, different question
+        neighbour[rng.randrange(7)] = rng.choice(vocab)
+        questions.append(neighbour)
+    return questions
+
+
+def paraphrase(words: list[str], rng: random.Random) -> str:
+    words = list(words)
+    if rng.random() < 0.5:
+        i = rng.randrange(len(words) - 1)
+        words[i], words[i + 1] = words[i + 1], words[i]
+    if rng.random() < 0.3:
+        del words[rng.randrange(len(words))]
+    text = " ".join(words)
+    if rng.random() < 0.5:
+        text = f"{rng.choice(FILLERS)} {text}"
+    if rng.random() < 0.5:
+        text = text.capitalize()
+    return text + rng.choice(["?", "", "!", " ?", "..."])
+
+
+def traffic(questions, variants: int, requests: int, rng: random.Random) -> list[tuple[int, str]]:
+    forms = [[" ".join(q) + "?"] + [paraphrase(q, rng) for _ in range(variants)] for q in questions]
+    weights = [1 / (rank + 1) for rank in range(len(questions))]
+    picks = rng.choices(range(len(questions)), weights=weights, k=requests)
+    return [(q, rng.choice(forms[q])) for q in picks]
+
+
+def payload(message: str) -> dict:
+    return {"model": "m", "max_tokens": 100, "messages": [{"role": "user", "content": message}]}
+
+
+async def hit_rates(stream, threshold: float) -> tuple[float, float, float]:
+    from services.semantic_cache import SemanticCache
+
+    cache = SemanticCache(threshold=threshold, maxsize=10**6, project_maxsize=10**6)
+    project = SimpleNamespace(id=1, prompt_version=0, created_at=datetime(2024, 1, 1))
+    exact, hits, wrong = set(), 0, 0
+    exact_hits = 0
+    for question, message in stream:
+        exact_hits += message in exact
+        exact.add(message)
+        request = payload(message)
+        reply, vector = await cache.lookup(project, request)
+        if reply is None:
+            await cache.store(project, request, vector, str(question))
+        else:
+            hits += 1
+            wrong += reply != str(question)
+    return hits / len(stream), wrong / max(hits, 1), exact_hits / len(stream)
+
+
+def lookup_cost(entries: int, rng: random.Random, samples: int = 500) -> float:
+    import numpy as np
+    from services.embeddings import get_cache_embedder
+    from services.semantic_cache import SemanticCache
+
+    cache = SemanticCache(maxsize=entries, project_maxsize=entries)
+    project = SimpleNamespace(id=1, prompt_version=0, created_at=None)
+    messages = [paraphrase(q, rng) for q in make_questions(entries, rng)]
+    vectors = get_cache_embedder().embed(messages)
+    for message, vector in zip(messages, vectors):
+        cache._store(project, payload(message), np.asarray(vector), message)
+    timings = []
+    for message in rng.sample(messages, min(samples, len(messages))):
+        started = time.perf_counter()
+        cache._lookup(project, payload(message + " again"))
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=2000)
+    parser.add_argument("--variants", type=int, default=5, help="paraphrases per question")
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--thresholds", default="0.7,0.8,0.85,0.9,0.95")
+    parser.add_argument("--entries", default="1000,10000,50000", help="answers per project for the lookup timing")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    # models (imported by the cache for its Project type) needs a database URL; nothing connects to it
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    rng = random.Random(args.seed)
+    stream = traffic(make_questions(args.questions, rng), args.variants, args.requests, rng)
+    print(f"{'threshold':>9} {'hit rate':>9} {'wrong':>7} {'exact':>7}")
+    for threshold in map(float, args.thresholds.split(",")):
+        rate, wrong, exact = asyncio.run(hit_rates(stream, threshold))
+        print(f"{threshold:9.2f} {rate:9.1%} {wrong:7.2%} {exact:7.1%}")
+
+    print(f"\n{'entries':>8} {'lookup p50':>11}")
+    for entries in map(int, args.entries.split(",")):
+        print(f"{entries:8} {lookup_cost(entries, rng) * 1e6:9.0f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# ---------------------------
+# File: benchmarks/startup.py
+# ---------------------------
+"""
+Start-up time of the production launcher and the cost of the first requests.
+
+For WARMUP=0 and WARMUP=1 it starts `gunicorn main:app` (gunicorn.conf.py)
+--runs times against a fresh SQLite database and a local fake LLM, and
+measures:
+
+    import   time to `import main` in a fresh interpreter
+    ready    launch until GET / answers
+    register first POST /auth/register (bcrypt pool, DB connection)
+    chat     first POST /chat/ (upstream connection)
+
+and prints the median of each in milliseconds. With warm-up the pools are
+filled before the workers accept connections, so `ready` grows and the
+first requests get cheaper.
+
+    python -m benchmarks.startup --workers 2 --runs 5
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+import httpx
+
+from benchmarks.chat_throughput import wait_for_port
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_time(env: dict) -> float:
+    code = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, check=True, capture_output=True, text=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def start_once(env: dict, port: int) -> dict:
+    started = time.perf_counter()
+    server = subprocess.Popen(["gunicorn", "main:app", "--log-level", "warning"], cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+            while True:
+                try:
+                    client.get("/")
+                    break
+                except httpx.TransportError:
+                    if server.poll() is not None:
+                        raise RuntimeError("gunicorn exited during start-up")
+                    time.sleep(0.01)
+            timings = {"ready": time.perf_counter() - started}
+
+            email = f"{uuid.uuid4().hex}@example.com"
+            t = time.perf_counter()
+            client.post("/auth/register", json={"name": "bench", "email": email, "password": "pw"}).raise_for_status()
+            timings["register"] = time.perf_counter() - t
+
+            token = client.post("/auth/login", json={"email": email, "password": "pw"}).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            project_id = client.post("/projects/", json={"name": "bench"}, headers=headers).json()["id"]
+            t = time.perf_counter()
+            client.post("/chat/", json={"project_id": project_id, "message": "hi"}, headers=headers).raise_for_status()
+            timings["chat"] = time.perf_counter() - t
+        return timings
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=2, help="WEB_CONCURRENCY")
+    parser.add_argument("--runs", type=int, default=5, help="starts per configuration")
+    parser.add_argument("--bcrypt-rounds", type=int, default=4)
+    parser.add_argument("--app-port", type=int, default=8766)
+    parser.add_argument("--llm-port", type=int, default=9102)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="chatbot-startup-")
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.sqlite3')}",
+        "SECRET_KEY": os.getenv("SECRET_KEY", "bench-secret"),
+        "CHAT_API_URL": f"http://127.0.0.1:{args.llm_port}/openai/v1/chat/completions",
+        "CHAT_PROJECT_API_KEY": "bench",
+        "UPLOAD_DIR": os.path.join(workdir, "uploads"),
+        "BCRYPT_ROUNDS": str(args.bcrypt_rounds),
+        "RATE_LIMIT_ENABLED": "0",
+        "BIND": f"127.0.0.1:{args.app_port}",
+    }
+    env.pop("ASYNC_DATABASE_URL", None)
+    env.pop("WEB_CONCURRENCY", None)  # uvicorn (the fake LLM) reads it too
+
+    subprocess.run([sys.executable, "create_tables.py"], cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+    llm = subprocess.Popen([sys.executable, "-m", "benchmarks.fake_llm", "--port", str(args.llm_port), "--latency", "0"],
+                           cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_port("127.0.0.1", args.llm_port)
+        print(f"import main: {statistics.median(import_time(env) for _ in range(args.runs)) * 1000:.0f} ms")
+        print(f"{'WARMUP':8} {'ready ms':>9} {'register ms':>12} {'chat ms':>8}")
+        for warmup in ("0", "1"):
+            run_env = {**env, "WARMUP": warmup, "WEB_CONCURRENCY": str(args.workers)}
+            runs = [start_once(run_env, args.app_port) for _ in range(args.runs)]
+            medians = {key: statistics.median(run[key] for run in runs) * 1000 for key in runs[0]}
+            print(f"{warmup:8} {medians['ready']:9.0f} {medians['register']:12.1f} {medians['chat']:8.1f}")
+    finally:
+        llm.terminate()
+        llm.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# ---------------------------
+# File: benchmarks/upstream_resilience.py
+# ---------------------------
+"""
+Completions through services.llm_gateway against two local fake upstreams:
+a flaky "primary" (--fail-rate of its requests answer --fail-status, and
+--hang-rate never answer) and a healthy "secondary".
+
+Reports the success rate, latency percentiles and the gateway's retry,
+failover and hedge counters, so retry/breaker/hedging settings can be
+compared without touching a real provider.
+
+    python -m benchmarks.upstream_resilience --requests 300 --fail-rate 0.3
+    python -m benchmarks.upstream_resilience --hang-rate 0.05 --timeout 2 --hedge-delay 0.5
+    python -m benchmarks.upstream_resilience --single   # primary only: what callers see without failover
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.chat_throughput import wait_for_port
+from benchmarks.harness import percentile
+
+
+async def run(requests: int, concurrency: int):
+    from services import llm_client, llm_gateway, metrics
+
+    await llm_client.start_client()
+    semaphore = asyncio.Semaphore(concurrency)
+    payload = {"model": "fake", "messages": [{"role": "user", "content": "hello"}], "max_tokens": 16}
+    latencies, outcomes = [], {}
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            error = None
+            try:
+                await llm_gateway.complete(payload)
+            except Exception as e:
+                error = e
+            latencies.append(time.perf_counter() - started)
+            outcome = "unavailable" if isinstance(error, llm_gateway.UpstreamUnavailable) else metrics.llm_outcome(error)
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(one() for _ in range(requests)))
+    finally:
+        await llm_client.close_client()
+    elapsed = time.perf_counter() - started
+
+    def counter(metric, label):
+        return sum(s.value for m in metric.collect() for s in m.samples
+                   if s.name.endswith("_total") and label in s.labels.values())
+
+    counters = {
+        "retries": {name: counter(metrics.LLM_RETRIES, name) for name in ("primary", "secondary")},
+        "failovers": {name: counter(metrics.LLM_FAILOVERS, name) for name in ("primary", "secondary")},
+        "hedges_won": {name: counter(metrics.LLM_HEDGES, name) for name in ("primary", "hedge")},
+    }
+    return elapsed, sorted(latencies), outcomes, counters
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.1, help="fake upstream latency in seconds")
+    parser.add_argument("--fail-rate", type=float, default=0.3, help="fraction of primary requests that fail")
+    parser.add_argument("--fail-status", type=int, default=503)
+    parser.add_argument("--retry-after", help="Retry-After sent by the primary on failures")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="fraction of primary requests that never answer")
+    parser.add_argument("--timeout", type=float, default=5.0, help="per-attempt deadline (provider timeout)")
+    parser.add_argument("--retries", type=int, default=2, help="LLM_RETRIES")
+    parser.add_argument("--hedge-delay", type=float, default=0.0, help="LLM_HEDGE_DELAY, 0 = no hedging")
+    parser.add_argument("--single", action="store_true", help="configure only the flaky primary")
+    parser.add_argument("--port", type=int, default=9100, help="primary port; the secondary uses port + 1")
+    args = parser.parse_args()
+
+    providers = [{"name": "primary", "url": f"http://127.0.0.1:{args.port}/openai/v1/chat/completions",
+                  "timeout": args.timeout}]
+    if not args.single:
+        providers.append({"name": "secondary", "url": f"http://127.0.0.1:{args.port + 1}/openai/v1/chat/completions",
+                          "timeout": args.timeout})
+    # Must be set before services.llm_gateway is imported
+    os.environ.update({
+        "LLM_PROVIDERS": json.dumps(providers),
+        "LLM_RETRIES": str(args.retries),
+        "LLM_HEDGE_DELAY": str(args.hedge_delay),
+        "CHAT_PROJECT_API_KEY": "bench",
+    })
+
+    primary = [sys.executable, "-m", "benchmarks.fake_llm", "--port", str(args.port),
+               "--latency", str(args.latency), "--fail-rate", str(args.fail_rate),
+               "--fail-status", str(args.fail_status), "--hang-rate", str(args.hang_rate)]
+    if args.retry_after is not None:
+        primary += ["--retry-after", args.retry_after]
+    commands = [primary]
+    if not args.single:
+        commands.append([sys.executable, "-m", "benchmarks.fake_llm", "--port", str(args.port + 1),
+                         "--latency", str(args.latency)])
+
+    processes = [subprocess.Popen(command) for command in commands]
+    try:
+        for n in range(len(processes)):
+            wait_for_port("127.0.0.1", args.port + n)
+        elapsed, latencies, outcomes, counters = asyncio.run(run(args.requests, args.concurrency))
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+    ok = outcomes.get("ok", 0)
+    print(f"{args.requests} requests, primary fail rate {args.fail_rate:.0%}, hang rate {args.hang_rate:.0%}, "
+          f"{'primary only' if args.single else 'primary + secondary'}, hedge delay {args.hedge_delay}s")
+    print(f"success       {ok}/{args.requests} ({ok / args.requests:.1%}) in {elapsed:.2f}s")
+    print(f"outcomes      {outcomes}")
+    print(f"latency ms    p50 {percentile(latencies, 50) * 1000:.1f}  p95 {percentile(latencies, 95) * 1000:.1f}  "
+          f"p99 {percentile(latencies, 99) * 1000:.1f}")
+    for name, values in counters.items():
+        print(f"{name:13} {values}")
+
+
+if __name__ == "__main__":
+    main()
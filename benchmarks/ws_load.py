@@ -0,0 +1,225 @@
+# ---------------------------
+# File: benchmarks/ws_load.py
+# ---------------------------
+"""
+How many /chat/ws connections one worker holds, idle and active.
+
+Starts one uvicorn worker (as configured in gunicorn.conf.py) on a
+fresh SQLite database and a local fake LLM, then from this process:
+
+    idle     opens --idle authenticated connections in --step batches and
+             reports the worker's RSS per batch and ping round trips
+             (p50/p99 over --probe connections) while they stay open
+    active   keeps --active connections busy for --seconds each, every one
+             running --streams concurrent turns back to back, and reports
+             turns/s, time to first delta and turn time (p50/p99)
+    http     the same number of concurrent turns through POST /chat/stream,
+             which authenticates and checks ownership on every turn
+
+Idle connections stay open alongside the active phase, so its numbers are
+for a worker that is also holding them.
+
+    python -m benchmarks.ws_load --idle 5000 --active 200 --seconds 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.chat_throughput import wait_for_port
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MESSAGE = "tell me a short story about a lighthouse keeper and a very curious seagull who visits every morning"
+
+
+def rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def pct(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+
+def setup(base_url: str) -> tuple[str, int]:
+    with httpx.Client(base_url=base_url) as client:
+        client.post("/auth/register", json={"name": "bench", "email": "ws@example.com", "password": "pw"})
+        token = client.post("/auth/login", json={"email": "ws@example.com", "password": "pw"}).json()["access_token"]
+        project = client.post("/projects/", json={"name": "ws"}, headers={"Authorization": f"Bearer {token}"}).json()
+    return token, project["id"]
+
+
+async def open_connection(url: str, token: str):
+    from websockets.asyncio.client import connect
+
+    ws = await connect(url, additional_headers={"Authorization": f"Bearer {token}"},
+                       ping_interval=None, max_queue=None)
+    ready = json.loads(await ws.recv())
+    if ready.get("type") != "ready":
+        raise RuntimeError(f"connection refused: {ready}")
+    return ws
+
+
+async def ping(ws) -> float:
+    started = time.perf_counter()
+    await ws.send(json.dumps({"type": "ping"}))
+    while json.loads(await ws.recv())["type"] != "pong":
+        pass
+    return time.perf_counter() - started
+
+
+async def idle_phase(url: str, token: str, total: int, step: int, probe: int, pid: int) -> list:
+    connections = []
+    print(f"{'idle':>7} {'RSS MB':>8} {'KB/conn':>8} {'ping p50':>9} {'ping p99':>9}")
+    base = rss_mb(pid)
+    while len(connections) < total:
+        batch = min(step, total - len(connections))
+        # Open in groups so the listen backlog is not overrun
+        for start in range(0, batch, 200):
+            connections += await asyncio.gather(*(open_connection(url, token) for _ in range(min(200, batch - start))))
+        rtts = [await ping(ws) for ws in connections[-probe:]]
+        rss = rss_mb(pid)
+        print(f"{len(connections):7} {rss:8.1f} {(rss - base) * 1024 / len(connections):8.1f} "
+              f"{pct(rtts, 0.5):7.2f}ms {pct(rtts, 0.99):7.2f}ms")
+    return connections
+
+
+async def ws_turns(url: str, token: str, connections: int, streams: int, seconds: float):
+    first, total, deadline = [], [], time.monotonic() + seconds
+    sockets = [await open_connection(url, token) for _ in range(connections)]
+
+    async def drive(ws):
+        tags = {}
+        next_tag = 0
+
+        async def start():
+            nonlocal next_tag
+            next_tag += 1
+            tags[next_tag] = [time.perf_counter(), None]
+            await ws.send(json.dumps({"type": "chat", "id": next_tag, "message": MESSAGE}))
+
+        for _ in range(streams):
+            await start()
+        while tags:
+            frame = json.loads(await ws.recv())
+            timing = tags.get(frame.get("id"))
+            if timing is None:
+                continue
+            if frame["type"] == "delta" and timing[1] is None:
+                timing[1] = time.perf_counter() - timing[0]
+            elif frame["type"] in ("done", "error"):
+                del tags[frame["id"]]
+                if frame["type"] == "done":
+                    first.append(timing[1])
+                    total.append(time.perf_counter() - timing[0])
+                if time.monotonic() < deadline:
+                    await start()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(drive(ws) for ws in sockets))
+    elapsed = time.perf_counter() - started
+    await asyncio.gather(*(ws.close() for ws in sockets))
+    return len(total) / elapsed, first, total
+
+
+async def http_turns(base_url: str, token: str, project_id: int, concurrency: int, seconds: float):
+    first, total, deadline = [], [], time.monotonic() + seconds
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60,
+                                 headers={"Authorization": f"Bearer {token}"}) as client:
+        async def drive():
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                seen = None
+                async with client.stream("POST", "/chat/stream", json={"project_id": project_id, "message": MESSAGE}) as response:
+                    async for line in response.aiter_lines():
+                        if seen is None and line.startswith("data:"):
+                            seen = time.perf_counter() - started
+                if response.status_code == 200:
+                    first.append(seen)
+                    total.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(drive() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return len(total) / elapsed, first, total
+
+
+async def run(args, base_url: str, token: str, project_id: int, pid: int):
+    url = base_url.replace("http://", "ws://") + f"/chat/ws?project_id={project_id}"
+    idle = await idle_phase(url, token, args.idle, args.step, args.probe, pid)
+
+    print(f"\n{'mode':6} {'conns':>6} {'turns/s':>8} {'first p50':>10} {'first p99':>10} {'turn p50':>9} {'turn p99':>9} {'RSS MB':>7}")
+    for mode in ("ws", "http"):
+        if mode == "ws":
+            rate, first, total = await ws_turns(url, token, args.active, args.streams, args.seconds)
+        else:
+            rate, first, total = await http_turns(base_url, token, project_id, args.active * args.streams, args.seconds)
+        print(f"{mode:6} {args.active if mode == 'ws' else args.active * args.streams:6} {rate:8.1f} "
+              f"{pct(first, 0.5):8.1f}ms {pct(first, 0.99):8.1f}ms {pct(total, 0.5):7.1f}ms {pct(total, 0.99):7.1f}ms "
+              f"{rss_mb(pid):7.1f}")
+    await asyncio.gather(*(ws.close() for ws in idle))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--idle", type=int, default=2000, help="idle connections held open")
+    parser.add_argument("--step", type=int, default=500, help="connections opened per report line")
+    parser.add_argument("--probe", type=int, default=100, help="connections pinged per report line")
+    parser.add_argument("--active", type=int, default=100, help="busy connections")
+    parser.add_argument("--streams", type=int, default=1, help="concurrent turns per busy connection")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--token-latency", type=float, default=0.01, help="fake LLM delay between tokens")
+    parser.add_argument("--ws", default="websockets-sansio", help="uvicorn WebSocket protocol (as in gunicorn.conf.py)")
+    parser.add_argument("--app-port", type=int, default=8767)
+    parser.add_argument("--llm-port", type=int, default=9103)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="chatbot-ws-")
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.sqlite3')}",
+        "SECRET_KEY": os.getenv("SECRET_KEY", "bench-secret"),
+        "CHAT_API_URL": f"http://127.0.0.1:{args.llm_port}/openai/v1/chat/completions",
+        "CHAT_PROJECT_API_KEY": "bench",
+        "UPLOAD_DIR": os.path.join(workdir, "uploads"),
+        "RATE_LIMIT_ENABLED": "0",
+        "WS_MAX_STREAMS": str(max(args.streams, 8)),
+        "LLM_MAX_CONNECTIONS": str(args.active * args.streams + 10),
+    }
+    env.pop("ASYNC_DATABASE_URL", None)
+    env.pop("WEB_CONCURRENCY", None)  # uvicorn (the fake LLM) reads it too
+
+    subprocess.run([sys.executable, "create_tables.py"], cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+    llm = subprocess.Popen([sys.executable, "-m", "benchmarks.fake_llm", "--port", str(args.llm_port), "--latency", "0",
+                            "--token-latency", str(args.token_latency)],
+                           cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.app_port),
+                               "--log-level", "warning", "--no-access-log", "--backlog", "4096", "--ws", args.ws],
+                              cwd=ROOT, env=env, stdout=subprocess.DEVNULL)
+    try:
+        wait_for_port("127.0.0.1", args.llm_port)
+        wait_for_port("127.0.0.1", args.app_port, timeout=30)
+        base_url = f"http://127.0.0.1:{args.app_port}"
+        token, project_id = setup(base_url)
+        asyncio.run(run(args, base_url, token, project_id, server.pid))
+    finally:
+        server.terminate()
+        llm.terminate()
+        server.wait()
+        llm.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+# ---------------------------
+# File: config.py
+# ---------------------------
+
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from dotenv import load_dotenv
+
+
+def _int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+def _float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+def _flag(name: str, default: bool) -> bool:
+    return os.getenv(name, "1" if default else "0") == "1"
+
+
+def _optional_int(name: str) -> int | None:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+# ---------------------------
+# Typed settings, read from the environment (and .env) once per process
+# ---------------------------
+@dataclass(frozen=True)
+class Settings:
+    # Database
+    database_url: str | None
+    async_database_url: str | None      # None = derived from database_url (asyncpg / aiosqlite)
+    db_pool_size: int                   # Connections kept open
+    db_max_overflow: int                # Extra connections under burst
+    db_pool_pre_ping: bool              # Check connections before use
+    db_pool_recycle: int                # Seconds before a connection is replaced
+
+    # Auth
+    secret_key: str | None              # JWT signing key
+    access_token_expire_minutes: int    # Token lifetime; every token carries an `exp` claim
+    auth_stateless: bool                # Build the caller from token claims alone (no DB lookup)
+    auth_cache_size: int                # Resolved callers kept per process
+    auth_cache_ttl: float               # Seconds a resolved caller is reused
+
+    # Chat
+    chat_batch_max: int                 # Messages per /chat/batch request
+    chat_batch_concurrency: int         # Upstream calls in flight per batch
+    chat_model: str                     # Model for projects that set none
+    chat_max_tokens: int                # Reply cap for projects that set none
+    chat_history_messages: int          # Most recent messages considered for the upstream context
+    chat_context_tokens: int            # Budget for system prompt + history + message
+    prompt_cache_size: int              # Compiled project prompts kept per process
+    prompt_bulk_max: int                # Prompts in one bulk request
+
+    # Listing and search
+    page_size_default: int              # Rows per page when ?limit= is omitted
+    page_size_max: int                  # Largest accepted ?limit=
+    search_max_terms: int               # Words of `q` used, the rest is ignored
+    search_snippet_words: int           # Length of the highlighted excerpt
+
+    # Upstream LLM (services/llm_client.py, services/llm_gateway.py)
+    chat_api_url: str                   # Upstream of the default provider
+    chat_project_api_key: str | None    # Its API key
+    llm_providers: str | None           # JSON list of providers; None = the one above
+    llm_max_connections: int            # Total sockets to the upstream
+    llm_max_keepalive: int              # Idle sockets kept open for reuse
+    llm_keepalive_expiry: float         # Seconds an idle socket stays open
+    llm_connect_timeout: float          # TCP + TLS handshake
+    llm_read_timeout: float             # Waiting for completion bytes
+    llm_pool_timeout: float             # Waiting for a free pooled socket
+    llm_request_timeout: float          # Total deadline for one completion
+    llm_retries: int                    # Extra attempts per provider on 429/5xx/timeouts
+    llm_retry_base: float               # Backoff base (full jitter, doubles per attempt)
+    llm_retry_max: float                # Cap on one backoff sleep
+    llm_retry_after_max: float          # Longer Retry-After: fail over instead of waiting
+    llm_breaker_failures: int           # Consecutive failures that open the circuit
+    llm_breaker_cooldown: float         # Seconds open before one trial request
+    llm_hedge_delay: float              # Seconds before a hedged request, 0 = off
+
+    # Reply cache (services/completion_cache.py)
+    chat_cache_enabled: bool            # Opt-in
+    chat_cache_backend: str             # "memory" or "sqlite"
+    chat_cache_ttl: float               # Seconds a reply stays valid
+    chat_cache_size: int                # Max cached replies
+    chat_cache_path: str                # SQLite backend file
+    semantic_cache_enabled: bool        # Opt-in
+    semantic_cache_threshold: float     # Cosine similarity for a hit
+    semantic_cache_ttl: float           # Seconds an answer stays valid
+    semantic_cache_size: int            # Max answers per process
+    semantic_cache_project_size: int    # Max answers per project
+
+    # Rate limits and token budgets (services/rate_limit.py)
+    rate_limit_enabled: bool
+    rate_limit_backend: str             # "memory" or "sqlite"
+    rate_limit_path: str                # SQLite backend file
+    rate_limit_user_rate: float         # Chat requests/second per user
+    rate_limit_user_burst: float        # Bucket size per user
+    rate_limit_project_rate: float      # Chat requests/second per project
+    rate_limit_project_burst: float     # Bucket size per project
+    project_daily_token_budget: int     # Upstream tokens/day per project, 0 = unlimited
+    rate_limit_max_keys: int            # Buckets kept by the memory backend
+
+    # Uploads, archives and retrieval
+    upload_dir: str                     # Root of the blob store
+    upload_chunk_size: int              # Bytes read/written per step
+    upload_max_bytes: int               # Per-file limit
+    project_quota_bytes: int            # Per-project total, 0 = unlimited
+    archive_batch_rows: int             # Rows per NDJSON member / INSERT
+    archive_max_line: int               # Longest accepted NDJSON line
+    archive_max_member: int             # Largest non-blob member
+    vector_index_dir: str               # Per-project vector indexes
+    embedder: str                       # "hashing" or "package.module:factory"
+    embedding_dim: int                  # Vector width of the hashing embedder
+    rag_chunk_chars: int                # Target chunk length
+    rag_chunk_overlap: int              # Characters shared by neighbouring chunks
+    rag_top_k: int                      # Chunks injected into the prompt
+    rag_min_score: float                # Cosine similarity floor
+
+    # Background jobs (services/jobs.py)
+    job_workers: int                    # Worker tasks per process, 0 = do not run jobs here
+    job_poll_interval: float            # Seconds between polls when idle
+    job_max_attempts: int               # Tries before a job is marked failed
+    job_retry_base: float               # First retry delay; doubles per attempt
+    job_retry_max: float                # Cap on the retry delay
+    job_lease_seconds: float            # Running jobs older than this are re-claimed
+    job_retention_days: float           # Finished jobs pruned at startup after this
+
+    # Password hashing (services/hashing.py)
+    bcrypt_rounds: int                  # bcrypt work factor (log2 rounds)
+    hash_workers: int | None            # Processes doing bcrypt; None = one per core (a share of them under gunicorn)
+    hash_max_pending: int | None        # Queue bound before shedding load; None = 8 per hash worker
+
+    # Metrics (services/metrics.py)
+    metrics_enabled: bool               # False = no middleware, no /metrics
+    prometheus_multiproc_dir: str | None  # Set when several worker processes share /metrics
+
+    # WebSocket chat (/chat/ws)
+    ws_auth_timeout: float              # Seconds a new connection has to authenticate
+    ws_max_streams: int                 # Chat turns in progress per connection
+    ws_send_queue: int                  # Frames buffered per connection before producers wait
+    ws_project_refresh: float           # Seconds the connection's project row is reused
+
+    # Response compression (main.py)
+    compress_min_size: int              # Smaller bodies are sent as they are
+    gzip_level: int                     # 1 (fast) .. 9 (small)
+    brotli_quality: int                 # 0 (fast) .. 11 (small); used when the brotli package is installed
+
+    # Server process (gunicorn.conf.py and the app lifespan)
+    bind: str                           # host:port the workers listen on
+    web_concurrency: int                # Worker processes
+    shutdown_timeout: float             # Seconds a worker waits for in-flight requests on SIGTERM
+    warmup: bool                        # Open DB, LLM and hashing pools before serving
+    db_warm_connections: int            # DB connections opened per worker at startup
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        load_dotenv()
+        upload_dir = os.getenv("UPLOAD_DIR", "uploads")
+        return cls(
+            database_url=os.getenv("DATABASE_URL"),
+            async_database_url=os.getenv("ASYNC_DATABASE_URL"),
+            db_pool_size=_int("DB_POOL_SIZE", 10),
+            db_max_overflow=_int("DB_MAX_OVERFLOW", 20),
+            db_pool_pre_ping=_flag("DB_POOL_PRE_PING", True),
+            db_pool_recycle=_int("DB_POOL_RECYCLE", 1800),
+            secret_key=os.getenv("SECRET_KEY"),
+            access_token_expire_minutes=_int("ACCESS_TOKEN_EXPIRE_MINUTES", 60),
+            auth_stateless=_flag("AUTH_STATELESS", False),
+            auth_cache_size=_int("AUTH_CACHE_SIZE", 10000),
+            auth_cache_ttl=_float("AUTH_CACHE_TTL", 60),
+            chat_batch_max=_int("CHAT_BATCH_MAX", 20),
+            chat_batch_concurrency=_int("CHAT_BATCH_CONCURRENCY", 5),
+            chat_model=os.getenv("CHAT_MODEL", "llama-3.1-8b-instant"),
+            chat_max_tokens=_int("CHAT_MAX_TOKENS", 100),
+            chat_history_messages=_int("CHAT_HISTORY_MESSAGES", 20),
+            chat_context_tokens=_int("CHAT_CONTEXT_TOKENS", 3000),
+            prompt_cache_size=_int("PROMPT_CACHE_SIZE", 10000),
+            prompt_bulk_max=_int("PROMPT_BULK_MAX", 10000),
+            page_size_default=_int("PAGE_SIZE_DEFAULT", 50),
+            page_size_max=_int("PAGE_SIZE_MAX", 200),
+            search_max_terms=_int("SEARCH_MAX_TERMS", 16),
+            search_snippet_words=_int("SEARCH_SNIPPET_WORDS", 16),
+            chat_api_url=os.getenv("CHAT_API_URL", "https://api.groq.com/openai/v1/chat/completions"),
+            chat_project_api_key=os.getenv("CHAT_PROJECT_API_KEY"),
+            llm_providers=os.getenv("LLM_PROVIDERS"),
+            llm_max_connections=_int("LLM_MAX_CONNECTIONS", 100),
+            llm_max_keepalive=_int("LLM_MAX_KEEPALIVE", 20),
+            llm_keepalive_expiry=_float("LLM_KEEPALIVE_EXPIRY", 30),
+            llm_connect_timeout=_float("LLM_CONNECT_TIMEOUT", 5),
+            llm_read_timeout=_float("LLM_READ_TIMEOUT", 60),
+            llm_pool_timeout=_float("LLM_POOL_TIMEOUT", 10),
+            llm_request_timeout=_float("LLM_REQUEST_TIMEOUT", 90),
+            llm_retries=_int("LLM_RETRIES", 2),
+            llm_retry_base=_float("LLM_RETRY_BASE", 0.25),
+            llm_retry_max=_float("LLM_RETRY_MAX", 4),
+            llm_retry_after_max=_float("LLM_RETRY_AFTER_MAX", 10),
+            llm_breaker_failures=_int("LLM_BREAKER_FAILURES", 5),
+            llm_breaker_cooldown=_float("LLM_BREAKER_COOLDOWN", 30),
+            llm_hedge_delay=_float("LLM_HEDGE_DELAY", 0),
+            chat_cache_enabled=_flag("CHAT_CACHE_ENABLED", False),
+            chat_cache_backend=os.getenv("CHAT_CACHE_BACKEND", "memory"),
+            chat_cache_ttl=_float("CHAT_CACHE_TTL", 3600),
+            chat_cache_size=_int("CHAT_CACHE_SIZE", 10000),
+            chat_cache_path=os.getenv("CHAT_CACHE_PATH", "cache/completions.sqlite3"),
+            semantic_cache_enabled=_flag("SEMANTIC_CACHE_ENABLED", False),
+            semantic_cache_threshold=_float("SEMANTIC_CACHE_THRESHOLD", 0.9),
+            semantic_cache_ttl=_float("SEMANTIC_CACHE_TTL", 3600),
+            semantic_cache_size=_int("SEMANTIC_CACHE_SIZE", 20000),
+            semantic_cache_project_size=_int("SEMANTIC_CACHE_PROJECT_SIZE", 2000),
+            rate_limit_enabled=_flag("RATE_LIMIT_ENABLED", True),
+            rate_limit_backend=os.getenv("RATE_LIMIT_BACKEND", "memory"),
+            rate_limit_path=os.getenv("RATE_LIMIT_PATH", "cache/rate_limit.sqlite3"),
+            rate_limit_user_rate=_float("RATE_LIMIT_USER_RATE", 1),
+            rate_limit_user_burst=_float("RATE_LIMIT_USER_BURST", 20),
+            rate_limit_project_rate=_float("RATE_LIMIT_PROJECT_RATE", 2),
+            rate_limit_project_burst=_float("RATE_LIMIT_PROJECT_BURST", 40),
+            project_daily_token_budget=_int("PROJECT_DAILY_TOKEN_BUDGET", 0),
+            rate_limit_max_keys=_int("RATE_LIMIT_MAX_KEYS", 100000),
+            upload_dir=upload_dir,
+            upload_chunk_size=_int("UPLOAD_CHUNK_SIZE", 1024 * 1024),
+            upload_max_bytes=_int("UPLOAD_MAX_BYTES", 50 * 1024 * 1024),
+            project_quota_bytes=_int("PROJECT_QUOTA_BYTES", 1024 ** 3),
+            archive_batch_rows=_int("ARCHIVE_BATCH_ROWS", 1000),
+            archive_max_line=_int("ARCHIVE_MAX_LINE", 1024 * 1024),
+            archive_max_member=_int("ARCHIVE_MAX_MEMBER", 64 * 1024 * 1024),
+            vector_index_dir=os.getenv("VECTOR_INDEX_DIR", os.path.join(upload_dir, "index")),
+            embedder=os.getenv("EMBEDDER", "hashing"),
+            embedding_dim=_int("EMBEDDING_DIM", 256),
+            rag_chunk_chars=_int("RAG_CHUNK_CHARS", 800),
+            rag_chunk_overlap=_int("RAG_CHUNK_OVERLAP", 100),
+            rag_top_k=_int("RAG_TOP_K", 4),
+            rag_min_score=_float("RAG_MIN_SCORE", 0.02),
+            job_workers=_int("JOB_WORKERS", 2),
+            job_poll_interval=_float("JOB_POLL_INTERVAL", 2),
+            job_max_attempts=_int("JOB_MAX_ATTEMPTS", 3),
+            job_retry_base=_float("JOB_RETRY_BASE", 5),
+            job_retry_max=_float("JOB_RETRY_MAX", 300),
+            job_lease_seconds=_float("JOB_LEASE_SECONDS", 600),
+            job_retention_days=_float("JOB_RETENTION_DAYS", 7),
+            bcrypt_rounds=_int("BCRYPT_ROUNDS", 12),
+            hash_workers=_optional_int("HASH_WORKERS"),
+            hash_max_pending=_optional_int("HASH_MAX_PENDING"),
+            metrics_enabled=_flag("METRICS_ENABLED", True),
+            prometheus_multiproc_dir=os.getenv("PROMETHEUS_MULTIPROC_DIR"),
+            ws_auth_timeout=_float("WS_AUTH_TIMEOUT", 10),
+            ws_max_streams=_int("WS_MAX_STREAMS", 8),
+            ws_send_queue=_int("WS_SEND_QUEUE", 64),
+            ws_project_refresh=_float("WS_PROJECT_REFRESH", 5),
+            compress_min_size=_int("COMPRESS_MIN_SIZE", 1000),
+            gzip_level=_int("GZIP_LEVEL", 6),
+            brotli_quality=_int("BROTLI_QUALITY", 4),
+            bind=os.getenv("BIND") or f"0.0.0.0:{os.getenv('PORT', '8000')}",
+            web_concurrency=_int("WEB_CONCURRENCY", os.cpu_count() or 1),
+            shutdown_timeout=_float("SHUTDOWN_TIMEOUT", 30),
+            warmup=_flag("WARMUP", True),
+            db_warm_connections=_int("DB_WARM_CONNECTIONS", 2),
+        )
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """The process's settings; the environment is read on the first call only."""
+    return Settings.from_env()
@@ -2,13 +2,29 @@
 # File: create_tables.py
 # ---------------------------
 
-# Import database Base and engine
-from database import Base, engine
-import models  # Ensure all models (User, Project, Prompt) are imported
+import os
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+
+# Import database engine (DATABASE_URL)
+from database import engine
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
 
 # ---------------------------
-# Create tables in the database
+# Create or upgrade the schema through the migrations in migrations/versions
 # ---------------------------
-# This will create all tables based on the models defined in models.py
-Base.metadata.create_all(bind=engine)
-print("Tables created successfully!")
+def upgrade_database():
+    config = Config(ALEMBIC_INI)
+    tables = set(inspect(engine).get_table_names())
+    if "users" in tables and "alembic_version" not in tables:
+        # Created by create_all before migrations existed: it has at least the
+        # baseline tables, and revision 0002 adds whatever else is missing
+        command.stamp(config, "0001")
+    command.upgrade(config, "head")
+
+
+if __name__ == "__main__":
+    upgrade_database()
+    print("Tables created successfully!")
@@ -2,36 +2,128 @@
 # File: database.py
 # ---------------------------
 
-import os
-from sqlalchemy import create_engine
+import asyncio
+from contextlib import AsyncExitStack
+from sqlalchemy import MetaData, create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
+from config import get_settings
+from services.metrics import instrument_engine
+
+settings = get_settings()
+
+# ---------------------------
+# Database URL (DATABASE_URL)
+# ---------------------------
+DATABASE_URL = settings.database_url
 
 # ---------------------------
-# Load environment variables from .env
+# Connection pool settings (ignored for SQLite, which manages its own pool)
 # ---------------------------
-load_dotenv()
+DB_POOL_SIZE = settings.db_pool_size
+DB_MAX_OVERFLOW = settings.db_max_overflow
+DB_POOL_PRE_PING = settings.db_pool_pre_ping
+DB_POOL_RECYCLE = settings.db_pool_recycle
+
+
+def _engine_options(url: str) -> dict:
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
+
+
+def to_async_url(url: str) -> str:
+    """Map a sync DATABASE_URL to its async driver (asyncpg / aiosqlite)."""
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+
+# Async driver URL; override with ASYNC_DATABASE_URL (e.g. postgresql+psycopg://...)
+ASYNC_DATABASE_URL = settings.async_database_url or to_async_url(DATABASE_URL)
 
 # ---------------------------
-# Get database URL from environment variable
+# Create SQLAlchemy engines
 # ---------------------------
-DATABASE_URL = os.getenv("DATABASE_URL")
+# Sync engine: scripts (create_tables.py, migrations) and blocking helpers
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+
+# Async engine: used by every API route
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_engine_options(ASYNC_DATABASE_URL))
+
+# Query timing for /metrics (async engines emit events on their sync core)
+instrument_engine(engine, "sync")
+instrument_engine(async_engine.sync_engine, "async")
+
+
+# SQLite ignores foreign keys (and so ON DELETE CASCADE) unless asked, per connection
+def _sqlite_foreign_keys(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+for _engine in (engine, async_engine.sync_engine):
+    if _engine.dialect.name == "sqlite":
+        event.listen(_engine, "connect", _sqlite_foreign_keys)
 
 # ---------------------------
-# Create SQLAlchemy engine
+# Startup warm-up (app lifespan) and fork safety (gunicorn.conf.py)
 # ---------------------------
-engine = create_engine(DATABASE_URL)
+async def warm_pool(connections: int):
+    """
+    Open `connections` pooled connections at once and return them to the
+    pool, so the first requests after a start do not pay for the connect
+    (TCP, TLS and auth on Postgres).
+    """
+    async def checkout(stack: AsyncExitStack):
+        conn = await stack.enter_async_context(async_engine.connect())
+        await conn.exec_driver_sql("SELECT 1")
+
+    size = getattr(async_engine.pool, "size", None)  # Never wait on our own checkouts
+    if size is not None:
+        connections = min(connections, size())
+    async with AsyncExitStack() as stack:
+        await asyncio.gather(*(checkout(stack) for _ in range(connections)))
+
+
+def dispose_inherited_pools():
+    """
+    Drop connections a forked worker inherited from its parent, without
+    closing them (the parent still owns the sockets).
+    """
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+
 
 # ---------------------------
-# Create sessionmaker for database sessions
+# Create sessionmakers for database sessions
 # ---------------------------
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# expire_on_commit=False: objects stay readable after commit without a lazy (blocking) reload
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 # ---------------------------
 # Base class for models
 # ---------------------------
-Base = declarative_base()
+# Explicit constraint names, so migrations can drop and recreate them on every backend
+NAMING_CONVENTION = {
+    "ix": "ix_%(column_0_label)s",
+    "uq": "uq_%(table_name)s_%(column_0_name)s",
+    "fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s",
+    "pk": "pk_%(table_name)s",
+}
+Base = declarative_base(metadata=MetaData(naming_convention=NAMING_CONVENTION))
 
 # ---------------------------
 # Dependency for FastAPI routes to get DB session
@@ -42,3 +134,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,61 @@
+# ---------------------------
+# File: gunicorn.conf.py
+# ---------------------------
+# Production entry point:
+#
+#     gunicorn main:app
+#
+# WEB_CONCURRENCY uvicorn workers (default: one per core) on BIND (default
+# 0.0.0.0:$PORT or :8000). The app is imported once in the master and
+# forked; each worker then runs the lifespan (DB, LLM and hashing pools,
+# job workers). On SIGTERM a worker stops accepting connections, lets
+# in-flight requests (streamed chats included) finish for up to
+# SHUTDOWN_TIMEOUT seconds, then runs the lifespan shutdown.
+
+import os
+from uvicorn_worker import UvicornWorker
+from config import get_settings
+
+settings = get_settings()
+
+bind = settings.bind
+workers = settings.web_concurrency
+preload_app = True  # Import once in the master; workers share the pages copy-on-write
+
+# bcrypt processes per worker, so all workers together use about one per core
+hash_workers = settings.hash_workers or max(1, (os.cpu_count() or 1) // workers)
+
+
+class Worker(UvicornWorker):
+    # Bound uvicorn's drain: without it, a stuck request would keep the
+    # worker until gunicorn kills it and the lifespan shutdown never runs.
+    # The sans-I/O WebSocket protocol holds an idle /chat/ws connection in
+    # about half the memory of the default one (benchmarks/ws_load.py)
+    CONFIG_KWARGS = {
+        **UvicornWorker.CONFIG_KWARGS,
+        "timeout_graceful_shutdown": settings.shutdown_timeout,
+        "ws": "websockets-sansio",
+    }
+
+
+worker_class = Worker
+graceful_timeout = int(settings.shutdown_timeout) + 10  # Drain, then the lifespan shutdown, then SIGKILL
+timeout = 60  # Seconds without a heartbeat before a worker is restarted
+keepalive = 5
+accesslog = "-"
+
+
+def post_fork(server, worker):
+    # Connections opened in the master (e.g. by an import-time query) must
+    # not be shared with the children
+    import database
+    from services import hashing
+    database.dispose_inherited_pools()
+    hashing.configure(hash_workers)
+
+
+def child_exit(server, worker):
+    # Drop the dead worker's live gauges from /metrics (prometheus multiprocess mode)
+    if settings.prometheus_multiproc_dir:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -2,14 +2,60 @@
 # File: main.py
 # ---------------------------
 
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware  # Added for CORS support
-from routers import auth, projects, prompts, chat
+from config import get_settings
+from database import async_engine, warm_pool
+from routers import auth, projects, prompts, chat, jobs
+from services import hashing, llm_client, llm_gateway, metrics, jobs as job_queue
+from services.compression import CompressionMiddleware
+
+settings = get_settings()
+
+# ---------------------------
+# Startup warm-up: pay connection and process start-up before the first request
+# ---------------------------
+async def warm_up():
+    await asyncio.gather(
+        warm_pool(settings.db_warm_connections),
+        llm_client.warm_connections(provider.url for provider in llm_gateway.PROVIDERS.values()),
+        hashing.warm_pool(),
+    )
+
+# ---------------------------
+# App lifespan: shared resources live for the whole process
+# ---------------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await llm_client.start_client()  # Keep-alive pool for the upstream LLM
+    hashing.start_pool()             # bcrypt process pool
+    if settings.warmup:
+        await warm_up()
+    await job_queue.start_workers()       # Background job workers (uploads post-processing, bulk ops)
+    try:
+        yield
+    finally:
+        await job_queue.stop_workers()    # Running jobs go back to the queue
+        await llm_client.close_client()
+        hashing.stop_pool()
+        await async_engine.dispose()  # Close pooled DB connections
 
 # ---------------------------
 # Initialize FastAPI app
 # ---------------------------
-app = FastAPI(title="Chatbot Platform")
+app = FastAPI(title="Chatbot Platform", lifespan=lifespan)
+
+# ---------------------------
+# Compress large responses (gzip, or brotli when installed)
+# ---------------------------
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.compress_min_size,
+    gzip_level=settings.gzip_level,
+    brotli_quality=settings.brotli_quality,
+)
 
 # ---------------------------
 # Enable CORS for frontend
@@ -21,8 +67,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],  # Pagination cursor and validator of list/detail reads
 )
 
+# ---------------------------
+# Request metrics (outermost, so latency covers CORS and error handling too)
+# ---------------------------
+if metrics.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
 # ---------------------------
 # Include routers for API endpoints
 # ---------------------------
@@ -30,6 +83,7 @@ app.include_router(auth.router, prefix="/auth", tags=["Auth"])
 app.include_router(projects.router, prefix="/projects", tags=["Projects"])
 app.include_router(prompts.router, prefix="/prompts", tags=["Prompts"])
 app.include_router(chat.router, prefix="/chat", tags=["Chat"])
+app.include_router(jobs.router, prefix="/jobs", tags=["Jobs"])
 
 # ---------------------------
 # Root endpoint to test server
@@ -37,3 +91,13 @@ app.include_router(chat.router, prefix="/chat", tags=["Chat"])
 @app.get("/")
 def root():
     return {"message": "Chatbot Platform API is running"}
+
+# ---------------------------
+# Prometheus scrape endpoint
+# ---------------------------
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint():
+    if not metrics.METRICS_ENABLED:
+        return Response(status_code=404)
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
@@ -0,0 +1,72 @@
+# ---------------------------
+# File: migrations/env.py
+# ---------------------------
+
+from logging.config import fileConfig
+from alembic import context
+from database import Base, engine
+import models  # Register every table on Base.metadata (for --autogenerate)
+
+config = context.config
+if config.config_file_name is not None and config.attributes.get("configure_logging", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    """
+    Leave the full-text search objects of revision 0004 out of autogenerate:
+    they are created with raw DDL and not declared on the models (FTS5
+    tables and their shadow tables on SQLite, search_vector on Postgres).
+    """
+    if reflected and compare_to is None:
+        if type_ == "table" and "_fts" in name:
+            return False
+        if type_ == "column" and name == "search_vector":
+            return False
+        if type_ == "index" and name.endswith("_search_vector"):
+            return False
+    return True
+
+
+def run_migrations_offline():
+    """Emit SQL to stdout (alembic upgrade head --sql) instead of connecting."""
+    context.configure(
+        url=engine.url.render_as_string(hide_password=False),
+        target_metadata=target_metadata,
+        include_object=include_object,
+        literal_binds=True,
+        render_as_batch=engine.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    with engine.connect() as connection:
+        sqlite = connection.dialect.name == "sqlite"
+        if sqlite:
+            # Batch migrations rebuild tables (copy, drop, rename); with foreign
+            # keys on, dropping the old table would cascade into its children
+            connection.exec_driver_sql("PRAGMA foreign_keys=OFF")
+            connection.commit()
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+            render_as_batch=sqlite,  # SQLite cannot ALTER constraints in place
+        )
+        try:
+            with context.begin_transaction():
+                context.run_migrations()
+        finally:
+            if sqlite:
+                connection.exec_driver_sql("PRAGMA foreign_keys=ON")
+                connection.commit()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,137 @@
+"""Conversations, uploads, file chunks, jobs and the user/project settings columns
+
+Databases created by create_tables.py before migrations existed may already
+have any subset of these, so every table, column and index is created only
+if it is missing.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+NEW_COLUMNS = {
+    "users": [
+        sa.Column("token_version", sa.Integer(), nullable=False, server_default="0"),
+    ],
+    "projects": [
+        sa.Column("cache_enabled", sa.Boolean(), nullable=False, server_default=sa.true()),
+        sa.Column("llm_providers", sa.JSON(), nullable=True),
+        sa.Column("model", sa.String(), nullable=True),
+        sa.Column("temperature", sa.Float(), nullable=True),
+        sa.Column("max_tokens", sa.Integer(), nullable=True),
+        sa.Column("system_prompt", sa.Text(), nullable=True),
+        sa.Column("prompt_version", sa.Integer(), nullable=False, server_default="0"),
+    ],
+}
+
+# (name, table, columns, unique)
+NEW_INDEXES = [
+    ("ix_conversations_id", "conversations", ["id"], False),
+    ("ix_conversations_project_id", "conversations", ["project_id"], False),
+    ("ix_messages_id", "messages", ["id"], False),
+    ("ix_messages_conversation_id_created_at", "messages", ["conversation_id", "created_at"], False),
+    ("ix_messages_project_id_created_at", "messages", ["project_id", "created_at"], False),
+    ("ix_uploaded_files_id", "uploaded_files", ["id"], False),
+    ("ix_uploaded_files_sha256", "uploaded_files", ["sha256"], False),
+    ("ix_uploaded_files_project_id_kind_created_at", "uploaded_files", ["project_id", "kind", "created_at"], False),
+    ("ix_file_chunks_id", "file_chunks", ["id"], False),
+    ("ix_file_chunks_project_id", "file_chunks", ["project_id"], False),
+    ("ix_file_chunks_file_id", "file_chunks", ["file_id"], False),
+    ("ix_jobs_id", "jobs", ["id"], False),
+    ("ix_jobs_status_run_after", "jobs", ["status", "run_after"], False),
+]
+
+
+def _create_tables():
+    yield "conversations", [
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("project_id", sa.Integer(), sa.ForeignKey("projects.id"), nullable=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    ]
+    yield "messages", [
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("conversation_id", sa.Integer(), sa.ForeignKey("conversations.id"), nullable=False),
+        sa.Column("project_id", sa.Integer(), sa.ForeignKey("projects.id"), nullable=False),
+        sa.Column("role", sa.String(16), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    ]
+    yield "uploaded_files", [
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("project_id", sa.Integer(), sa.ForeignKey("projects.id"), nullable=False),
+        sa.Column("kind", sa.String(16), nullable=False),
+        sa.Column("filename", sa.String(), nullable=False),
+        sa.Column("sha256", sa.String(64), nullable=False),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.Column("content_type", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    ]
+    yield "file_chunks", [
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("project_id", sa.Integer(), sa.ForeignKey("projects.id"), nullable=False),
+        sa.Column("file_id", sa.Integer(), sa.ForeignKey("uploaded_files.id"), nullable=False),
+        sa.Column("position", sa.Integer(), nullable=False),
+        sa.Column("text", sa.Text(), nullable=False),
+    ]
+    yield "jobs", [
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("kind", sa.String(64), nullable=False),
+        sa.Column("payload", sa.Text(), nullable=False),
+        sa.Column("status", sa.String(16), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("max_attempts", sa.Integer(), nullable=False),
+        sa.Column("run_after", sa.DateTime(), nullable=False),
+        sa.Column("locked_until", sa.DateTime(), nullable=True),
+        sa.Column("result", sa.Text(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    ]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    for table, columns in NEW_COLUMNS.items():
+        existing = {column["name"] for column in inspector.get_columns(table)}
+        missing = [column for column in columns if column.name not in existing]
+        if missing:
+            with op.batch_alter_table(table) as batch:
+                for column in missing:
+                    batch.add_column(column)
+
+    for table, columns in _create_tables():
+        if table not in tables:
+            op.create_table(table, *columns)
+
+    inspector = sa.inspect(op.get_bind())
+    for name, table, columns, unique in NEW_INDEXES:
+        if name not in {index["name"] for index in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns, unique=unique)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ("jobs", "file_chunks", "uploaded_files", "messages", "conversations"):
+        op.drop_table(table)
+    for table, columns in NEW_COLUMNS.items():
+        with op.batch_alter_table(table) as batch:
+            for column in columns:
+                batch.drop_column(column.name)
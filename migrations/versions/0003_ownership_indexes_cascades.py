@@ -0,0 +1,68 @@
+"""Ownership-check indexes and ON DELETE CASCADE on every foreign key
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# table -> [(column, referred table)]
+FOREIGN_KEYS = {
+    "projects": [("user_id", "users")],
+    "prompts": [("project_id", "projects")],
+    "conversations": [("project_id", "projects"), ("user_id", "users")],
+    "messages": [("conversation_id", "conversations"), ("project_id", "projects")],
+    "uploaded_files": [("project_id", "projects")],
+    "file_chunks": [("project_id", "projects"), ("file_id", "uploaded_files")],
+    "jobs": [("user_id", "users")],
+}
+
+# Same convention as database.NAMING_CONVENTION; on SQLite it also names the
+# reflected (unnamed) foreign keys so they can be dropped
+NAMING = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+
+INDEXES = [
+    ("ix_projects_user_id_id", "projects", ["user_id", "id"]),
+    ("ix_projects_user_id_created_at", "projects", ["user_id", "created_at"]),
+    ("ix_prompts_project_id_created_at", "prompts", ["project_id", "created_at"]),
+]
+
+
+def _replace_foreign_keys(ondelete: str | None):
+    inspector = sa.inspect(op.get_bind())
+    for table, keys in FOREIGN_KEYS.items():
+        reflected = inspector.get_foreign_keys(table)
+        with op.batch_alter_table(table, naming_convention=NAMING) as batch:
+            for column, referred in keys:
+                name = f"fk_{table}_{column}_{referred}"
+                for fk in reflected:
+                    if fk["constrained_columns"] == [column]:
+                        # Postgres keeps the names create_all gave them (e.g. prompts_project_id_fkey)
+                        batch.drop_constraint(fk["name"] or name, type_="foreignkey")
+                batch.create_foreign_key(name, referred, [column], ["id"], ondelete=ondelete)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _replace_foreign_keys("CASCADE")
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, _ in INDEXES:
+        op.drop_index(name, table_name=table)
+    _replace_foreign_keys(None)
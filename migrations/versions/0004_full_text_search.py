@@ -0,0 +1,91 @@
+"""Full-text indexes over prompts, chat messages and uploaded file text
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+
+SQLite: an external-content FTS5 table per source table, kept in step by
+AFTER INSERT/UPDATE/DELETE triggers (which also fire for bulk statements
+and ON DELETE CASCADE). A later batch migration that rebuilds one of
+these tables drops its triggers with it and must recreate them.
+
+Postgres: a stored generated tsvector column with a GIN index, which the
+server maintains on every write.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, Sequence[str], None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# table -> indexed text column (searched through services.search.ranked_page)
+SOURCES = {
+    "prompts": "text",
+    "messages": "content",
+    "file_chunks": "text",
+}
+
+# Text search configuration on Postgres (same as services.search.TS_CONFIG)
+TS_CONFIG = "english"
+
+
+def _sqlite_upgrade(table: str, column: str):
+    fts = f"{table}_fts"
+    # porter stemming, like the "english" configuration on Postgres
+    op.execute(
+        f"CREATE VIRTUAL TABLE {fts} USING fts5("
+        f"{column}, content='{table}', content_rowid='id', tokenize='porter unicode61')"
+    )
+    op.execute(
+        f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column}); END"
+    )
+    op.execute(
+        f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column}); END"
+    )
+    op.execute(
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {column} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column}); "
+        f"INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column}); END"
+    )
+    # Index the rows that already exist
+    op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def _sqlite_downgrade(table: str):
+    fts = f"{table}_fts"
+    for suffix in ("ai", "ad", "au"):
+        op.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+    op.execute(f"DROP TABLE IF EXISTS {fts}")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_context().dialect.name
+    for table, column in SOURCES.items():
+        if dialect == "sqlite":
+            _sqlite_upgrade(table, column)
+        elif dialect == "postgresql":
+            op.execute(
+                f"ALTER TABLE {table} ADD COLUMN search_vector tsvector "
+                f"GENERATED ALWAYS AS (to_tsvector('{TS_CONFIG}', coalesce({column}, ''))) STORED"
+            )
+            op.create_index(f"ix_{table}_search_vector", table, ["search_vector"], postgresql_using="gin")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_context().dialect.name
+    for table in SOURCES:
+        if dialect == "sqlite":
+            _sqlite_downgrade(table)
+        elif dialect == "postgresql":
+            op.drop_index(f"ix_{table}_search_vector", table_name=table)
+            op.drop_column(table, "search_vector")
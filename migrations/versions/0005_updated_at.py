@@ -0,0 +1,42 @@
+"""updated_at on projects and prompts, for ETags of read endpoints
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+
+Plain ADD COLUMN (no batch table rebuild), so the FTS5 triggers of 0004
+on prompts stay in place.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, Sequence[str], None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# table -> column the new (<column>, updated_at) index leads with
+TABLES = {
+    "projects": "user_id",
+    "prompts": "project_id",
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, owner in TABLES.items():
+        op.add_column(table, sa.Column("updated_at", sa.DateTime(), nullable=True))
+        op.execute(f"UPDATE {table} SET updated_at = created_at")
+        op.create_index(f"ix_{table}_{owner}_updated_at", table, [owner, "updated_at"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, owner in TABLES.items():
+        op.drop_index(f"ix_{table}_{owner}_updated_at", table_name=table)
+        op.drop_column(table, "updated_at")  # Native DROP COLUMN on SQLite >= 3.35
@@ -0,0 +1,61 @@
+"""Never reuse file_chunks ids (AUTOINCREMENT on SQLite)
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+
+The vector index of a project refers to chunks by id and may keep rows of
+deleted chunks; a reused id would make them match another file's text.
+A plain INTEGER PRIMARY KEY on SQLite hands out max(id) + 1, so the
+table is rebuilt with AUTOINCREMENT. The rebuild drops the FTS5 triggers
+of 0004 on file_chunks, which are recreated; ids are copied, so the
+external-content FTS table itself stays valid.
+
+Postgres: serial sequences never reuse ids; nothing to do.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, Sequence[str], None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _create_fts_triggers():
+    """The triggers of 0004 for file_chunks.text."""
+    op.execute(
+        "CREATE TRIGGER file_chunks_fts_ai AFTER INSERT ON file_chunks BEGIN "
+        "INSERT INTO file_chunks_fts(rowid, text) VALUES (new.id, new.text); END"
+    )
+    op.execute(
+        "CREATE TRIGGER file_chunks_fts_ad AFTER DELETE ON file_chunks BEGIN "
+        "INSERT INTO file_chunks_fts(file_chunks_fts, rowid, text) VALUES ('delete', old.id, old.text); END"
+    )
+    op.execute(
+        "CREATE TRIGGER file_chunks_fts_au AFTER UPDATE OF text ON file_chunks BEGIN "
+        "INSERT INTO file_chunks_fts(file_chunks_fts, rowid, text) VALUES ('delete', old.id, old.text); "
+        "INSERT INTO file_chunks_fts(rowid, text) VALUES (new.id, new.text); END"
+    )
+
+
+def _rebuild(autoincrement: bool):
+    with op.batch_alter_table("file_chunks", recreate="always",
+                              table_kwargs={"sqlite_autoincrement": autoincrement}):
+        pass
+    _create_fts_triggers()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_context().dialect.name == "sqlite":
+        _rebuild(autoincrement=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_context().dialect.name == "sqlite":
+        _rebuild(autoincrement=False)
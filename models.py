@@ -2,7 +2,7 @@
 # File: models.py
 # ---------------------------
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import BigInteger, Boolean, Column, Float, Integer, JSON, String, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -17,10 +17,11 @@ class User(Base):
     name = Column(String, nullable=False)
     email = Column(String, unique=True, index=True, nullable=False)
     password_hash = Column(String, nullable=False)  # Store hashed password
+    token_version = Column(Integer, nullable=False, default=0)  # Bump to revoke issued tokens
     created_at = Column(DateTime, default=datetime.utcnow)
 
-    # Relationship: One user can have multiple projects
-    projects = relationship("Project", backref="user")
+    # Relationship: One user can have multiple projects (removed by the database's ON DELETE CASCADE)
+    projects = relationship("Project", backref="user", passive_deletes=True)
 
 
 # ---------------------------
@@ -32,11 +33,27 @@ class Project(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     description = Column(Text, nullable=True)
-    user_id = Column(Integer, ForeignKey("users.id"))  # Link project to user
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))  # Link project to user
+    cache_enabled = Column(Boolean, nullable=False, default=True)  # Allow cached chat replies
+    llm_providers = Column(JSON, nullable=True)  # Ordered provider names (or {"name", "model"}); None = all
+    model = Column(String, nullable=True)  # Upstream model; None = CHAT_MODEL
+    temperature = Column(Float, nullable=True)  # None = provider default
+    max_tokens = Column(Integer, nullable=True)  # Reply length cap; None = CHAT_MAX_TOKENS
+    system_prompt = Column(Text, nullable=True)  # Sent before the project's Prompt rows
+    prompt_version = Column(Integer, nullable=False, default=0)  # Bumped when the compiled prompt changes
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # ETags of project reads
 
-    # Relationship: One project can have multiple prompts
-    prompts = relationship("Prompt", backref="project")
+    # Relationship: One project can have multiple prompts (removed by the database's ON DELETE CASCADE)
+    prompts = relationship("Prompt", backref="project", passive_deletes=True)
+
+    # Every route checks ownership with (id, user_id); listings scan a user's projects by created_at
+    # and answer conditional GETs from count/max(updated_at) over (user_id, updated_at)
+    __table_args__ = (
+        Index("ix_projects_user_id_id", "user_id", "id"),
+        Index("ix_projects_user_id_created_at", "user_id", "created_at"),
+        Index("ix_projects_user_id_updated_at", "user_id", "updated_at"),
+    )
 
 
 # ---------------------------
@@ -47,5 +64,110 @@ class Prompt(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     text = Column(Text, nullable=False)
-    project_id = Column(Integer, ForeignKey("projects.id"))  # Link prompt to project
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"))  # Link prompt to project
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # ETags of prompt reads
+
+    # A project's prompts are read oldest first (prompt cache, listings);
+    # conditional GETs read count/max(updated_at) from (project_id, updated_at) alone
+    __table_args__ = (
+        Index("ix_prompts_project_id_created_at", "project_id", "created_at"),
+        Index("ix_prompts_project_id_updated_at", "project_id", "updated_at"),
+    )
+
+
+# ---------------------------
+# Conversation model
+# ---------------------------
+class Conversation(Base):
+    __tablename__ = "conversations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), index=True)  # Conversation belongs to a project
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))  # User who started it
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+# ---------------------------
+# Message model (append-only chat log)
+# ---------------------------
+class Message(Base):
+    __tablename__ = "messages"
+
+    id = Column(Integer, primary_key=True, index=True)
+    conversation_id = Column(Integer, ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)  # Denormalised for per-project scans
+    role = Column(String(16), nullable=False)  # "user" or "assistant"
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Recent turns are read newest-first with a LIMIT, so both logs are
+    # range-scanned on (owner, created_at) instead of sorting full history
+    __table_args__ = (
+        Index("ix_messages_conversation_id_created_at", "conversation_id", "created_at"),
+        Index("ix_messages_project_id_created_at", "project_id", "created_at"),
+    )
+
+
+# ---------------------------
+# Uploaded file model (metadata for content-addressed blobs)
+# ---------------------------
+class UploadedFile(Base):
+    __tablename__ = "uploaded_files"
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String(16), nullable=False, default="project")  # "project" or "chat" upload
+    filename = Column(String, nullable=False)  # Name as uploaded by the client
+    sha256 = Column(String(64), nullable=False, index=True)  # Blob key in the file store
+    size = Column(BigInteger, nullable=False)
+    content_type = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Listing a project's files is a range scan, never a directory walk
+    __table_args__ = (
+        Index("ix_uploaded_files_project_id_kind_created_at", "project_id", "kind", "created_at"),
+    )
+
+
+# ---------------------------
+# File chunk model (text pieces of uploads, embedded in the project's vector index)
+# ---------------------------
+class FileChunk(Base):
+    __tablename__ = "file_chunks"
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True)
+    file_id = Column(Integer, ForeignKey("uploaded_files.id", ondelete="CASCADE"), nullable=False, index=True)
+    position = Column(Integer, nullable=False)  # Order of the chunk within its file
+    text = Column(Text, nullable=False)
+
+    # Ids are never reused (AUTOINCREMENT on SQLite): the vector index may
+    # still hold rows of deleted chunks, which must not match newer ones
+    __table_args__ = {"sqlite_autoincrement": True}
+
+
+# ---------------------------
+# Job model (background work queued by API calls, survives restarts)
+# ---------------------------
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True)  # Owner allowed to read its status
+    kind = Column(String(64), nullable=False)  # Handler name, e.g. "ingest_file"
+    payload = Column(Text, nullable=False, default="{}")  # JSON arguments for the handler
+    status = Column(String(16), nullable=False, default="queued")  # queued, running, succeeded, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_after = Column(DateTime, nullable=False, default=datetime.utcnow)  # Not picked up before this (backoff)
+    locked_until = Column(DateTime, nullable=True)  # Lease of the worker running it
+    result = Column(Text, nullable=True)  # JSON return value of the handler
+    error = Column(Text, nullable=True)  # Last failure message
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Workers poll for the oldest due job in a status
+    __table_args__ = (
+        Index("ix_jobs_status_run_after", "status", "run_after"),
+    )
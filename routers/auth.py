@@ -1,24 +1,43 @@
 # routers/auth.py
 
-import os
+import logging
+import threading
+import time
 from fastapi import APIRouter, Depends, HTTPException  # FastAPI classes for routing, dependency injection, and errors
 from pydantic import BaseModel, EmailStr               # Pydantic for request data validation
-from sqlalchemy.orm import Session                     # SQLAlchemy session type
-from passlib.hash import bcrypt                        # For hashing passwords securely
-from jose import jwt                                   # For creating and decoding JWT tokens
-from database import get_db                            # Function to get a DB session
+from sqlalchemy import select                          # SQLAlchemy 2.0 query construct
+from sqlalchemy.ext.asyncio import AsyncSession        # Async SQLAlchemy session type
+from jose import jwt, JWTError                         # For creating and decoding JWT tokens
+from database import get_async_db, AsyncSessionLocal   # Async DB session dependency and factory
 from models import User                                # User model from SQLAlchemy
-from dotenv import load_dotenv                         # Load environment variables from .env file
+from services.principal_cache import Principal, PrincipalCache  # Cached caller identity
+from services import hashing                           # bcrypt on a process pool
+from services.metrics import AUTH_FAILURES             # Rejected-token counter
+from config import get_settings                        # Typed settings, read once per process
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials  # For token-based auth
 
-# Load environment variables from .env
-load_dotenv()
+settings = get_settings()
 
-# Get the secret key for JWT from environment variables
-SECRET_KEY = os.getenv("SECRET_KEY")
+# Secret key for signing JWTs (SECRET_KEY)
+SECRET_KEY = settings.secret_key
+
+# Token lifetime; every issued token carries an `exp` claim
+ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
+
+# When enabled, the caller is built from token claims alone (no DB lookup).
+# Revocation then relies on token expiry plus this process's revocation list.
+AUTH_STATELESS = settings.auth_stateless
+
+# Resolved callers, keyed by (user_id, token)
+principal_cache = PrincipalCache(maxsize=settings.auth_cache_size, ttl=settings.auth_cache_ttl)
+
+# user_id -> lowest token_version still accepted (filled by logout)
+_min_token_version: dict[int, int] = {}
+_revocation_lock = threading.Lock()
 
 # Create a FastAPI router for auth-related routes
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 # -----------------------------
 # Pydantic Schemas for validation
@@ -39,55 +58,122 @@ class LoginSchema(BaseModel):
 # Use HTTP Bearer scheme for token-based authentication
 bearer_scheme = HTTPBearer()
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),  # Automatically get token from request
-    db: Session = Depends(get_db)                                       # DB session dependency
-):
+def create_access_token(user: User) -> str:
+    """Issue a signed token carrying the claims needed for the fast auth path."""
+    now = int(time.time())
+    claims = {
+        "user_id": user.id,
+        "name": user.name,
+        "tv": user.token_version or 0,  # Bumped by logout to revoke older tokens
+        "iat": now,
+        "exp": now + ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
+    return jwt.encode(claims, SECRET_KEY, algorithm="HS256")
+
+def invalidate_user(user_id: int, token_version: int | None = None):
     """
-    Decode JWT token and return the current logged-in user.
-    Raises 401 if token is invalid or user does not exist.
+    Forget cached principals for a user. Pass the user's new token_version
+    to also reject older tokens in stateless mode.
+    """
+    principal_cache.invalidate_user(user_id)
+    if token_version is not None:
+        with _revocation_lock:
+            _min_token_version[user_id] = max(_min_token_version.get(user_id, 0), token_version)
+
+async def _load_principal(user_id: int, token_version: int) -> Principal | None:
+    """Fetch the user row and check the token has not been revoked."""
+    async with AsyncSessionLocal() as db:
+        row = (await db.execute(
+            select(User.id, User.name, User.token_version).where(User.id == user_id)
+        )).first()
+    if not row or (row.token_version or 0) != token_version:
+        return None
+    return Principal(id=row.id, name=row.name, token_version=token_version)
+
+async def resolve_token(token: str) -> tuple[Principal, int]:
+    """
+    The caller a bearer token belongs to, and the token's `exp` claim.
+    Cached per (user_id, token); only a cache miss touches the database.
+    Raises 401 if token is invalid, expired, revoked or the user does not exist.
     """
-    token = credentials.credentials  # Extract token string from header
     try:
-        # Decode token using SECRET_KEY and HS256 algorithm
-        payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+        # Decode token using SECRET_KEY and HS256 algorithm; rejects expired tokens
+        payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"], options={"require_exp": True})
+        user_id = int(payload["user_id"])
+        token_version = int(payload.get("tv", 0))
+        expires = int(payload["exp"])
+    except (JWTError, KeyError, TypeError, ValueError) as e:
+        logger.debug("Token decode error: %s", e)
+        AUTH_FAILURES.labels("invalid_token").inc()
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    if token_version < _min_token_version.get(user_id, 0):
+        AUTH_FAILURES.labels("revoked").inc()
+        raise HTTPException(status_code=401, detail="Token revoked")
+
+    # Stateless mode: trust the signed claims, skip the lookup entirely
+    if AUTH_STATELESS and "name" in payload:
+        return Principal(id=user_id, name=payload["name"], token_version=token_version), expires
 
-        # Query user from database
-        user = db.query(User).filter(User.id == payload["user_id"]).first()
-        if not user:
-            # If user not found, raise HTTP 401
+    principal = principal_cache.get(user_id, token)
+    if principal is None:
+        principal = await _load_principal(user_id, token_version)
+        if principal is None:
+            # If user not found or token revoked, raise HTTP 401
+            AUTH_FAILURES.labels("unknown_user").inc()
             raise HTTPException(status_code=401, detail="Invalid authentication")
-        return user  # Return the user object
-    except Exception as e:
-        print("Token decode error:", e)  # Debugging print
-        raise HTTPException(status_code=401, detail="Invalid token")
+        principal_cache.put(user_id, token, principal, token_exp=expires)
+    return principal, expires
+
+def is_revoked(principal: Principal) -> bool:
+    """True once this process has seen a logout for the principal's token (in-memory check)."""
+    return principal.token_version < _min_token_version.get(principal.id, 0)
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),  # Automatically get token from request
+) -> Principal:
+    """
+    Decode JWT token and return the current logged-in user.
+    Raises 401 if token is invalid, expired, revoked or the user does not exist.
+    """
+    principal, _ = await resolve_token(credentials.credentials)
+    return principal
+
+def _hashing_busy():
+    return HTTPException(status_code=503, detail="Server busy, retry shortly", headers={"Retry-After": "1"})
 
 # -----------------------------
 # User Registration Endpoint
 # -----------------------------
 @router.post("/register")
-def register(data: RegisterSchema, db: Session = Depends(get_db)):
+async def register(data: RegisterSchema, db: AsyncSession = Depends(get_async_db)):
     """
     Register a new user.
     Checks if email exists, hashes password, saves user in database.
     Returns user ID on success.
     """
     # Check if email already exists in DB
-    existing = db.query(User).filter(User.email == data.email).first()
+    existing = await db.scalar(select(User.id).where(User.email == data.email))
     if existing:
         raise HTTPException(status_code=400, detail="Email already exists")
 
-    # Create new User object and hash password
+    # Hash the password on the process pool (answers 503 when the queue is full)
+    try:
+        password_hash = await hashing.hash_password(data.password)
+    except hashing.HashingBusy:
+        raise _hashing_busy()
+
+    # Create new User object with the hashed password
     user = User(
         name=data.name,
         email=data.email,
-        password_hash=bcrypt.hash(data.password)  # Hash the password
+        password_hash=password_hash
     )
 
     # Add to DB and commit transaction
     db.add(user)
-    db.commit()
-    db.refresh(user)  # Refresh user to get ID from DB
+    await db.commit()
+    await db.refresh(user)  # Refresh user to get ID from DB
 
     # Return success response with user ID
     return {"message": "User registered successfully", "user_id": user.id}
@@ -96,20 +182,55 @@ def register(data: RegisterSchema, db: Session = Depends(get_db)):
 # User Login Endpoint
 # -----------------------------
 @router.post("/login")
-def login(data: LoginSchema, db: Session = Depends(get_db)):
+async def login(data: LoginSchema, db: AsyncSession = Depends(get_async_db)):
     """
     Login a user.
     Verifies email and password, returns JWT token if valid.
+    Re-hashes the password when BCRYPT_ROUNDS has changed since it was stored.
     """
     # Fetch user from DB by email
-    user = db.query(User).filter(User.email == data.email).first()
+    user = await db.scalar(select(User).where(User.email == data.email))
+    if not user:
+        raise HTTPException(status_code=400, detail="Invalid credentials")
 
-    # Check if user exists and password is correct
-    if not user or not bcrypt.verify(data.password, user.password_hash):
+    # Check password is correct on the process pool
+    try:
+        valid, new_hash = await hashing.verify_password(data.password, user.password_hash)
+    except hashing.HashingBusy:
+        raise _hashing_busy()
+    if not valid:
         raise HTTPException(status_code=400, detail="Invalid credentials")
 
-    # Encode JWT token with user ID
-    token = jwt.encode({"user_id": user.id}, SECRET_KEY, algorithm="HS256")
+    # Transparently upgrade the stored hash to the current work factor
+    if new_hash:
+        user.password_hash = new_hash
+        await db.commit()
+
+    # Encode JWT token with user ID, name and expiry
+    token = create_access_token(user)
 
     # Return token to client
-    return {"access_token": token}
+    return {"access_token": token, "token_type": "bearer", "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60}
+
+# -----------------------------
+# User Logout Endpoint
+# -----------------------------
+@router.post("/logout")
+async def logout(
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Revoke every token issued to the current user so far.
+    Bumps the user's token_version and drops cached principals.
+    """
+    user = await db.get(User, current_user.id)
+    if user is None:
+        # Stateless tokens outlive their user: nothing left to revoke
+        AUTH_FAILURES.labels("unknown_user").inc()
+        raise HTTPException(status_code=401, detail="Invalid authentication")
+    user.token_version = (user.token_version or 0) + 1
+    await db.commit()
+
+    invalidate_user(user.id, user.token_version)
+    return {"message": "Logged out successfully"}
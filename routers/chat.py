@@ -2,19 +2,41 @@
 # File: routers/chat.py
 # ---------------------------
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from pydantic import BaseModel
-from sqlalchemy.orm import Session
-from database import get_db
-from models import Project, User
-from .auth import get_current_user
-import os, requests, shutil
-from dotenv import load_dotenv
-
-# Load environment variables from .env
-load_dotenv()
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import get_settings
+from database import get_async_db, AsyncSessionLocal
+from models import Conversation, FileChunk, Message, Project, UploadedFile
+from .auth import get_current_user, is_revoked, resolve_token
+from .ownership import get_owned_project, load_owned_project
+from services.principal_cache import Principal
+from services import file_store, ingest, jobs, llm_gateway, search
+from services.completion_cache import cache_key, completion_cache
+from services.pagination import clamp_limit, keyset_page, split_page
+from services.prompt_builder import build_messages, estimate_tokens, load_recent_messages
+from services.prompt_cache import prompt_cache
+from services.metrics import WS_CONNECTIONS
+from services.rate_limit import RateLimited, rate_limiter
+from services.semantic_cache import semantic_cache
+from services.ws_channel import Channel, StreamRejected
+from datetime import datetime
+import anyio, asyncio, httpx, json, logging, time
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+CHAT_BATCH_MAX = settings.chat_batch_max                  # Messages per /chat/batch request
+CHAT_BATCH_CONCURRENCY = settings.chat_batch_concurrency  # Upstream calls in flight per batch
+CHAT_MODEL = settings.chat_model                          # Model for projects that set none
+CHAT_MAX_TOKENS = settings.chat_max_tokens                # Reply cap for projects that set none
+WS_AUTH_TIMEOUT = settings.ws_auth_timeout                # Seconds a new /chat/ws connection has to authenticate
+WS_MAX_STREAMS = settings.ws_max_streams                  # Turns in progress per /chat/ws connection
+WS_SEND_QUEUE = settings.ws_send_queue                    # Frames buffered per connection before producers wait
+WS_PROJECT_REFRESH = settings.ws_project_refresh          # Seconds the connection's project row is reused
 
 # ---------------------------
 # Pydantic schema for Chat messages
@@ -22,124 +44,591 @@ router = APIRouter()
 class ChatSchema(BaseModel):
     project_id: int  # ID of the project associated with the chat
     message: str     # User's chat message
+    conversation_id: int | None = None  # Continue a conversation; a new one is started if omitted
+
+class ChatFrame(BaseModel):
+    id: str | int    # Client-chosen tag, echoed on every frame of this turn
+    message: str     # User's chat message
+    conversation_id: int | None = None  # Continue a conversation; a new one is started if omitted
+    window: int | None = Field(default=None, ge=1)  # Deltas sent before waiting for credit; None = no limit
+
+class StreamFrame(BaseModel):
+    id: str | int    # Tag of a running turn (credit and cancel frames)
+    n: int | None = Field(default=None, ge=1)  # Credit: deltas the turn may send on top of its window
+
+class ChatBatchSchema(BaseModel):
+    project_id: int  # ID of the project associated with the chat
+    messages: list[str] = Field(min_length=1, max_length=CHAT_BATCH_MAX)  # Each starts its own conversation
+
+# ---------------------------
+# Rate limits and token budgets (checked before any DB or upstream work)
+# ---------------------------
+async def _enforce_limits(user_id: int, project_id: int, cost: int = 1):
+    try:
+        await rate_limiter.check(user_id, project_id, cost)
+    except RateLimited as e:
+        detail = "Daily token budget exhausted for this project" if e.scope == "budget" else "Too many chat requests"
+        raise HTTPException(status_code=429, detail=detail, headers={"Retry-After": e.retry_after_header})
+
+def _tokens_used(usage: dict | None, messages: list[dict], reply: str) -> int:
+    """Upstream-reported total, or an estimate when the upstream sends no usage."""
+    if usage and usage.get("total_tokens"):
+        return usage["total_tokens"]
+    return sum(estimate_tokens(m["content"]) for m in messages) + estimate_tokens(reply)
+
+# ---------------------------
+# Conversation context
+# ---------------------------
+async def _prepare_chat(request: Request, db: AsyncSession, data: ChatSchema, user_id: int):
+    """
+    Verify project ownership, resolve or start the conversation and assemble
+    the upstream messages (compiled project prompt + recent turns + new message).
+    Returns (project, conversation_id, messages); conversation_id is None for
+    a new conversation, which _record_turn creates with its first message pair
+    so that a failed upstream call leaves no empty conversation behind.
+    """
+    project = await load_owned_project(request, db, data.project_id, user_id)
+
+    if data.conversation_id is None:
+        conversation_id, history = None, []
+    else:
+        conversation = await db.scalar(select(Conversation).where(
+            Conversation.id == data.conversation_id,
+            Conversation.project_id == project.id
+        ))
+        if not conversation:
+            raise HTTPException(status_code=404, detail="Conversation not found")
+        conversation_id = conversation.id
+        history = await load_recent_messages(db, conversation_id)
+
+    # Top-k excerpts from the project's uploaded files (empty if nothing is indexed)
+    context = await ingest.retrieve_context(db, project.id, data.message)
+
+    # Project system prompt + Prompt rows, compiled once per prompt_version
+    compiled = await prompt_cache.get(db, project)
+    messages = build_messages(compiled.system_prompt, history, data.message, context=context)
+    return project, conversation_id, messages
+
+async def _record_turn(conversation_id: int | None, project_id: int, user_id: int, user_message: str, reply: str) -> int:
+    """
+    Append the user message and the assistant reply to the conversation log,
+    starting the conversation if `conversation_id` is None. Returns its id.
+    """
+    async with AsyncSessionLocal() as db:
+        if conversation_id is None:
+            conversation = Conversation(project_id=project_id, user_id=user_id)
+            db.add(conversation)
+            await db.flush()  # Assign the id, committed together with the messages
+            conversation_id = conversation.id
+        db.add_all([
+            Message(conversation_id=conversation_id, project_id=project_id, role="user", content=user_message),
+            Message(conversation_id=conversation_id, project_id=project_id, role="assistant", content=reply),
+        ])
+        await db.commit()
+    return conversation_id
+
+# ---------------------------
+# Upstream request body
+# ---------------------------
+def _build_payload(project: Project, messages: list[dict]):
+    """Request body from the project's generation settings (no DB access)."""
+    payload = {
+        "model": project.model or CHAT_MODEL,  # Model used for response
+        "messages": messages,
+        "max_tokens": project.max_tokens or CHAT_MAX_TOKENS
+    }
+    if project.temperature is not None:
+        payload["temperature"] = project.temperature
+    return payload
+
+def _sse(payload: dict, event: str | None = None):
+    """Format one server-sent event."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(payload)}\n\n"
+
+# ---------------------------
+# Non-streaming completion (reply cache aware) and its error mapping
+# ---------------------------
+def _providers_for(project: Project):
+    """The project's provider failover order (all providers if unset or no longer configured)."""
+    try:
+        return llm_gateway.resolve_providers(project.llm_providers)
+    except ValueError as e:
+        logger.warning("project %s: %s; using every configured provider", project.id, e)
+        return llm_gateway.resolve_providers(None)
+
+async def _complete(project: Project, payload: dict) -> str:
+    async def call_upstream():
+        completion = await llm_gateway.complete(payload, _providers_for(project))
+        # Extract reply from API response
+        reply = completion["choices"][0]["message"]["content"]
+        # Only real upstream calls count against the budget (cached replies are free)
+        await rate_limiter.record_usage(project.id, _tokens_used(completion.get("usage"), payload["messages"], reply))
+        return reply
+
+    # First turns can be answered from a similar earlier question to this project
+    semantic = semantic_cache.enabled and project.cache_enabled and semantic_cache.cacheable(payload)
+    if semantic:
+        reply, vector = await semantic_cache.lookup(project, payload)
+        if reply is not None:
+            return reply
+
+    # Call the upstream through the gateway (retries, circuit breaker, failover),
+    # or answer from the reply cache when enabled for this project
+    if completion_cache.enabled and project.cache_enabled:
+        key = cache_key(payload["model"], payload["messages"], payload["max_tokens"], project.id,
+                        payload.get("temperature"))
+        reply = await completion_cache.get_or_compute(key, call_upstream)
+    else:
+        reply = await call_upstream()
+
+    if semantic:
+        await semantic_cache.store(project, payload, vector, reply)
+    return reply
+
+def _upstream_error(e: Exception) -> HTTPException:
+    if isinstance(e, llm_gateway.UpstreamUnavailable):
+        return HTTPException(status_code=503, detail="LLM upstream unavailable, retry shortly",
+                             headers={"Retry-After": str(max(1, int(e.retry_after + 0.5)))})
+    if isinstance(e, httpx.HTTPStatusError):
+        status = e.response.status_code
+        if status == 429:  # Upstream quota, still exhausted after retries
+            return HTTPException(status_code=503, detail="LLM upstream is rate limiting, retry shortly",
+                                 headers={"Retry-After": e.response.headers.get("retry-after", "5")})
+        if status >= 500:
+            return HTTPException(status_code=502, detail=f"LLM upstream error ({status})")
+        return HTTPException(status_code=500, detail=f"Groq API error: {e.response.text}")
+    if isinstance(e, (asyncio.TimeoutError, httpx.TimeoutException)):
+        return HTTPException(status_code=504, detail="Groq API timed out")
+    return HTTPException(status_code=500, detail=f"Groq API exception: {e}")
 
 # ---------------------------
 # Chat with Project (POST)
 # ---------------------------
 @router.post("/")
-def chat_with_project(
+async def chat_with_project(
     data: ChatSchema,
-    current_user: User = Depends(get_current_user),  # Get logged-in user
-    db: Session = Depends(get_db)  # Database session
+    request: Request,
+    current_user: Principal = Depends(get_current_user),  # Get logged-in user
+    db: AsyncSession = Depends(get_async_db)  # Database session
 ):
-    # Verify project ownership before sending chat
-    project = db.query(Project).filter(
-        Project.id == data.project_id,
-        Project.user_id == current_user.id
-    ).first()
+    await _enforce_limits(current_user.id, data.project_id)
 
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
+    # Verify project ownership and load the conversation context before sending chat
+    project, conversation_id, messages = await _prepare_chat(request, db, data, current_user.id)
 
-    # Call external Groq API to generate response
     try:
-        response = requests.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {os.getenv('CHAT_PROJECT_API_KEY')}",
-                "Content-Type": "application/json"
-            },
-            json={
-                "model": "llama-3.1-8b-instant",  # Model used for response
-                "messages": [{"role": "user", "content": data.message}],
-                "max_tokens": 100
-            }
-        )
+        reply = await _complete(project, _build_payload(project, messages))
+    except Exception as e:
+        raise _upstream_error(e)
 
-        # Check API response status
-        if response.status_code != 200:
-            raise HTTPException(status_code=500, detail=f"Groq API error: {response.text}")
+    conversation_id = await _record_turn(conversation_id, data.project_id, current_user.id, data.message, reply)
+    return {"response": reply, "conversation_id": conversation_id}
 
-        # Extract reply from API response
-        reply = response.json()["choices"][0]["message"]["content"]
+# ---------------------------
+# Several messages to one project in a single request (POST)
+# ---------------------------
+@router.post("/batch")
+async def chat_batch(
+    data: ChatBatchSchema,
+    request: Request,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Send each message as the first turn of a new conversation. Upstream calls
+    run concurrently, at most CHAT_BATCH_CONCURRENCY at a time; results keep
+    the order of `messages`. A failed message gets an error entry instead of
+    failing the whole batch.
+    """
+    await _enforce_limits(current_user.id, data.project_id, cost=len(data.messages))
 
+    # The session is not safe for concurrent use, so DB work is done up front
+    # (the project is looked up once and reused for every message)
+    prepared = [
+        await _prepare_chat(request, db, ChatSchema(project_id=data.project_id, message=message), current_user.id)
+        for message in data.messages
+    ]
+    limit = asyncio.Semaphore(CHAT_BATCH_CONCURRENCY)
+
+    async def run(message: str, project: Project, conversation_id: int, messages: list[dict]):
+        async with limit:
+            try:
+                reply = await _complete(project, _build_payload(project, messages))
+            except Exception as e:
+                error = _upstream_error(e)
+                return {"error": error.detail, "status_code": error.status_code}
+        conversation_id = await _record_turn(conversation_id, project.id, current_user.id, message, reply)
+        return {"response": reply, "conversation_id": conversation_id}
+
+    results = await asyncio.gather(*(
+        run(message, *item) for message, item in zip(data.messages, prepared)
+    ))
+    return {"results": results}
+
+# ---------------------------
+# Chat with Project, streamed as server-sent events (POST)
+# ---------------------------
+@router.post("/stream")
+async def stream_chat_with_project(
+    data: ChatSchema,
+    request: Request,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Same as POST /chat/ but forwards tokens as they arrive:
+    `data: {"token": ...}` per delta, then `event: done` with the full reply.
+    The turn is appended to the conversation only if the stream completes.
+    """
+    await _enforce_limits(current_user.id, data.project_id)
+    project, conversation_id, messages = await _prepare_chat(request, db, data, current_user.id)
+
+    usage = {}
+    upstream = llm_gateway.stream(_build_payload(project, messages), _providers_for(project), on_usage=usage.update)
+
+    # Wait for the first token before answering so upstream failures
+    # still map to a proper HTTP status instead of a broken stream
+    try:
+        first = await anext(upstream, None)
+    except Exception as e:
+        raise _upstream_error(e)
+
+    async def events():
+        parts = []
+        finished = False
+        try:
+            if first is not None:
+                parts.append(first)
+                yield _sse({"token": first})
+            async for token in upstream:
+                parts.append(token)
+                yield _sse({"token": token})
+            finished = True
+            with anyio.CancelScope(shield=True):
+                turn_id = await _record_turn(conversation_id, data.project_id, current_user.id,
+                                             data.message, "".join(parts))
+            yield _sse({"response": "".join(parts), "conversation_id": turn_id}, event="done")
+        except httpx.HTTPError as e:
+            yield _sse({"detail": f"Groq API exception: {e}"}, event="error")
+        finally:
+            # Runs on completion and on client disconnect (the task is cancelled);
+            # shield so closing the upstream response is not itself cancelled
+            with anyio.CancelScope(shield=True):
+                await upstream.aclose()
+                # Tokens generated before a disconnect were still billed upstream
+                await rate_limiter.record_usage(data.project_id, _tokens_used(usage, messages, "".join(parts)))
+            logger.info(
+                "chat stream project=%s user=%s finished=%s reply_chars=%d",
+                data.project_id, current_user.id, finished, sum(map(len, parts))
+            )
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# ---------------------------
+# Chat over one WebSocket: authenticated once, several conversations multiplexed
+# ---------------------------
+def _ws_error(tag, e: HTTPException) -> dict:
+    frame = {"type": "error", "id": tag, "status": e.status_code, "detail": e.detail}
+    if e.headers and "Retry-After" in e.headers:
+        frame["retry_after"] = e.headers["Retry-After"]
+    return frame
+
+async def _ws_authenticate(websocket: WebSocket) -> tuple[Principal, int]:
+    """
+    The caller and token expiry, from the Authorization header or, for
+    browsers (which cannot set it), a first `{"type": "auth", "token": ...}` frame.
+    """
+    scheme, _, token = websocket.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        try:
+            frame = json.loads(await asyncio.wait_for(websocket.receive_text(), WS_AUTH_TIMEOUT))
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=401, detail="Authentication timed out")
+        except ValueError:
+            frame = None
+        if not isinstance(frame, dict) or frame.get("type") != "auth" or not isinstance(frame.get("token"), str):
+            raise HTTPException(status_code=401, detail="Send an auth frame first")
+        token = frame["token"]
+    return await resolve_token(token)
+
+async def _ws_turn(websocket: WebSocket, channel: Channel, data: ChatFrame, project_id: int, user_id: int):
+    """One chat turn on a /chat/ws connection: start, delta*, then done (or error)."""
+    tag = data.id
+    state = websocket.state
+    try:
+        await _enforce_limits(user_id, project_id)
+        # Settings and prompt_version changes are picked up within WS_PROJECT_REFRESH seconds
+        if time.monotonic() - state.project_loaded >= WS_PROJECT_REFRESH:
+            state.owned_projects.pop(project_id, None)
+            state.project_loaded = time.monotonic()
+        # Own session per turn: turns run concurrently and a session is not safe to share
+        async with AsyncSessionLocal() as db:
+            project, conversation_id, messages = await _prepare_chat(
+                websocket, db, ChatSchema(project_id=project_id, message=data.message,
+                                          conversation_id=data.conversation_id), user_id
+            )
+    except HTTPException as e:
+        await channel.send(_ws_error(tag, e))
+        return
+    await channel.send({"type": "start", "id": tag, "conversation_id": conversation_id})
+
+    usage = {}
+    upstream = llm_gateway.stream(_build_payload(project, messages), _providers_for(project), on_usage=usage.update)
+    parts = []
+    finished = False
+    try:
+        async for token in upstream:
+            parts.append(token)
+            # Waits for credit and queue space: a slow reader slows the upstream read
+            await channel.delta(tag, {"type": "delta", "id": tag, "token": token})
+        finished = True
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Groq API exception: {e}")
+        await channel.send(_ws_error(tag, _upstream_error(e)))
+    finally:
+        # Also runs when the turn is cancelled or the client disconnects
+        with anyio.CancelScope(shield=True):
+            await upstream.aclose()
+            await rate_limiter.record_usage(project_id, _tokens_used(usage, messages, "".join(parts)))
+            if finished:
+                conversation_id = await _record_turn(conversation_id, project_id, user_id, data.message, "".join(parts))
+        logger.info("chat ws project=%s user=%s id=%r finished=%s", project_id, user_id, tag, finished)
+    if finished:
+        await channel.send({"type": "done", "id": tag, "conversation_id": conversation_id, "response": "".join(parts)})
+
+@router.websocket("/ws")
+async def chat_websocket(websocket: WebSocket, project_id: int):
+    """
+    Chat with one project over a WebSocket, authenticated once per connection.
+    Client frames (JSON text):
+      {"type": "auth", "token": ...}    first frame unless an Authorization header was sent;
+                                        again later to extend an expiring token
+      {"type": "chat", "id": tag, "message": ..., "conversation_id": ..., "window": n}
+      {"type": "credit", "id": tag, "n": k}    allow k more deltas of a windowed turn
+      {"type": "cancel", "id": tag}
+      {"type": "ping"}
+    Server frames: ready, start, delta (token), done (full reply), cancelled,
+    error (status, detail), pong; turn frames carry the client's `id`.
+    A new conversation is only created once its first turn completes: its
+    `start` frame has a null conversation_id, `done` has the new id.
+    Up to WS_MAX_STREAMS turns run at once; the connection is closed with
+    1008 when authentication fails, the project is not the caller's, or the
+    token is revoked.
+    """
+    await websocket.accept()
+    try:
+        principal, expires = await _ws_authenticate(websocket)
+        async with AsyncSessionLocal() as db:
+            await load_owned_project(websocket, db, project_id, principal.id)
+    except WebSocketDisconnect:
+        return
+    except HTTPException as e:
+        await websocket.send_json(_ws_error(None, e))
+        await websocket.close(code=1008, reason=e.detail)
+        return
+    websocket.state.project_loaded = time.monotonic()
+
+    WS_CONNECTIONS.inc()
+    channel = Channel(websocket, WS_MAX_STREAMS, WS_SEND_QUEUE)
+    await channel.send({"type": "ready", "project_id": project_id, "user_id": principal.id,
+                        "max_streams": WS_MAX_STREAMS})
+    try:
+        while True:
+            try:
+                frame = json.loads(await websocket.receive_text())
+                kind = frame.get("type")
+            except (ValueError, AttributeError, KeyError):
+                await channel.send(_ws_error(None, HTTPException(status_code=400, detail="Frames must be JSON objects")))
+                continue
+            tag = frame.get("id")
 
-    return {"response": reply}
+            if kind == "chat":
+                if is_revoked(principal):
+                    await channel.send(_ws_error(tag, HTTPException(status_code=401, detail="Token revoked")))
+                    await channel.flush()
+                    await websocket.close(code=1008, reason="Token revoked")
+                    break
+                if time.time() >= expires:
+                    await channel.send(_ws_error(tag, HTTPException(status_code=401, detail="Token expired, send a new auth frame")))
+                    continue
+                try:
+                    data = ChatFrame.model_validate(frame)
+                    channel.open(data.id, data.window, _ws_turn(websocket, channel, data, project_id, principal.id))
+                except ValueError as e:
+                    await channel.send(_ws_error(tag, HTTPException(status_code=422, detail=str(e))))
+                except StreamRejected as e:
+                    await channel.send(_ws_error(tag, HTTPException(status_code=e.status_code, detail=e.detail)))
+            elif kind in ("credit", "cancel"):
+                try:
+                    target = StreamFrame.model_validate(frame)
+                except ValueError as e:
+                    # The id is echoed only once known to be a valid tag
+                    await channel.send(_ws_error(None, HTTPException(status_code=422, detail=str(e))))
+                    continue
+                if kind == "cancel":
+                    if channel.cancel(target.id):
+                        await channel.send({"type": "cancelled", "id": target.id})
+                elif target.n is None or not channel.grant(target.id, target.n):
+                    await channel.send(_ws_error(target.id, HTTPException(status_code=400, detail="Unknown stream or invalid credit")))
+            elif kind == "auth":
+                try:
+                    renewed, renewed_expires = await resolve_token(frame.get("token") or "")
+                except HTTPException as e:
+                    await channel.send(_ws_error(None, e))
+                    continue
+                if renewed.id != principal.id:
+                    await channel.send(_ws_error(None, HTTPException(status_code=403, detail="Token belongs to another user")))
+                    continue
+                principal, expires = renewed, renewed_expires
+            elif kind == "ping":
+                await channel.send({"type": "pong"})
+            else:
+                await channel.send(_ws_error(tag, HTTPException(status_code=400, detail=f"Unknown frame type {kind!r}")))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        WS_CONNECTIONS.dec()
+        await channel.close()
 
 # ---------------------------
 # Upload a file related to chat (Optional)
 # ---------------------------
-@router.post("/{project_id}/upload")
-def upload_chat_file(
+@router.post("/{project_id}/upload", status_code=202)
+async def upload_chat_file(
     project_id: int,
     file: UploadFile = File(...),  # File uploaded from request
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    project: Project = Depends(get_owned_project),  # 404 unless the user owns it
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    # Verify project ownership
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.user_id == current_user.id
-    ).first()
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
+    # Stream into the content-addressed store and record its metadata
+    try:
+        record = await file_store.store_project_file(
+            db, project_id, "chat", file.filename, file.content_type, file_store.upload_chunks(file)
+        )
+    except file_store.UploadTooLarge:
+        raise HTTPException(status_code=413, detail="File exceeds the upload size limit or project quota")
+
+    # Chunk and embed for retrieval on the job queue; the client gets 202 right away
+    job = await jobs.enqueue(db, "ingest_file", {"file_id": record.id}, user_id=current_user.id)
 
-    # Ensure uploads folder exists
-    os.makedirs("uploads/chat_files", exist_ok=True)
+    return {
+        "message": "Chat file uploaded successfully",
+        "file_id": record.id,
+        "filename": record.filename,
+        "sha256": record.sha256,
+        "size": record.size,
+        "job_id": job.id,  # Poll GET /jobs/{job_id} for indexing progress
+    }
 
-    # Save file to local directory
-    file_path = f"uploads/chat_files/{project_id}_{file.filename}"
-    with open(file_path, "wb") as f:
-        shutil.copyfileobj(file.file, f)
+# ---------------------------
+# Chat file metadata returned by listings
+# ---------------------------
+class ChatFileOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
 
-    return {"message": "Chat file uploaded successfully", "file_path": file_path}
+    id: int
+    filename: str
+    size: int
+    sha256: str
+    content_type: str | None = None
+    created_at: datetime | None = None
 
 # ---------------------------
 # Get all chat files for a project
 # ---------------------------
 @router.get("/{project_id}/files")
-def get_chat_files(
+async def get_chat_files(
     project_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    response: Response,
+    limit: int | None = None,  # Page size (capped at PAGE_SIZE_MAX)
+    cursor: str | None = None,  # Value of X-Next-Cursor from the previous page
+    project: Project = Depends(get_owned_project),  # 404 unless the user owns it
+    db: AsyncSession = Depends(get_async_db)
 ):
-    # Verify project ownership
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.user_id == current_user.id
-    ).first()
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-
-    # List all files in uploads/chat_files matching this project
-    folder_path = "uploads/chat_files"
-    files = [f for f in os.listdir(folder_path) if f.startswith(f"{project_id}_")]
-    return {"files": files}
+    """
+    List this project's chat files, oldest first, from the uploaded_files index.
+    When more rows exist, the X-Next-Cursor header holds the next page's cursor.
+    """
+    # Range scan on ix_uploaded_files_project_id_kind_created_at
+    limit = clamp_limit(limit)
+    query = select(UploadedFile).where(UploadedFile.project_id == project_id, UploadedFile.kind == "chat")
+    result = await db.scalars(keyset_page(query, UploadedFile.created_at, UploadedFile.id, cursor, limit))
+    rows, next_cursor = split_page(result.all(), limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return {"files": [ChatFileOut.model_validate(row) for row in rows]}
 
 # ---------------------------
 # Delete a chat file
 # ---------------------------
-@router.delete("/{project_id}/files/{filename}")
-def delete_chat_file(
+@router.delete("/{project_id}/files/{file_id}")
+async def delete_chat_file(
     project_id: int,
-    filename: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    file_id: int,  # `id` from the file listing or upload response
+    project: Project = Depends(get_owned_project),  # 404 unless the user owns it
+    db: AsyncSession = Depends(get_async_db)
 ):
-    # Verify project ownership
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.user_id == current_user.id
-    ).first()
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-
-    # Delete file from local directory
-    file_path = f"uploads/chat_files/{filename}"
-    if os.path.exists(file_path):
-        os.remove(file_path)
-        return {"message": "Chat file deleted successfully"}
-    else:
+    # Resolve the file through the index, never through a client-supplied path
+    record = await db.scalar(select(UploadedFile).where(
+        UploadedFile.id == file_id,
+        UploadedFile.project_id == project_id,
+        UploadedFile.kind == "chat"
+    ))
+    if not record:
         raise HTTPException(status_code=404, detail="File not found")
+
+    # Remove its retrieval chunks from the table and the vector index
+    chunk_ids = list(await db.scalars(select(FileChunk.id).where(FileChunk.file_id == record.id)))
+    await db.execute(delete(FileChunk).where(FileChunk.file_id == record.id))
+    await db.delete(record)
+    await db.commit()
+    await anyio.to_thread.run_sync(ingest.remove_file, project_id, chunk_ids)
+
+    # Drop the blob once no other upload shares its content
+    await file_store.delete_unreferenced_blob(record.sha256)
+    return {"message": "Chat file deleted successfully"}
+
+# ---------------------------
+# Full-text search over the user's chat history
+# ---------------------------
+class MessageHit(BaseModel):
+    id: int
+    conversation_id: int
+    project_id: int
+    role: str
+    created_at: datetime | None = None
+    score: float  # Relevance, higher is better
+    snippet: str  # Matching excerpt, terms in [brackets]
+
+@router.get("/search", response_model=list[MessageHit])
+async def search_messages(
+    response: Response,
+    q: str,  # Words to find (all of them must occur)
+    project_id: int | None = None,  # Only messages of this project
+    conversation_id: int | None = None,  # Only messages of this conversation
+    limit: int | None = None,  # Page size (capped at PAGE_SIZE_MAX)
+    cursor: str | None = None,  # Value of X-Next-Cursor from the previous page
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Messages of the user's projects containing every word of `q`, best match first.
+    When more rows exist, the X-Next-Cursor header holds the next page's cursor.
+    """
+    limit = clamp_limit(limit)
+    query = select(Message.id, Message.conversation_id, Message.project_id, Message.role, Message.created_at) \
+        .join(Project, Message.project_id == Project.id) \
+        .where(Project.user_id == current_user.id)
+    if project_id is not None:
+        query = query.where(Message.project_id == project_id)
+    if conversation_id is not None:
+        query = query.where(Message.conversation_id == conversation_id)
+    try:
+        rows, next_cursor = await search.ranked_page(db, query, Message.content, q, cursor, limit)
+    except search.SearchQueryError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [MessageHit(**row._mapping) for row in rows]
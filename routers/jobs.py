@@ -0,0 +1,57 @@
+# ---------------------------
+# File: routers/jobs.py
+# ---------------------------
+
+import json
+from typing import Any
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
+from models import Job
+from .auth import get_current_user
+from services.principal_cache import Principal
+from pydantic import BaseModel
+from datetime import datetime
+
+router = APIRouter()
+
+# ---------------------------
+# Response model for background jobs
+# ---------------------------
+class JobOut(BaseModel):
+    id: int
+    kind: str
+    status: str  # queued, running, succeeded or failed
+    attempts: int
+    max_attempts: int
+    result: Any = None  # Handler return value once succeeded
+    error: str | None = None  # Last failure, kept while a retry is pending
+    run_after: datetime | None = None  # Earliest time of the next attempt
+    created_at: datetime | None = None
+    updated_at: datetime | None = None
+
+# ---------------------------
+# Get the status of a job started by the current user
+# ---------------------------
+@router.get("/{job_id}", response_model=JobOut)
+async def get_job(
+    job_id: int,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    job = await db.scalar(select(Job).where(Job.id == job_id, Job.user_id == current_user.id))
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JobOut(
+        id=job.id,
+        kind=job.kind,
+        status=job.status,
+        attempts=job.attempts,
+        max_attempts=job.max_attempts,
+        result=json.loads(job.result) if job.result else None,
+        error=job.error,
+        run_after=job.run_after,
+        created_at=job.created_at,
+        updated_at=job.updated_at,
+    )
@@ -0,0 +1,44 @@
+# ---------------------------
+# File: routers/ownership.py
+# ---------------------------
+
+from fastapi import Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import HTTPConnection
+from database import get_async_db
+from models import Project
+from .auth import get_current_user
+from services.principal_cache import Principal
+
+# ---------------------------
+# Owned-project lookup, resolved once per request
+# ---------------------------
+async def load_owned_project(conn: HTTPConnection, db: AsyncSession, project_id: int, user_id: int) -> Project:
+    """
+    The caller's project `project_id`, or 404.
+    The result is kept on conn.state, so every later check for the same
+    project in this request (helpers, batch items) costs no query.
+    One range scan on ix_projects_user_id_id.
+    """
+    owned = getattr(conn.state, "owned_projects", None)
+    if owned is None:
+        owned = conn.state.owned_projects = {}
+    if project_id not in owned:
+        owned[project_id] = await db.scalar(select(Project).where(
+            Project.id == project_id,
+            Project.user_id == user_id
+        ))
+    project = owned[project_id]
+    if project is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return project
+
+async def get_owned_project(
+    project_id: int,  # Path parameter of the route
+    conn: HTTPConnection,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+) -> Project:
+    """Route dependency: the current user's project from the `project_id` path parameter."""
+    return await load_owned_project(conn, db, project_id, current_user.id)
@@ -2,138 +2,362 @@
 # File: routers/projects.py
 # ---------------------------
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from sqlalchemy.orm import Session
-from database import get_db
-from models import Project, User
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
+from models import FileChunk, Project, UploadedFile
 from .auth import get_current_user
-from pydantic import BaseModel
-import os, shutil
+from .ownership import get_owned_project
+from services.principal_cache import Principal
+from services.pagination import clamp_limit, keyset_page, select_columns, split_page
+from services import etag, file_store, ingest, jobs, llm_gateway, project_archive, search
+from pydantic import BaseModel, ConfigDict, Field
+from datetime import datetime
+import anyio
 
 router = APIRouter()
 
 # ---------------------------
 # Pydantic schema for Projects
 # ---------------------------
+class ProviderChoice(BaseModel):
+    name: str  # Provider from LLM_PROVIDERS
+    model: str | None = None  # Model to request from it
+
 class ProjectSchema(BaseModel):
     name: str  # Project name
     description: str | None = None  # Optional project description
+    cache_enabled: bool = True  # Set False to opt the project out of the chat reply cache
+    llm_providers: list[str | ProviderChoice] | None = None  # Failover order; None = every configured provider
+    model: str | None = None  # Upstream model; None = server default (CHAT_MODEL)
+    temperature: float | None = Field(default=None, ge=0, le=2)  # None = provider default
+    max_tokens: int | None = Field(default=None, ge=1, le=32768)  # Reply length cap; None = CHAT_MAX_TOKENS
+    system_prompt: str | None = None  # Sent before the project's prompts
+
+# ---------------------------
+# Response model (fields are optional so ?fields= projections validate)
+# ---------------------------
+class ProjectOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    name: str | None = None
+    description: str | None = None
+    user_id: int | None = None
+    cache_enabled: bool | None = None
+    llm_providers: list[str | ProviderChoice] | None = None
+    model: str | None = None
+    temperature: float | None = None
+    max_tokens: int | None = None
+    system_prompt: str | None = None
+    prompt_version: int | None = None
+    created_at: datetime | None = None
+    updated_at: datetime | None = None
+
+# Columns clients may request through ?fields=
+PROJECT_FIELDS = {
+    "id": Project.id,
+    "name": Project.name,
+    "description": Project.description,
+    "user_id": Project.user_id,
+    "cache_enabled": Project.cache_enabled,
+    "llm_providers": Project.llm_providers,
+    "model": Project.model,
+    "temperature": Project.temperature,
+    "max_tokens": Project.max_tokens,
+    "system_prompt": Project.system_prompt,
+    "prompt_version": Project.prompt_version,
+    "created_at": Project.created_at,
+    "updated_at": Project.updated_at,
+}
+
+def _providers_column(data: ProjectSchema):
+    """JSON to store for llm_providers; 400 if a provider is not configured."""
+    if not data.llm_providers:
+        return None
+    spec = [p if isinstance(p, str) else p.model_dump(exclude_none=True) for p in data.llm_providers]
+    try:
+        llm_gateway.resolve_providers(spec)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return spec
 
 # ---------------------------
 # Create a new project (CRUD: Create)
 # ---------------------------
-@router.post("/")
-def create_project(
+@router.post("/", response_model=ProjectOut)
+async def create_project(
     data: ProjectSchema,  # Data from request body
-    current_user: User = Depends(get_current_user),  # Get current logged-in user
-    db: Session = Depends(get_db)  # Database session
+    current_user: Principal = Depends(get_current_user),  # Get current logged-in user
+    db: AsyncSession = Depends(get_async_db)  # Database session
 ):
     project = Project(
         name=data.name,  # Assign project name
         description=data.description,  # Assign description
+        cache_enabled=data.cache_enabled,  # Chat reply cache opt-out
+        llm_providers=_providers_column(data),  # Upstream failover order
+        model=data.model,  # Generation settings used by /chat
+        temperature=data.temperature,
+        max_tokens=data.max_tokens,
+        system_prompt=data.system_prompt,
         user_id=current_user.id  # Link to logged-in user
     )
     db.add(project)  # Add project to session
-    db.commit()  # Commit to database
-    db.refresh(project)  # Refresh object
+    await db.commit()  # Commit to database
+    await db.refresh(project)  # Refresh object
     return project  # Return newly created project
 
 # ---------------------------
 # List all projects (CRUD: Read)
 # ---------------------------
-@router.get("/")
-def list_projects(
-    current_user: User = Depends(get_current_user),  # Only show user's projects
-    db: Session = Depends(get_db)
+@router.get("/", response_model=list[ProjectOut], response_model_exclude_unset=True)
+async def list_projects(
+    request: Request,
+    response: Response,
+    limit: int | None = None,  # Page size (capped at PAGE_SIZE_MAX)
+    cursor: str | None = None,  # Value of X-Next-Cursor from the previous page
+    fields: str | None = None,  # Comma-separated columns to return, e.g. "id,name"
+    current_user: Principal = Depends(get_current_user),  # Only show user's projects
+    db: AsyncSession = Depends(get_async_db)
 ):
-    projects = db.query(Project).filter(Project.user_id == current_user.id).all()
-    return projects
+    """
+    List the user's projects ordered by (created_at, id).
+    When more rows exist, the X-Next-Cursor header holds the next page's cursor.
+    Answers 304 to If-None-Match with the current ETag without reading any project.
+    """
+    count, updated = (await db.execute(
+        etag.collection_state(Project.id, Project.updated_at).where(Project.user_id == current_user.id)
+    )).one()
+    tag = etag.make_etag("projects", current_user.id, count, updated, request.url.query)
+    if etag.is_fresh(request, tag):
+        return etag.not_modified(tag)
+    etag.set_etag(response, tag)
+
+    limit = clamp_limit(limit)
+    query = select(*select_columns(fields, PROJECT_FIELDS)).where(Project.user_id == current_user.id)
+    result = await db.execute(keyset_page(query, Project.created_at, Project.id, cursor, limit))
+    rows, next_cursor = split_page(result.all(), limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [ProjectOut(**row._mapping) for row in rows]
 
 # ---------------------------
 # Get a single project by ID (CRUD: Read)
 # ---------------------------
-@router.get("/{project_id}")
-def get_project(
-    project_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+@router.get("/{project_id}", response_model=ProjectOut)
+async def get_project(
+    request: Request,
+    response: Response,
+    project: Project = Depends(get_owned_project)  # 404 unless the user owns it
 ):
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.user_id == current_user.id
-    ).first()
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
+    tag = etag.make_etag("project", project.id, project.updated_at)
+    if etag.is_fresh(request, tag):
+        return etag.not_modified(tag)
+    etag.set_etag(response, tag)
     return project
 
 # ---------------------------
 # Update a project (CRUD: Update)
 # ---------------------------
-@router.put("/{project_id}")
-def update_project(
-    project_id: int,
+@router.put("/{project_id}", response_model=ProjectOut)
+async def update_project(
     data: ProjectSchema,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    project: Project = Depends(get_owned_project),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.user_id == current_user.id
-    ).first()
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    
     # Update project fields
     project.name = data.name
     project.description = data.description
-    db.commit()
-    db.refresh(project)
+    project.cache_enabled = data.cache_enabled
+    project.llm_providers = _providers_column(data)
+    project.model = data.model
+    project.temperature = data.temperature
+    project.max_tokens = data.max_tokens
+    project.system_prompt = data.system_prompt
+    # Compiled prompts cached by every worker are keyed by this version
+    project.prompt_version = Project.prompt_version + 1
+    await db.commit()
+    await db.refresh(project)
     return project
 
 # ---------------------------
 # Delete a project (CRUD: Delete)
 # ---------------------------
 @router.delete("/{project_id}")
-def delete_project(
-    project_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def delete_project(
+    project: Project = Depends(get_owned_project),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.user_id == current_user.id
-    ).first()
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    db.delete(project)
-    db.commit()
+    """
+    Delete the project; its prompts, conversations, messages, uploads and
+    chunks go with it through ON DELETE CASCADE. Blobs no other project
+    shares and the project's vector index are removed afterwards.
+    """
+    hashes = set(await db.scalars(select(UploadedFile.sha256).where(UploadedFile.project_id == project.id)))
+    await db.delete(project)
+    await db.commit()
+
+    await anyio.to_thread.run_sync(ingest.remove_project, project.id)
+    for sha256 in hashes:
+        await file_store.delete_unreferenced_blob(sha256)
     return {"message": "Project deleted successfully"}
 
+# ---------------------------
+# Export a project with its prompts and files as a tar archive (streamed)
+# ---------------------------
+@router.get("/{project_id}/export")
+async def export_project(
+    project: Project = Depends(get_owned_project)
+):
+    """
+    Stream project.json, the prompts as NDJSON batches and every uploaded
+    file (see services/project_archive.py). Memory use does not grow with
+    the project; feed the archive to POST /projects/import.
+    """
+    return StreamingResponse(
+        project_archive.export_tar(project.id), media_type="application/x-tar",
+        headers={"Content-Disposition": f'attachment; filename="project-{project.id}.tar"'},
+    )
+
+# ---------------------------
+# Import an exported archive as a new project
+# ---------------------------
+@router.post("/import", status_code=201)
+async def import_project(
+    request: Request,
+    name: str | None = None,  # Name for the new project (default: the archived name)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Create a project from the raw request body (an archive from
+    GET /projects/{project_id}/export). The body is parsed as it arrives
+    and rows are inserted in batches inside one transaction.
+    """
+    try:
+        project, counts = await project_archive.import_tar(db, current_user.id, request.stream(), name=name)
+    except project_archive.ArchiveError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except file_store.UploadTooLarge:
+        raise HTTPException(status_code=413, detail="File exceeds the upload size limit or project quota")
+
+    # Chunk and embed the imported files for retrieval on the job queue
+    file_ids = (await db.scalars(select(UploadedFile.id).where(UploadedFile.project_id == project.id))).all()
+    for file_id in file_ids:
+        await jobs.enqueue(db, "ingest_file", {"file_id": file_id}, user_id=current_user.id)
+
+    return {"message": "Project imported successfully", "project": ProjectOut.model_validate(project), **counts}
+
 # ---------------------------
 # Upload a file to a project
 # ---------------------------
-@router.post("/{project_id}/upload")
-def upload_file(
+def _upload_response(record, job, message: str):
+    return {
+        "message": message,
+        "file_id": record.id,
+        "filename": record.filename,
+        "sha256": record.sha256,
+        "size": record.size,
+        "job_id": job.id,  # Poll GET /jobs/{job_id} for indexing progress
+    }
+
+@router.post("/{project_id}/upload", status_code=202)
+async def upload_file(
     project_id: int,
     file: UploadFile = File(...),  # Receive file from request
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    project: Project = Depends(get_owned_project),  # Verify project belongs to user
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    # Verify project belongs to user
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.user_id == current_user.id
-    ).first()
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-
-    # Ensure upload folder exists
-    os.makedirs("uploads", exist_ok=True)
-
-    # Save file to local uploads folder
-    file_path = f"uploads/{project_id}_{file.filename}"
-    with open(file_path, "wb") as f:
-        shutil.copyfileobj(file.file, f)
+    # Stream into the content-addressed store in fixed-size chunks, hashing as we go
+    try:
+        record = await file_store.store_project_file(
+            db, project_id, "project", file.filename, file.content_type, file_store.upload_chunks(file)
+        )
+    except file_store.UploadTooLarge:
+        raise HTTPException(status_code=413, detail="File exceeds the upload size limit or project quota")
+
+    # Chunk and embed for retrieval on the job queue; the client gets 202 right away
+    job = await jobs.enqueue(db, "ingest_file", {"file_id": record.id}, user_id=current_user.id)
 
     # Return success message
-    return {"message": "File uploaded successfully", "file_path": file_path}
+    return _upload_response(record, job, "File uploaded successfully")
+
+# ---------------------------
+# Upload a file to a project as a raw request body (no multipart spooling)
+# ---------------------------
+@router.put("/{project_id}/files/{filename}", status_code=202)
+async def upload_file_stream(
+    project_id: int,
+    filename: str,
+    request: Request,
+    project: Project = Depends(get_owned_project),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Stream the request body straight into the file store.
+    Oversized uploads are refused from Content-Length before reading, or
+    as soon as the streamed body passes the limit.
+    """
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > await file_store.project_bytes_left(db, project_id):
+        raise HTTPException(status_code=413, detail="File exceeds the upload size limit or project quota")
+
+    try:
+        record = await file_store.store_project_file(
+            db, project_id, "project", filename, request.headers.get("content-type"), request.stream()
+        )
+    except file_store.UploadTooLarge:
+        raise HTTPException(status_code=413, detail="File exceeds the upload size limit or project quota")
+
+    job = await jobs.enqueue(db, "ingest_file", {"file_id": record.id}, user_id=current_user.id)
+    return _upload_response(record, job, "File uploaded successfully")
+
+# ---------------------------
+# Full-text search over the text of the user's uploaded files
+# ---------------------------
+class FileHit(BaseModel):
+    chunk_id: int
+    file_id: int
+    filename: str
+    kind: str  # "project" or "chat" upload
+    project_id: int
+    position: int  # Order of the chunk within its file
+    score: float  # Relevance, higher is better
+    snippet: str  # Matching excerpt, terms in [brackets]
+
+@router.get("/files/search", response_model=list[FileHit])
+async def search_files(
+    response: Response,
+    q: str,  # Words to find (all of them must occur in one chunk)
+    project_id: int | None = None,  # Only files of this project
+    limit: int | None = None,  # Page size (capped at PAGE_SIZE_MAX)
+    cursor: str | None = None,  # Value of X-Next-Cursor from the previous page
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Chunks of indexed uploads (project and chat files) containing every word
+    of `q`, best match first. A file is searchable once its ingest job is done.
+    When more rows exist, the X-Next-Cursor header holds the next page's cursor.
+    """
+    limit = clamp_limit(limit)
+    query = select(
+        FileChunk.id.label("chunk_id"), FileChunk.file_id, UploadedFile.filename, UploadedFile.kind,
+        FileChunk.project_id, FileChunk.position
+    ) \
+        .join(UploadedFile, FileChunk.file_id == UploadedFile.id) \
+        .join(Project, FileChunk.project_id == Project.id) \
+        .where(Project.user_id == current_user.id)
+    if project_id is not None:
+        query = query.where(FileChunk.project_id == project_id)
+    try:
+        rows, next_cursor = await search.ranked_page(db, query, FileChunk.text, q, cursor, limit)
+    except search.SearchQueryError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [FileHit(**row._mapping) for row in rows]
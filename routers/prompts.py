@@ -2,15 +2,27 @@
 # File: routers/prompts.py
 # ---------------------------
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from database import get_db
-from models import Prompt, Project, User
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db, AsyncSessionLocal
+from models import Prompt, Project
 from .auth import get_current_user
-from pydantic import BaseModel
+from .ownership import load_owned_project
+from services import etag, jobs, search
+from services.prompt_cache import bump_versions
+from services.principal_cache import Principal
+from services.pagination import clamp_limit, keyset_page, select_columns, split_page
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from datetime import datetime
+from config import get_settings
 
 router = APIRouter()
 
+settings = get_settings()
+PROMPT_BULK_MAX = settings.prompt_bulk_max  # Max prompts in one bulk request
+
 # ---------------------------
 # Pydantic schema for Prompts
 # ---------------------------
@@ -18,81 +30,348 @@ class PromptSchema(BaseModel):
     text: str  # The prompt text
     project_id: int  # Link prompt to a project
 
+# ---------------------------
+# Response model (fields are optional so ?fields= projections validate)
+# ---------------------------
+class PromptOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    text: str | None = None
+    project_id: int | None = None
+    created_at: datetime | None = None
+    updated_at: datetime | None = None
+
+# Columns clients may request through ?fields=
+PROMPT_FIELDS = {
+    "id": Prompt.id,
+    "text": Prompt.text,
+    "project_id": Prompt.project_id,
+    "created_at": Prompt.created_at,
+    "updated_at": Prompt.updated_at,
+}
+
 # ---------------------------
 # Create a new prompt (CRUD: Create)
 # ---------------------------
-@router.post("/")
-def create_prompt(
+@router.post("/", response_model=PromptOut)
+async def create_prompt(
     data: PromptSchema,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
+    await load_owned_project(request, db, data.project_id, current_user.id)
     prompt = Prompt(
         text=data.text,
         project_id=data.project_id
     )
     db.add(prompt)
-    db.commit()
-    db.refresh(prompt)
+    await bump_versions(db, [data.project_id])  # Recompile the project's cached prompt
+    await db.commit()
+    await db.refresh(prompt)
     return prompt
 
+# ---------------------------
+# Bulk schemas
+# ---------------------------
+class PromptBulkCreate(BaseModel):
+    prompts: list[PromptSchema] = Field(min_length=1, max_length=PROMPT_BULK_MAX)
+
+class PromptUpdateItem(BaseModel):
+    id: int  # Prompt to change
+    text: str | None = None  # Omitted fields are left as they are
+    project_id: int | None = None
+
+    @field_validator("text", "project_id")
+    @classmethod
+    def not_null(cls, value):
+        # Only runs for fields the client sent: an explicit null would reach the UPDATE
+        if value is None:
+            raise ValueError("may be omitted but not null")
+        return value
+
+class PromptBulkUpdate(BaseModel):
+    prompts: list[PromptUpdateItem] = Field(min_length=1, max_length=PROMPT_BULK_MAX)
+
+class PromptBulkDelete(BaseModel):
+    ids: list[int] = Field(min_length=1, max_length=PROMPT_BULK_MAX)
+
+# ---------------------------
+# Bulk helpers: one statement per operation, shared by routes and jobs
+# ---------------------------
+async def _check_projects_owned(db: AsyncSession, project_ids, user_id: int):
+    """Validate ownership once per distinct project with a single query."""
+    wanted = set(project_ids)
+    owned = set((await db.scalars(select(Project.id).where(
+        Project.id.in_(wanted),
+        Project.user_id == user_id
+    ))).all())
+    missing = wanted - owned
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Project not found: {', '.join(map(str, sorted(missing)))}")
+
+async def _insert_prompts(db: AsyncSession, rows: list[dict]):
+    # Multi-row INSERT ... RETURNING instead of a commit + refresh per prompt,
+    # rows returned in the order of `rows` (not guaranteed by every backend otherwise)
+    prompts = (await db.scalars(insert(Prompt).returning(Prompt, sort_by_parameter_order=True), rows)).all()
+    await bump_versions(db, {row["project_id"] for row in rows})
+    await db.commit()
+    return prompts
+
+async def _update_prompts(db: AsyncSession, rows: list[dict]):
+    # Bulk UPDATE by primary key, batched by the set of columns changed
+    rows = [row for row in rows if len(row) > 1]
+    if rows:
+        # Projects losing or changing prompts, then projects receiving moved ones
+        await bump_versions(db, select(Prompt.project_id).where(Prompt.id.in_([row["id"] for row in rows])))
+        await db.execute(update(Prompt), rows)
+        await bump_versions(db, {row["project_id"] for row in rows if "project_id" in row})
+    await db.commit()
+    return len(rows)
+
+async def _delete_prompts(db: AsyncSession, ids: list[int], user_id: int):
+    owned_projects = select(Project.id).where(Project.user_id == user_id)
+    await bump_versions(db, select(Prompt.project_id).where(
+        Prompt.id.in_(ids),
+        Prompt.project_id.in_(owned_projects)
+    ))
+    result = await db.execute(delete(Prompt).where(
+        Prompt.id.in_(ids),
+        Prompt.project_id.in_(owned_projects)
+    ))
+    await db.commit()
+    return result.rowcount
+
+@jobs.handler("prompts_bulk_create")
+async def _bulk_create_job(prompts: list[dict]):
+    async with AsyncSessionLocal() as db:
+        return {"created": len(await _insert_prompts(db, prompts))}
+
+@jobs.handler("prompts_bulk_update")
+async def _bulk_update_job(prompts: list[dict]):
+    async with AsyncSessionLocal() as db:
+        return {"updated": await _update_prompts(db, prompts)}
+
+@jobs.handler("prompts_bulk_delete")
+async def _bulk_delete_job(ids: list[int], user_id: int):
+    async with AsyncSessionLocal() as db:
+        return {"deleted": await _delete_prompts(db, ids, user_id)}
+
+def _job_accepted(job):
+    return JSONResponse(status_code=202, content={"message": "Bulk operation queued", "job_id": job.id})
+
+# ---------------------------
+# Create many prompts in one request
+# ---------------------------
+@router.post("/bulk", response_model=list[PromptOut])
+async def create_prompts_bulk(
+    data: PromptBulkCreate,
+    background: bool = False,  # True = queue as a job and answer 202 with its id
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    await _check_projects_owned(db, (p.project_id for p in data.prompts), current_user.id)
+    rows = [p.model_dump() for p in data.prompts]
+    if background:
+        return _job_accepted(await jobs.enqueue(db, "prompts_bulk_create", {"prompts": rows}, user_id=current_user.id))
+    return await _insert_prompts(db, rows)
+
+# ---------------------------
+# Update many prompts in one request
+# ---------------------------
+@router.put("/bulk", response_model=list[PromptOut])
+async def update_prompts_bulk(
+    data: PromptBulkUpdate,
+    background: bool = False,  # True = queue as a job and answer 202 with its id
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    ids = {p.id for p in data.prompts}
+    owned = set((await db.scalars(
+        select(Prompt.id)
+        .join(Project, Prompt.project_id == Project.id)
+        .where(Prompt.id.in_(ids), Project.user_id == current_user.id)
+    )).all())
+    missing = ids - owned
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Prompt not found: {', '.join(map(str, sorted(missing)))}")
+    targets = {p.project_id for p in data.prompts if p.project_id is not None}
+    if targets:
+        await _check_projects_owned(db, targets, current_user.id)
+
+    rows = [p.model_dump(exclude_unset=True) for p in data.prompts]
+    if background:
+        return _job_accepted(await jobs.enqueue(db, "prompts_bulk_update", {"prompts": rows}, user_id=current_user.id))
+    await _update_prompts(db, rows)
+    prompts = (await db.scalars(
+        select(Prompt).where(Prompt.id.in_(ids)).execution_options(populate_existing=True)
+    )).all()
+    return sorted(prompts, key=lambda p: p.id)
+
+# ---------------------------
+# Delete many prompts in one request
+# ---------------------------
+@router.post("/bulk/delete")
+async def delete_prompts_bulk(
+    data: PromptBulkDelete,
+    background: bool = False,  # True = queue as a job and answer 202 with its id
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Delete the listed prompts of the user's projects; unknown ids are ignored."""
+    ids = sorted(set(data.ids))
+    if background:
+        return _job_accepted(await jobs.enqueue(
+            db, "prompts_bulk_delete", {"ids": ids, "user_id": current_user.id}, user_id=current_user.id
+        ))
+    deleted = await _delete_prompts(db, ids, current_user.id)
+    return {"message": "Prompts deleted successfully", "deleted": deleted}
+
 # ---------------------------
 # List all prompts (CRUD: Read)
 # ---------------------------
-@router.get("/")
-def list_prompts(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+@router.get("/", response_model=list[PromptOut], response_model_exclude_unset=True)
+async def list_prompts(
+    request: Request,
+    response: Response,
+    project_id: int | None = None,  # Only prompts of this project
+    limit: int | None = None,  # Page size (capped at PAGE_SIZE_MAX)
+    cursor: str | None = None,  # Value of X-Next-Cursor from the previous page
+    fields: str | None = None,  # Comma-separated columns to return, e.g. "id,project_id"
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
+    """
+    List prompts of the user's projects ordered by (created_at, id).
+    When more rows exist, the X-Next-Cursor header holds the next page's cursor.
+    Answers 304 to If-None-Match with the current ETag without reading any prompt.
+    """
+    state = etag.collection_state(Prompt.id, Prompt.updated_at) \
+        .join(Project, Prompt.project_id == Project.id) \
+        .where(Project.user_id == current_user.id)
+    if project_id is not None:
+        state = state.where(Prompt.project_id == project_id)
+    count, updated = (await db.execute(state)).one()
+    tag = etag.make_etag("prompts", current_user.id, count, updated, request.url.query)
+    if etag.is_fresh(request, tag):
+        return etag.not_modified(tag)
+    etag.set_etag(response, tag)
+
+    limit = clamp_limit(limit)
     # Fetch only prompts whose project belongs to the current user
-    prompts = db.query(Prompt).join(Project).filter(Project.user_id == current_user.id).all()
-    return prompts
+    query = select(*select_columns(fields, PROMPT_FIELDS)) \
+        .join(Project, Prompt.project_id == Project.id) \
+        .where(Project.user_id == current_user.id)
+    if project_id is not None:
+        query = query.where(Prompt.project_id == project_id)
+    result = await db.execute(keyset_page(query, Prompt.created_at, Prompt.id, cursor, limit))
+    rows, next_cursor = split_page(result.all(), limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [PromptOut(**row._mapping) for row in rows]
 
 # ---------------------------
-# Get a single prompt (CRUD: Read)
+# Full-text search over the user's prompts
 # ---------------------------
-@router.get("/{prompt_id}")
-def get_prompt(
-    prompt_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+class PromptHit(BaseModel):
+    id: int
+    text: str
+    project_id: int | None = None
+    created_at: datetime | None = None
+    score: float  # Relevance, higher is better
+    snippet: str  # Matching excerpt, terms in [brackets]
+
+@router.get("/search", response_model=list[PromptHit])
+async def search_prompts(
+    response: Response,
+    q: str,  # Words to find (all of them must occur)
+    project_id: int | None = None,  # Only prompts of this project
+    limit: int | None = None,  # Page size (capped at PAGE_SIZE_MAX)
+    cursor: str | None = None,  # Value of X-Next-Cursor from the previous page
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    prompt = db.query(Prompt).filter(Prompt.id == prompt_id).first()
+    """
+    Prompts of the user's projects containing every word of `q`, best match first.
+    When more rows exist, the X-Next-Cursor header holds the next page's cursor.
+    """
+    limit = clamp_limit(limit)
+    query = select(Prompt.id, Prompt.text, Prompt.project_id, Prompt.created_at) \
+        .join(Project, Prompt.project_id == Project.id) \
+        .where(Project.user_id == current_user.id)
+    if project_id is not None:
+        query = query.where(Prompt.project_id == project_id)
+    try:
+        rows, next_cursor = await search.ranked_page(db, query, Prompt.text, q, cursor, limit)
+    except search.SearchQueryError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [PromptHit(**row._mapping) for row in rows]
+
+# ---------------------------
+# Single prompt of one of the user's projects
+# ---------------------------
+async def _get_owned_prompt(db: AsyncSession, prompt_id: int, user_id: int) -> Prompt:
+    prompt = await db.scalar(
+        select(Prompt)
+        .join(Project, Prompt.project_id == Project.id)
+        .where(Prompt.id == prompt_id, Project.user_id == user_id)
+    )
     if not prompt:
         raise HTTPException(status_code=404, detail="Prompt not found")
     return prompt
 
+# ---------------------------
+# Get a single prompt (CRUD: Read)
+# ---------------------------
+@router.get("/{prompt_id}", response_model=PromptOut)
+async def get_prompt(
+    prompt_id: int,
+    request: Request,
+    response: Response,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    prompt = await _get_owned_prompt(db, prompt_id, current_user.id)
+    tag = etag.make_etag("prompt", prompt.id, prompt.updated_at)
+    if etag.is_fresh(request, tag):
+        return etag.not_modified(tag)
+    etag.set_etag(response, tag)
+    return prompt
+
 # ---------------------------
 # Update a prompt (CRUD: Update)
 # ---------------------------
-@router.put("/{prompt_id}")
-def update_prompt(
+@router.put("/{prompt_id}", response_model=PromptOut)
+async def update_prompt(
     prompt_id: int,
     data: PromptSchema,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    prompt = db.query(Prompt).filter(Prompt.id == prompt_id).first()
-    if not prompt:
-        raise HTTPException(status_code=404, detail="Prompt not found")
+    prompt = await _get_owned_prompt(db, prompt_id, current_user.id)
+    await load_owned_project(request, db, data.project_id, current_user.id)  # Target project
+    await bump_versions(db, {prompt.project_id, data.project_id})
     prompt.text = data.text
     prompt.project_id = data.project_id
-    db.commit()
-    db.refresh(prompt)
+    await db.commit()
+    await db.refresh(prompt)
     return prompt
 
 # ---------------------------
 # Delete a prompt (CRUD: Delete)
 # ---------------------------
 @router.delete("/{prompt_id}")
-def delete_prompt(
+async def delete_prompt(
     prompt_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    prompt = db.query(Prompt).filter(Prompt.id == prompt_id).first()
-    if not prompt:
-        raise HTTPException(status_code=404, detail="Prompt not found")
-    db.delete(prompt)
-    db.commit()
+    prompt = await _get_owned_prompt(db, prompt_id, current_user.id)
+    await bump_versions(db, [prompt.project_id])
+    await db.delete(prompt)
+    await db.commit()
     return {"message": "Prompt deleted successfully"}
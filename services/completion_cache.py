@@ -0,0 +1,211 @@
+# ---------------------------
+# File: services/completion_cache.py
+# ---------------------------
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from starlette.concurrency import run_in_threadpool
+from services.metrics import CHAT_CACHE_LOOKUPS
+from config import get_settings
+
+# ---------------------------
+# Configuration
+# ---------------------------
+settings = get_settings()
+CHAT_CACHE_ENABLED = settings.chat_cache_enabled  # Opt-in
+CHAT_CACHE_BACKEND = settings.chat_cache_backend  # "memory" or "sqlite"
+CHAT_CACHE_TTL = settings.chat_cache_ttl          # Seconds a reply stays valid
+CHAT_CACHE_SIZE = settings.chat_cache_size        # Max cached replies
+CHAT_CACHE_PATH = settings.chat_cache_path        # SQLite backend file
+
+
+def cache_key(model: str, messages: list[dict], max_tokens: int, project_id: int,
+              temperature: float | None = None) -> str:
+    """Stable hash of everything that determines the upstream reply."""
+    raw = json.dumps([model, messages, max_tokens, project_id, temperature], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+# ---------------------------
+# In-process backend
+# ---------------------------
+class MemoryBackend:
+    """LRU with per-entry TTL. Fast enough to call directly from the event loop."""
+
+    blocking = False
+
+    def __init__(self, maxsize: int = CHAT_CACHE_SIZE, ttl: float = CHAT_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# ---------------------------
+# Shared SQLite backend (stand-in for Redis across workers on one host)
+# ---------------------------
+class SQLiteBackend:
+    """
+    TTL + LRU cache in a local SQLite file, shareable by several worker
+    processes. Calls block on disk, so CompletionCache runs them in the threadpool.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str = CHAT_CACHE_PATH, maxsize: int = CHAT_CACHE_SIZE, ttl: float = CHAT_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS completions ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL, used_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_completions_used_at ON completions (used_at)")
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM completions WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE completions SET used_at = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions (key, value, expires_at, used_at) VALUES (?, ?, ?, ?)",
+                (key, value, now + self.ttl, now),
+            )
+            # Prune expired rows and least-recently-used overflow every 100 writes
+            self._writes += 1
+            if self._writes % 100 == 0:
+                self._conn.execute("DELETE FROM completions WHERE expires_at <= ?", (now,))
+                self._conn.execute(
+                    "DELETE FROM completions WHERE key IN ("
+                    " SELECT key FROM completions ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                    (self.maxsize,),
+                )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM completions")
+
+
+# ---------------------------
+# Cache front-end with request coalescing
+# ---------------------------
+class CompletionCache:
+    """
+    Caches upstream replies by key. Concurrent misses for the same key share a
+    single upstream call: the first caller computes, the rest await its result.
+    """
+
+    def __init__(self, backend, enabled: bool = True):
+        self.backend = backend
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    async def _backend(self, fn, *args):
+        if self.backend.blocking:
+            return await run_in_threadpool(fn, *args)
+        return fn(*args)
+
+    async def get_or_compute(self, key: str, compute) -> str:
+        """Return the cached reply for `key`, or await `compute()` once and cache it."""
+        cached = await self._backend(self.backend.get, key)
+        if cached is not None:
+            self.hits += 1
+            CHAT_CACHE_LOOKUPS.labels("hit").inc()
+            return cached
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            CHAT_CACHE_LOOKUPS.labels("coalesced").inc()
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # The leading request was cancelled (not us): compute ourselves
+                if pending.cancelled():
+                    return await self.get_or_compute(key, compute)
+                raise
+
+        self.misses += 1
+        CHAT_CACHE_LOOKUPS.labels("miss").inc()
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else was waiting
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        future.set_result(value)
+        await self._backend(self.backend.set, key, value)
+        return value
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
+
+
+def _backend_from_env():
+    if CHAT_CACHE_BACKEND == "sqlite":
+        return SQLiteBackend()
+    return MemoryBackend()
+
+
+# Shared instance used by routers/chat.py
+completion_cache = CompletionCache(_backend_from_env() if CHAT_CACHE_ENABLED else MemoryBackend(),
+                                   enabled=CHAT_CACHE_ENABLED)
@@ -0,0 +1,71 @@
+# ---------------------------
+# File: services/compression.py
+# ---------------------------
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder, IdentityResponder
+from starlette.types import Receive, Scope, Send
+
+try:
+    import brotli  # Optional: pip install brotli
+except ImportError:
+    brotli = None
+
+
+# ---------------------------
+# Compressed bodies are a different representation: strong ETags become weak
+# ---------------------------
+class _WeakETagMixin:
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        headers = MutableHeaders(raw=self.initial_message["headers"])
+        tag = headers.get("etag")
+        if tag and not tag.startswith("W/"):
+            headers["ETag"] = "W/" + tag  # If-None-Match compares weakly, so 304s still work
+        return super().apply_compression(body, more_body=more_body)
+
+
+class _GZip(_WeakETagMixin, GZipResponder):
+    pass
+
+
+class _Brotli(_WeakETagMixin, IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app, minimum_size: int, quality: int):
+        super().__init__(app, minimum_size)
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        super().apply_compression(body, more_body=more_body)
+        data = self.compressor.process(body)
+        # Flush each chunk of a streamed response so clients are not kept waiting
+        return data + (self.compressor.flush() if more_body else self.compressor.finish())
+
+
+# ---------------------------
+# Middleware: brotli when installed and accepted, else gzip
+# ---------------------------
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Compress responses of at least `minimum_size` bytes. Server-sent events
+    (chat streams) and responses that already have a Content-Encoding are
+    passed through, as by Starlette's GZipMiddleware.
+    """
+
+    def __init__(self, app, minimum_size: int = 1000, gzip_level: int = 6, brotli_quality: int = 4):
+        super().__init__(app, minimum_size=minimum_size, compresslevel=gzip_level)
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accepted = Headers(scope=scope).get("Accept-Encoding", "")
+        if brotli is not None and "br" in accepted:
+            responder = _Brotli(self.app, self.minimum_size, self.brotli_quality)
+        elif "gzip" in accepted:
+            responder = _GZip(self.app, self.minimum_size, compresslevel=self.compresslevel)
+        else:
+            responder = IdentityResponder(self.app, self.minimum_size)
+        await responder(scope, receive, send)
@@ -0,0 +1,90 @@
+# ---------------------------
+# File: services/embeddings.py
+# ---------------------------
+
+import importlib
+import math
+import re
+import zlib
+from functools import lru_cache
+import numpy as np
+from config import get_settings
+
+# ---------------------------
+# Configuration
+# ---------------------------
+settings = get_settings()
+EMBEDDER = settings.embedder            # "hashing" or "package.module:factory"
+EMBEDDING_DIM = settings.embedding_dim  # Vector width of the hashing embedder
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+# Function words carry no topic and would dominate short queries
+_STOPWORDS = frozenset("""
+a an and are as at be but by can do does for from had has have how i if in is it its me my no not of on or
+our so than that the their them then there these they this to was we were what when where which who why
+will with you your
+""".split())
+
+
+# ---------------------------
+# Default local embedder (no model download, no network)
+# ---------------------------
+class HashingEmbedder:
+    """
+    Feature-hashing bag of words + bigrams with sublinear term frequency.
+    Each feature lands in one of `dim` buckets with a hash-derived sign;
+    rows are L2-normalised, so a dot product is cosine similarity.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM, stopwords: frozenset[str] = _STOPWORDS):
+        self.dim = dim
+        self.stopwords = stopwords  # Words left out of the features
+
+    def _features(self, text: str):
+        words = [w for w in _TOKEN.findall(text.lower()) if w not in self.stopwords]
+        yield from words
+        yield from (f"{a} {b}" for a, b in zip(words, words[1:]))
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts: dict[int, float] = {}
+            for feature in self._features(text):
+                h = zlib.crc32(feature.encode())  # Stable across processes, unlike hash()
+                bucket = h % self.dim
+                counts[bucket] = counts.get(bucket, 0.0) + (1.0 if h & 0x80000000 else -1.0)
+            for bucket, value in counts.items():
+                out[row, bucket] = math.copysign(1.0 + math.log(abs(value)), value) if value else 0.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        np.divide(out, norms, out=out, where=norms > 0)
+        return out
+
+
+# ---------------------------
+# Embedder selection
+# ---------------------------
+@lru_cache(maxsize=None)
+def get_embedder():
+    """
+    Return the configured embedder: any object with `dim` and
+    `embed(list[str]) -> float32 array (n, dim)` with L2-normalised rows.
+    """
+    if EMBEDDER == "hashing":
+        return HashingEmbedder()
+    module_name, _, factory = EMBEDDER.partition(":")
+    return getattr(importlib.import_module(module_name), factory)()
+
+
+@lru_cache(maxsize=None)
+def get_cache_embedder():
+    """
+    Embedder for semantic cache keys. Retrieval drops function words, but
+    they decide what a question asks ("is X allowed" vs "is X not allowed",
+    "what is X" vs "why is X"); the cache strips its own filler words first,
+    so the hashing embedder keeps every word it is given here. A configured
+    embedder is used as is.
+    """
+    if EMBEDDER == "hashing":
+        return HashingEmbedder(stopwords=frozenset())
+    return get_embedder()
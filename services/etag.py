@@ -0,0 +1,52 @@
+# ---------------------------
+# File: services/etag.py
+# ---------------------------
+
+import hashlib
+from fastapi import Request, Response
+from sqlalchemy import func, select
+
+# Browsers revalidate every time and keep the copy out of shared caches (responses are per user)
+CACHE_CONTROL = "private, no-cache"
+
+
+# ---------------------------
+# Validators
+# ---------------------------
+def make_etag(*parts) -> str:
+    """Strong ETag over the given values (row ids, timestamps, counts, query string)."""
+    digest = hashlib.sha256("|".join(map(str, parts)).encode()).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def collection_state(id_col, updated_col):
+    """
+    (count, max(updated_at)) of a collection; add the caller's WHERE and joins.
+    Any insert raises max(updated_at) or the count, an update raises
+    max(updated_at) (onupdate), a delete lowers the count, so together they
+    change whenever a listing could; served by an (owner, updated_at) index
+    without reading the rows. Assumes the app servers' clocks agree.
+    """
+    return select(func.count(id_col), func.max(updated_col))
+
+
+def is_fresh(request: Request, etag: str) -> bool:
+    """True when If-None-Match names `etag` (weak comparison, as RFC 9110 requires for GET)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+
+# ---------------------------
+# Responses
+# ---------------------------
+def set_etag(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
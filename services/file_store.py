@@ -0,0 +1,249 @@
+# ---------------------------
+# File: services/file_store.py
+# ---------------------------
+
+import fcntl
+import hashlib
+import os
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+import anyio
+from fastapi import UploadFile
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import AsyncSessionLocal
+from models import UploadedFile
+from config import get_settings
+
+# ---------------------------
+# Configuration
+# ---------------------------
+settings = get_settings()
+UPLOAD_DIR = settings.upload_dir                    # Root of the blob store
+UPLOAD_CHUNK_SIZE = settings.upload_chunk_size      # Bytes read/written per step
+UPLOAD_MAX_BYTES = settings.upload_max_bytes        # Per-file limit
+PROJECT_QUOTA_BYTES = settings.project_quota_bytes  # Per-project total (0 = unlimited)
+
+
+class UploadTooLarge(Exception):
+    """The stream exceeded the allowed size; nothing was stored."""
+
+
+@dataclass
+class StoredBlob:
+    sha256: str
+    size: int
+    path: str
+    created: bool  # False when identical content was already stored
+    spare: str | None = None  # Temp copy kept until settle_blob() when the content already existed
+
+
+# ---------------------------
+# Content-addressed layout: objects/ab/cd/abcd...
+# ---------------------------
+def blob_path(sha256: str) -> str:
+    return os.path.join(UPLOAD_DIR, "objects", sha256[:2], sha256[2:4], sha256)
+
+
+def _write_chunk(f, digest, chunk: bytes):
+    # hashlib releases the GIL on large buffers, so hashing shares the worker thread with the write
+    digest.update(chunk)
+    f.write(chunk)
+
+
+def _commit_blob(tmp_path: str, final_path: str) -> bool:
+    """
+    Move a finished temp file into place; returns False if the blob already
+    existed, in which case the temp file is left for the caller (see settle_blob).
+    """
+    if os.path.exists(final_path):
+        return False
+    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+    os.replace(tmp_path, final_path)
+    return True
+
+
+def _discard(tmp_path: str):
+    try:
+        os.remove(tmp_path)
+    except FileNotFoundError:
+        pass
+
+
+# ---------------------------
+# Streaming writes
+# ---------------------------
+async def store_stream(chunks, max_bytes: int = UPLOAD_MAX_BYTES) -> StoredBlob:
+    """
+    Write an async iterable of byte chunks into the store, hashing as it goes.
+    Raises UploadTooLarge as soon as more than `max_bytes` arrive.
+    Identical content is stored once.
+    """
+    tmp_dir = os.path.join(UPLOAD_DIR, "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    tmp_path = os.path.join(tmp_dir, uuid.uuid4().hex)
+
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        f = await anyio.to_thread.run_sync(open, tmp_path, "wb")
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge()
+                await anyio.to_thread.run_sync(_write_chunk, f, digest, chunk)
+        finally:
+            await anyio.to_thread.run_sync(f.close)
+
+        sha256 = digest.hexdigest()
+        final_path = blob_path(sha256)
+        created = await anyio.to_thread.run_sync(_commit_blob, tmp_path, final_path)
+        return StoredBlob(sha256=sha256, size=size, path=final_path, created=created,
+                          spare=None if created else tmp_path)
+    except BaseException:
+        with anyio.CancelScope(shield=True):
+            await anyio.to_thread.run_sync(_discard, tmp_path)
+        raise
+
+
+def store_file(path: str) -> StoredBlob:
+    """Blocking copy of an existing local file into the store (used by backfill_uploads.py)."""
+    digest = hashlib.sha256()
+    size = 0
+    tmp_dir = os.path.join(UPLOAD_DIR, "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    tmp_path = os.path.join(tmp_dir, uuid.uuid4().hex)
+    try:
+        with open(path, "rb") as src, open(tmp_path, "wb") as dst:
+            while chunk := src.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                _write_chunk(dst, digest, chunk)
+        sha256 = digest.hexdigest()
+        created = _commit_blob(tmp_path, blob_path(sha256))
+        if not created:
+            _discard(tmp_path)  # Offline backfill: no deletes run concurrently
+        return StoredBlob(sha256=sha256, size=size, path=blob_path(sha256), created=created)
+    except BaseException:
+        _discard(tmp_path)
+        raise
+
+
+def delete_blob(sha256: str):
+    """Remove a stored blob (callers check no other record references it, see delete_unreferenced_blob)."""
+    _discard(blob_path(sha256))
+
+
+# ---------------------------
+# Deletes vs. concurrent uploads of the same content
+# ---------------------------
+# An upload that finds its content already stored inserts its UploadedFile
+# row later; a delete that checked for references in between would remove
+# the blob under it. Deletes check and remove under a per-hash lock (shared
+# by every worker process on the host), and uploads keep their temp copy
+# until their row is committed, then put it back under the same lock if
+# the blob was deleted meanwhile.
+def _lock(sha256: str) -> int:
+    lock_dir = os.path.join(UPLOAD_DIR, "locks")
+    os.makedirs(lock_dir, exist_ok=True)
+    fd = os.open(os.path.join(lock_dir, sha256[:2]), os.O_RDWR | os.O_CREAT, 0o644)  # 256 stripes
+    fcntl.flock(fd, fcntl.LOCK_EX)
+    return fd
+
+
+def _unlock(fd: int):
+    fcntl.flock(fd, fcntl.LOCK_UN)
+    os.close(fd)
+
+
+@asynccontextmanager
+async def blob_lock(sha256: str):
+    fd = await anyio.to_thread.run_sync(_lock, sha256)
+    try:
+        yield
+    finally:
+        _unlock(fd)
+
+
+def _settle(blob: StoredBlob):
+    if os.path.exists(blob.path):
+        _discard(blob.spare)
+    else:
+        os.makedirs(os.path.dirname(blob.path), exist_ok=True)
+        os.replace(blob.spare, blob.path)
+
+
+async def settle_blob(blob: StoredBlob):
+    """Call once the rows referencing `blob` are committed: restores it if a delete removed it meanwhile."""
+    if blob.spare is None:
+        return
+    async with blob_lock(blob.sha256):
+        await anyio.to_thread.run_sync(_settle, blob)
+    blob.spare = None
+
+
+async def discard_spare(blob: StoredBlob):
+    """Call instead of settle_blob when the rows were not committed."""
+    if blob.spare is not None:
+        await anyio.to_thread.run_sync(_discard, blob.spare)
+        blob.spare = None
+
+
+async def delete_unreferenced_blob(sha256: str) -> bool:
+    """Remove the blob unless an UploadedFile row references it; True if removed."""
+    async with blob_lock(sha256):
+        # Own session: a fresh transaction sees every row committed before the lock was taken
+        async with AsyncSessionLocal() as db:
+            if await db.scalar(select(UploadedFile.id).where(UploadedFile.sha256 == sha256).limit(1)):
+                return False
+        await anyio.to_thread.run_sync(delete_blob, sha256)
+        return True
+
+
+# ---------------------------
+# Project uploads (blob + metadata row)
+# ---------------------------
+async def project_bytes_left(db: AsyncSession, project_id: int) -> int:
+    """Bytes the next upload may use: the per-file limit, capped by the project quota."""
+    if not PROJECT_QUOTA_BYTES:
+        return UPLOAD_MAX_BYTES
+    used = await db.scalar(
+        select(func.coalesce(func.sum(UploadedFile.size), 0)).where(UploadedFile.project_id == project_id)
+    )
+    return max(0, min(UPLOAD_MAX_BYTES, PROJECT_QUOTA_BYTES - used))
+
+
+async def store_project_file(db: AsyncSession, project_id: int, kind: str, filename: str,
+                             content_type: str | None, chunks) -> UploadedFile:
+    """
+    Stream `chunks` into the blob store under the project's remaining quota and
+    record an UploadedFile row. Raises UploadTooLarge without storing anything.
+    """
+    blob = await store_stream(chunks, await project_bytes_left(db, project_id))
+    record = UploadedFile(
+        project_id=project_id,
+        kind=kind,
+        filename=os.path.basename(filename or "") or blob.sha256,  # Drop client-side directories
+        sha256=blob.sha256,
+        size=blob.size,
+        content_type=content_type,
+    )
+    db.add(record)
+    try:
+        await db.commit()
+    except BaseException:
+        with anyio.CancelScope(shield=True):
+            await discard_spare(blob)
+        raise
+    await settle_blob(blob)
+    await db.refresh(record)
+    return record
+
+
+def upload_chunks(file: UploadFile):
+    """Async iterator over a multipart UploadFile in UPLOAD_CHUNK_SIZE pieces."""
+    async def chunks():
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            yield chunk
+    return chunks()
@@ -0,0 +1,114 @@
+# ---------------------------
+# File: services/hashing.py
+# ---------------------------
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from passlib.hash import bcrypt
+from config import get_settings
+
+# ---------------------------
+# Configuration
+# ---------------------------
+settings = get_settings()
+BCRYPT_ROUNDS = settings.bcrypt_rounds                                 # bcrypt work factor (log2 rounds)
+HASH_WORKERS = settings.hash_workers or os.cpu_count() or 1            # Processes doing bcrypt
+HASH_MAX_PENDING = settings.hash_max_pending or HASH_WORKERS * 8       # Queue bound before shedding load
+
+_pool: ProcessPoolExecutor | None = None
+_pending = 0  # Hash jobs submitted and not finished (touched only from the event loop)
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing queue is full; callers should answer 503."""
+
+
+# ---------------------------
+# Work done inside the pool processes (must be module-level to pickle)
+# ---------------------------
+def _hash(password: str, rounds: int) -> str:
+    return bcrypt.using(rounds=rounds).hash(password)
+
+
+def _verify(password: str, password_hash: str, rounds: int) -> tuple[bool, str | None]:
+    """Return (valid, new_hash); new_hash is set when the stored cost differs from `rounds`."""
+    if not bcrypt.verify(password, password_hash):
+        return False, None
+    hasher = bcrypt.using(rounds=rounds)
+    if hasher.needs_update(password_hash):
+        return True, hasher.hash(password)
+    return True, None
+
+
+def _ready() -> bool:
+    return True
+
+
+# ---------------------------
+# Lifespan hooks
+# ---------------------------
+def configure(workers: int):
+    """
+    Size the pool before it starts, e.g. per gunicorn worker; HASH_MAX_PENDING
+    follows unless it is set explicitly.
+    """
+    global HASH_WORKERS, HASH_MAX_PENDING
+    if _pool is not None:
+        raise RuntimeError("hashing pool already started")
+    HASH_WORKERS = workers
+    HASH_MAX_PENDING = settings.hash_max_pending or workers * 8
+
+
+def start_pool():
+    """Create the hashing process pool (spawn context: safe to start from a threaded server)."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=HASH_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+async def warm_pool():
+    """
+    Start every pool process now; they are otherwise spawned one by one by
+    the first logins, each paying for a fresh interpreter and passlib import.
+    """
+    pool = start_pool()
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(*(loop.run_in_executor(pool, _ready) for _ in range(HASH_WORKERS)))
+
+
+def stop_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+
+
+async def _submit(fn, *args):
+    global _pending
+    if _pending >= HASH_MAX_PENDING:
+        raise HashingBusy()
+    pool = start_pool()
+    _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+    finally:
+        _pending -= 1
+
+
+# ---------------------------
+# Public API
+# ---------------------------
+async def hash_password(password: str) -> str:
+    """Hash a password at the configured cost without blocking the event loop."""
+    return await _submit(_hash, password, BCRYPT_ROUNDS)
+
+
+async def verify_password(password: str, password_hash: str) -> tuple[bool, str | None]:
+    """
+    Check a password. Returns (valid, new_hash); store new_hash when it is not
+    None so accounts migrate to the current BCRYPT_ROUNDS on their next login.
+    """
+    return await _submit(_verify, password, password_hash, BCRYPT_ROUNDS)
@@ -0,0 +1,163 @@
+# ---------------------------
+# File: services/ingest.py
+# ---------------------------
+
+import logging
+import os
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from database import SessionLocal
+from models import FileChunk, UploadedFile
+from services import jobs
+from services.embeddings import get_embedder
+from services.file_store import blob_path
+from services.vector_index import drop_index, get_index
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------
+# Configuration
+# ---------------------------
+settings = get_settings()
+CHUNK_CHARS = settings.rag_chunk_chars      # Target chunk length
+CHUNK_OVERLAP = settings.rag_chunk_overlap  # Characters shared by neighbouring chunks
+RAG_TOP_K = settings.rag_top_k              # Chunks injected into the prompt
+RAG_MIN_SCORE = settings.rag_min_score      # Cosine similarity floor
+
+TEXT_EXTENSIONS = {".txt", ".md", ".markdown", ".rst", ".csv", ".json"}
+
+
+# ---------------------------
+# Text extraction
+# ---------------------------
+def extract_text(path: str, filename: str, content_type: str | None) -> str | None:
+    """Plain text of a stored upload, or None for unsupported types."""
+    ext = os.path.splitext(filename)[1].lower()
+    if ext == ".pdf" or content_type == "application/pdf":
+        try:
+            from pypdf import PdfReader  # Optional dependency
+        except ImportError:
+            logger.warning("pypdf is not installed; skipping %s", filename)
+            return None
+        return "\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+    if ext in TEXT_EXTENSIONS or (content_type or "").startswith("text/"):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            return f.read()
+    return None
+
+
+def chunk_text(text: str, size: int = CHUNK_CHARS, overlap: int = CHUNK_OVERLAP) -> list[str]:
+    """Split on paragraph boundaries into ~`size` character chunks with `overlap`."""
+    chunks, current = [], ""
+    for paragraph in (p.strip() for p in text.split("\n\n")):
+        if not paragraph:
+            continue
+        while len(paragraph) > size:  # Hard-split very long paragraphs
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(paragraph[:size])
+            paragraph = paragraph[size - overlap:]
+        if current and len(current) + len(paragraph) + 2 > size:
+            chunks.append(current)
+            tail = current[-overlap:] if overlap else ""
+            tail = tail[tail.find(" ") + 1:]  # Start the overlap on a word boundary
+            current = f"{tail}\n\n{paragraph}" if tail else paragraph
+        else:
+            current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+# ---------------------------
+# Ingestion (runs in the background, one file at a time)
+# ---------------------------
+@jobs.handler("ingest_file")
+def ingest_file(file_id: int) -> dict:
+    """
+    Chunk, embed and index one uploaded file. Only this file's chunks are
+    embedded; rows already in the project index are left alone.
+    Does nothing if the file is unsupported or already ingested.
+    Runs as an "ingest_file" job; raising lets the job queue retry it.
+
+    Chunks are committed before their vectors are appended, so the index
+    never holds ids of rows that were rolled back (file_chunks ids are
+    never reused). A retry after a failed append indexes what is missing.
+    """
+    db = SessionLocal()
+    try:
+        record = db.get(UploadedFile, file_id)
+        if record is None:
+            return {"chunks": 0}
+        existing = db.query(FileChunk.id, FileChunk.text).filter(FileChunk.file_id == file_id).all()
+        if existing:
+            _index_chunks(record.project_id, [row.id for row in existing], [row.text for row in existing])
+            return {"chunks": len(existing)}
+
+        text = extract_text(blob_path(record.sha256), record.filename, record.content_type)
+        pieces = chunk_text(text) if text else []
+        if not pieces:
+            return {"chunks": 0}
+
+        rows = [FileChunk(project_id=record.project_id, file_id=file_id, position=i, text=piece)
+                for i, piece in enumerate(pieces)]
+        db.add_all(rows)
+        db.flush()  # Assign chunk ids
+        project_id, chunk_ids = record.project_id, [row.id for row in rows]
+        db.commit()
+
+        _index_chunks(project_id, chunk_ids, pieces)
+        logger.info("indexed file %s (%d chunks) for project %s", file_id, len(chunk_ids), project_id)
+        return {"chunks": len(chunk_ids)}
+    except Exception:
+        db.rollback()
+        logger.exception("ingestion failed for file %s", file_id)
+        raise
+    finally:
+        db.close()
+
+
+def _index_chunks(project_id: int, chunk_ids: list[int], texts: list[str]):
+    """Embed and append the chunks not yet in the project index."""
+    embedder = get_embedder()
+    index = get_index(project_id, embedder.dim)
+    missing = [i for i, present in enumerate(index.contains(chunk_ids)) if not present]
+    if missing:
+        index.add([chunk_ids[i] for i in missing], embedder.embed([texts[i] for i in missing]))
+
+
+def remove_file(project_id: int, chunk_ids: list[int]):
+    """Drop a deleted file's chunks from the project index."""
+    if chunk_ids:
+        get_index(project_id, get_embedder().dim).remove(chunk_ids)
+
+
+def remove_project(project_id: int):
+    """Drop a deleted project's whole index."""
+    drop_index(project_id)
+
+
+# ---------------------------
+# Retrieval (chat time)
+# ---------------------------
+def _search(project_id: int, message: str, k: int):
+    embedder = get_embedder()
+    index = get_index(project_id, embedder.dim)
+    if len(index) == 0:
+        return []
+    return index.search(embedder.embed([message])[0], k)
+
+
+async def retrieve_context(db: AsyncSession, project_id: int, message: str, k: int = RAG_TOP_K) -> list[str]:
+    """Texts of the `k` chunks most similar to `message`, best first."""
+    hits = [(chunk_id, score) for chunk_id, score in await run_in_threadpool(_search, project_id, message, k)
+            if score >= RAG_MIN_SCORE]
+    if not hits:
+        return []
+    rows = await db.execute(select(FileChunk.id, FileChunk.text).where(
+        FileChunk.project_id == project_id, FileChunk.id.in_([c for c, _ in hits])))
+    texts = dict(rows.all())
+    return list(dict.fromkeys(texts[c] for c, _ in hits if c in texts))  # Keep rank order, drop duplicates
@@ -0,0 +1,206 @@
+# ---------------------------
+# File: services/jobs.py
+# ---------------------------
+
+import asyncio
+import inspect
+import json
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from database import AsyncSessionLocal
+from models import Job
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------
+# Configuration
+# ---------------------------
+settings = get_settings()
+JOB_WORKERS = settings.job_workers                # Worker tasks per process, 0 = do not run jobs here
+JOB_POLL_INTERVAL = settings.job_poll_interval    # Seconds between polls when idle
+JOB_MAX_ATTEMPTS = settings.job_max_attempts      # Tries before a job is marked failed
+JOB_RETRY_BASE = settings.job_retry_base          # First retry delay; doubles per attempt
+JOB_RETRY_MAX = settings.job_retry_max            # Cap on the retry delay
+JOB_LEASE_SECONDS = settings.job_lease_seconds    # Running jobs older than this are re-claimed
+JOB_RETENTION_DAYS = settings.job_retention_days  # Finished jobs pruned at startup after this
+
+_handlers: dict = {}          # kind -> callable(**payload)
+_workers: list[asyncio.Task] = []
+_wakeup: asyncio.Event | None = None
+
+
+# ---------------------------
+# Handler registry
+# ---------------------------
+def handler(kind: str):
+    """
+    Register a function as the handler for `kind` jobs.
+    It is called with the job payload as keyword arguments; sync functions
+    run in the threadpool. Handlers may run more than once (retries, worker
+    restarts), so they must be idempotent. The return value, if any, must
+    be JSON serialisable and is stored as the job result.
+    """
+    def register(fn):
+        _handlers[kind] = fn
+        return fn
+    return register
+
+
+# ---------------------------
+# Enqueue (called from routes)
+# ---------------------------
+async def enqueue(db: AsyncSession, kind: str, payload: dict, user_id: int | None = None,
+                  max_attempts: int = JOB_MAX_ATTEMPTS) -> Job:
+    """Persist a job and wake an idle worker. Commits the session."""
+    job = Job(kind=kind, payload=json.dumps(payload), user_id=user_id, max_attempts=max_attempts)
+    db.add(job)
+    await db.commit()
+    if _wakeup is not None:
+        _wakeup.set()
+    return job
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff: base, 2*base, 4*base ... capped at JOB_RETRY_MAX."""
+    return min(JOB_RETRY_MAX, JOB_RETRY_BASE * 2 ** max(attempts - 1, 0))
+
+
+# ---------------------------
+# Claiming: a conditional UPDATE so concurrent workers (and processes) never share a job
+# ---------------------------
+def _due(now: datetime):
+    return or_(
+        and_(Job.status == "queued", Job.run_after <= now),
+        and_(Job.status == "running", Job.locked_until < now),  # Worker died mid-job
+    )
+
+
+async def _claim() -> Job | None:
+    now = datetime.utcnow()
+    async with AsyncSessionLocal() as db:
+        candidates = (await db.scalars(
+            select(Job.id).where(_due(now)).order_by(Job.run_after, Job.id).limit(JOB_WORKERS + 1)
+        )).all()
+        for job_id in candidates:
+            claimed = await db.execute(
+                update(Job)
+                .where(Job.id == job_id, _due(now))
+                .values(status="running", attempts=Job.attempts + 1,
+                        locked_until=now + timedelta(seconds=JOB_LEASE_SECONDS), updated_at=now)
+            )
+            if claimed.rowcount == 1:
+                await db.commit()
+                return await db.get(Job, job_id)
+        await db.commit()
+    return None
+
+
+async def _finish(job_id: int, **values):
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(Job).where(Job.id == job_id).values(
+            locked_until=None, updated_at=datetime.utcnow(), **values
+        ))
+        await db.commit()
+
+
+async def _run(job: Job):
+    fn = _handlers.get(job.kind)
+    if fn is None:
+        logger.error("job %s: no handler for kind %r", job.id, job.kind)
+        await _finish(job.id, status="failed", error=f"Unknown job kind {job.kind!r}")
+        return
+    if job.attempts > job.max_attempts:  # Lease expired on the last attempt
+        await _finish(job.id, status="failed", error=job.error or "Worker lost the job on its last attempt")
+        return
+
+    try:
+        kwargs = json.loads(job.payload)
+        if inspect.iscoroutinefunction(fn):
+            result = await fn(**kwargs)
+        else:
+            result = await run_in_threadpool(fn, **kwargs)
+    except asyncio.CancelledError:
+        # Shutting down: hand the job back without spending an attempt
+        await _finish(job.id, status="queued", attempts=job.attempts - 1)
+        raise
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        if job.attempts < job.max_attempts:
+            delay = retry_delay(job.attempts)
+            logger.warning("job %s (%s) attempt %d failed, retrying in %.1fs: %s",
+                           job.id, job.kind, job.attempts, delay, error)
+            await _finish(job.id, status="queued", error=error,
+                          run_after=datetime.utcnow() + timedelta(seconds=delay))
+        else:
+            logger.error("job %s (%s) failed after %d attempts: %s", job.id, job.kind, job.attempts, error)
+            await _finish(job.id, status="failed", error=error)
+        return
+
+    await _finish(job.id, status="succeeded", error=None,
+                  result=json.dumps(result) if result is not None else None)
+
+
+# ---------------------------
+# Worker loop
+# ---------------------------
+async def _worker(n: int):
+    while True:
+        try:
+            job = await _claim()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("job worker %d could not poll the queue", n)
+            job = None
+
+        if job is not None:
+            try:
+                await _run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("job worker %d could not record the outcome of job %s", n, job.id)
+            continue
+
+        # Idle: sleep until the next poll or until enqueue() wakes us
+        try:
+            await asyncio.wait_for(_wakeup.wait(), JOB_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+
+
+async def _prune():
+    cutoff = datetime.utcnow() - timedelta(days=JOB_RETENTION_DAYS)
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(Job).where(Job.status.in_(("succeeded", "failed")), Job.updated_at < cutoff))
+        await db.commit()
+
+
+# ---------------------------
+# Lifespan hooks
+# ---------------------------
+async def start_workers():
+    """Start JOB_WORKERS worker tasks on the running event loop."""
+    global _wakeup
+    if _workers or JOB_WORKERS <= 0:
+        return
+    _wakeup = asyncio.Event()
+    try:
+        await _prune()
+    except Exception:
+        logger.exception("could not prune finished jobs")
+    for n in range(JOB_WORKERS):
+        _workers.append(asyncio.create_task(_worker(n), name=f"job-worker-{n}"))
+
+
+async def stop_workers():
+    """Cancel the workers; jobs they were running go back to the queue."""
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
@@ -0,0 +1,177 @@
+# ---------------------------
+# File: services/llm_client.py
+# ---------------------------
+
+import asyncio
+import json
+import logging
+import time
+import httpx
+from services import metrics
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------
+# Upstream and pool configuration
+# ---------------------------
+settings = get_settings()
+CHAT_API_URL = settings.chat_api_url
+
+LLM_MAX_CONNECTIONS = settings.llm_max_connections    # Total sockets to the upstream
+LLM_MAX_KEEPALIVE = settings.llm_max_keepalive        # Idle sockets kept open for reuse
+LLM_KEEPALIVE_EXPIRY = settings.llm_keepalive_expiry  # Seconds an idle socket stays open
+LLM_CONNECT_TIMEOUT = settings.llm_connect_timeout    # TCP + TLS handshake
+LLM_READ_TIMEOUT = settings.llm_read_timeout          # Waiting for completion bytes
+LLM_POOL_TIMEOUT = settings.llm_pool_timeout          # Waiting for a free pooled socket
+LLM_REQUEST_TIMEOUT = settings.llm_request_timeout    # Total deadline for one completion
+
+# Shared client, created by the app lifespan (see main.py)
+_client: httpx.AsyncClient | None = None
+
+
+# ---------------------------
+# Lifespan hooks
+# ---------------------------
+async def start_client():
+    """Create the shared keep-alive connection pool."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_MAX_KEEPALIVE,
+                keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(
+                connect=LLM_CONNECT_TIMEOUT,
+                read=LLM_READ_TIMEOUT,
+                write=LLM_CONNECT_TIMEOUT,
+                pool=LLM_POOL_TIMEOUT,
+            ),
+        )
+    return _client
+
+
+async def warm_connections(urls):
+    """
+    Open one keep-alive connection per upstream (DNS, TCP and TLS done
+    before the first chat) with a cheap HEAD request; its status is ignored.
+    An unreachable upstream is logged and left to the normal retry path.
+    """
+    client = await start_client()
+
+    async def connect(url: str):
+        try:
+            await client.head(url, timeout=LLM_CONNECT_TIMEOUT)
+        except httpx.HTTPError as e:
+            logger.warning("Could not pre-connect to %s: %r", url, e)
+
+    await asyncio.gather(*(connect(url) for url in dict.fromkeys(urls)))
+
+
+async def close_client():
+    """Close every pooled connection."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared client, failing loudly if the lifespan did not start it."""
+    if _client is None:
+        raise RuntimeError("LLM client is not started; call start_client() first")
+    return _client
+
+
+def _headers(api_key: str | None = None):
+    return {
+        "Authorization": f"Bearer {api_key or settings.chat_project_api_key}",
+        "Content-Type": "application/json",
+    }
+
+
+# ---------------------------
+# Chat completion call
+# ---------------------------
+async def chat_completion(payload: dict, timeout: float | None = None, url: str | None = None,
+                          api_key: str | None = None, provider: str = "default") -> dict:
+    """
+    POST an OpenAI-compatible chat completion and return the decoded JSON.
+    `timeout` is the total deadline in seconds (defaults to LLM_REQUEST_TIMEOUT);
+    the pool's read timeout only bounds the gap between bytes.
+    `url`/`api_key` select another provider (default CHAT_API_URL and
+    CHAT_PROJECT_API_KEY); `provider` labels the metrics.
+    Raises httpx.HTTPStatusError on non-2xx responses and asyncio.TimeoutError
+    when the deadline passes.
+    """
+    client = get_client()
+    started = time.perf_counter()
+    error = None
+    try:
+        response = await asyncio.wait_for(
+            client.post(url or CHAT_API_URL, headers=_headers(api_key), json=payload),
+            timeout or LLM_REQUEST_TIMEOUT,
+        )
+        response.raise_for_status()
+        completion = response.json()
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        metrics.LLM_LATENCY.labels(provider, "complete").observe(time.perf_counter() - started)
+        metrics.LLM_REQUESTS.labels(provider, "complete", metrics.llm_outcome(error)).inc()
+    metrics.record_usage(completion.get("usage"))
+    return completion
+
+
+# ---------------------------
+# Streaming chat completion
+# ---------------------------
+async def stream_chat_completion(payload: dict, on_usage=None, url: str | None = None,
+                                 api_key: str | None = None, provider: str = "default"):
+    """
+    Async generator yielding content deltas from an OpenAI-compatible SSE stream.
+    Closing the generator (e.g. on client disconnect) closes the upstream
+    response, which cancels the completion on the provider side.
+    `on_usage(usage)` is called with the usage block if the upstream sends one.
+    `url`/`api_key`/`provider` as for chat_completion.
+    Raises httpx.HTTPStatusError if the upstream rejects the request.
+    """
+    client = get_client()
+    started = time.perf_counter()
+    first_token = True
+    outcome = "cancelled"  # Generator closed before the stream ended
+    try:
+        async with client.stream("POST", url or CHAT_API_URL, headers=_headers(api_key), json={**payload, "stream": True}) as response:
+            if response.status_code != 200:
+                await response.aread()
+                response.raise_for_status()
+
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                # OpenAI sends `usage` on the last chunk when asked; Groq nests it in `x_groq`
+                usage = chunk.get("usage") or chunk.get("x_groq", {}).get("usage")
+                if usage:
+                    metrics.record_usage(usage)
+                    if on_usage is not None:
+                        on_usage(usage)
+                delta = chunk["choices"][0].get("delta", {}).get("content") if chunk.get("choices") else None
+                if delta:
+                    if first_token:
+                        metrics.LLM_FIRST_TOKEN.observe(time.perf_counter() - started)
+                        first_token = False
+                    yield delta
+        outcome = "ok"
+    except Exception as e:
+        outcome = metrics.llm_outcome(e)
+        raise
+    finally:
+        metrics.LLM_LATENCY.labels(provider, "stream").observe(time.perf_counter() - started)
+        metrics.LLM_REQUESTS.labels(provider, "stream", outcome).inc()
@@ -0,0 +1,337 @@
+# ---------------------------
+# File: services/llm_gateway.py
+# ---------------------------
+
+import asyncio
+import dataclasses
+import json
+import logging
+import os
+import random
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+import httpx
+from services import llm_client, metrics
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------
+# Configuration
+# ---------------------------
+# Ordered JSON list of OpenAI-compatible providers, e.g.
+# [{"name": "groq", "url": "https://api.groq.com/openai/v1/chat/completions",
+#   "api_key_env": "CHAT_PROJECT_API_KEY", "model": "llama-3.1-8b-instant"},
+#  {"name": "backup", "url": "http://10.0.0.5:8000/v1/chat/completions", "api_key_env": "BACKUP_API_KEY"}]
+# Unset: a single provider at CHAT_API_URL with CHAT_PROJECT_API_KEY.
+settings = get_settings()
+LLM_PROVIDERS = settings.llm_providers
+LLM_RETRIES = settings.llm_retries                    # Extra attempts per provider on 429/5xx/timeouts
+LLM_RETRY_BASE = settings.llm_retry_base              # Backoff base (full jitter, doubles per attempt)
+LLM_RETRY_MAX = settings.llm_retry_max                # Cap on one backoff sleep
+LLM_RETRY_AFTER_MAX = settings.llm_retry_after_max    # Longer Retry-After: fail over instead of waiting
+LLM_BREAKER_FAILURES = settings.llm_breaker_failures  # Consecutive failures that open the circuit
+LLM_BREAKER_COOLDOWN = settings.llm_breaker_cooldown  # Seconds open before one trial request
+LLM_HEDGE_DELAY = settings.llm_hedge_delay            # Seconds before a hedged request, 0 = off
+
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+FATAL_STATUS = {400, 413, 422}  # The request itself is bad: another provider would refuse it too
+
+
+class UpstreamUnavailable(Exception):
+    """Every provider's circuit is open; callers answer 503 with Retry-After."""
+
+    def __init__(self, retry_after: float):
+        super().__init__("no LLM provider is available")
+        self.retry_after = retry_after
+
+
+# ---------------------------
+# Providers
+# ---------------------------
+@dataclass(frozen=True)
+class Provider:
+    name: str
+    url: str
+    model: str | None = None                  # Overrides the payload's model when set
+    api_key_env: str = "CHAT_PROJECT_API_KEY"  # Environment variable holding the key (keys never live in the DB)
+    timeout: float | None = None              # Total deadline per attempt (default LLM_REQUEST_TIMEOUT)
+
+    @property
+    def api_key(self) -> str | None:
+        return os.getenv(self.api_key_env)
+
+
+def _load_providers() -> dict[str, Provider]:
+    if not LLM_PROVIDERS:
+        return {"groq": Provider(name="groq", url=llm_client.CHAT_API_URL)}
+    return {spec["name"]: Provider(**spec) for spec in json.loads(LLM_PROVIDERS)}
+
+
+PROVIDERS = _load_providers()
+
+
+def resolve_providers(spec: list | None) -> list[Provider]:
+    """
+    Providers for one project, in failover order. `spec` is the project's list
+    of provider names, or {"name": ..., "model": ...} entries to pick a model.
+    None or empty means every configured provider in LLM_PROVIDERS order.
+    Raises ValueError on unknown names.
+    """
+    if not spec:
+        return list(PROVIDERS.values())
+    providers = []
+    for entry in spec:
+        name, model = (entry, None) if isinstance(entry, str) else (entry.get("name"), entry.get("model"))
+        if name not in PROVIDERS:
+            raise ValueError(f"Unknown LLM provider {name!r}")
+        provider = PROVIDERS[name]
+        providers.append(dataclasses.replace(provider, model=model) if model else provider)
+    return providers
+
+
+# ---------------------------
+# Circuit breaker (one per provider, touched only from the event loop)
+# ---------------------------
+class CircuitBreaker:
+    """
+    Closed: requests flow. After `threshold` consecutive failures it opens and
+    refuses requests for `cooldown` seconds, then lets one trial request
+    through (half-open); the trial's outcome closes or re-opens it.
+    """
+
+    def __init__(self, name: str, threshold: int = LLM_BREAKER_FAILURES, cooldown: float = LLM_BREAKER_COOLDOWN):
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.trial = False
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if not self.trial and time.monotonic() - self.opened_at >= self.cooldown:
+            self.trial = True
+            return True
+        return False
+
+    def retry_after(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+
+    def success(self):
+        if self.opened_at is not None:
+            logger.info("LLM provider %s recovered; circuit closed", self.name)
+            metrics.LLM_CIRCUIT_OPEN.labels(self.name).set(0)
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+
+    def failure(self):
+        self.failures += 1
+        if self.trial or self.failures >= self.threshold:
+            if self.opened_at is None:
+                logger.warning("LLM provider %s failing; circuit opened for %.0fs", self.name, self.cooldown)
+                metrics.LLM_CIRCUIT_OPEN.labels(self.name).set(1)
+            self.opened_at = time.monotonic()
+        self.trial = False
+
+    def release(self):
+        """The attempt ended without telling us anything (e.g. cancelled)."""
+        self.trial = False
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def breaker(name: str) -> CircuitBreaker:
+    if name not in _breakers:
+        _breakers[name] = CircuitBreaker(name)
+    return _breakers[name]
+
+
+# ---------------------------
+# Error classification and backoff
+# ---------------------------
+def _status(error: Exception) -> int | None:
+    return error.response.status_code if isinstance(error, httpx.HTTPStatusError) else None
+
+
+def _retryable(error: Exception) -> bool:
+    status = _status(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return isinstance(error, (asyncio.TimeoutError, httpx.TransportError))
+
+
+def _retry_after(error: Exception) -> float | None:
+    """Seconds from a Retry-After header (delta-seconds or HTTP date), if any."""
+    if not isinstance(error, httpx.HTTPStatusError):
+        return None
+    value = error.response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff(attempt: int, error: Exception) -> float | None:
+    """Sleep before the next attempt, or None if the upstream asked us to wait too long."""
+    delay = random.uniform(0, min(LLM_RETRY_MAX, LLM_RETRY_BASE * 2 ** attempt))  # Full jitter
+    retry_after = _retry_after(error)
+    if retry_after is not None:
+        if retry_after > LLM_RETRY_AFTER_MAX:
+            return None
+        delay = max(delay, retry_after)
+    return delay
+
+
+# ---------------------------
+# Retries on one provider, failover across providers
+# ---------------------------
+async def _with_retries(provider: Provider, call):
+    circuit = breaker(provider.name)
+    for attempt in range(LLM_RETRIES + 1):
+        try:
+            result = await call(provider)
+        except asyncio.CancelledError:
+            circuit.release()
+            raise
+        except Exception as e:
+            if not _retryable(e):
+                # The provider answered; it is reachable even if it refused us
+                if _status(e) is not None:
+                    circuit.success()
+                else:
+                    circuit.release()
+                raise
+            circuit.failure()
+            delay = backoff(attempt, e)
+            if attempt == LLM_RETRIES or delay is None or not circuit.allow():
+                raise
+            metrics.LLM_RETRIES.labels(provider.name).inc()
+            logger.info("LLM provider %s attempt %d failed (%s); retrying in %.2fs",
+                        provider.name, attempt + 1, metrics.llm_outcome(e), delay)
+            await asyncio.sleep(delay)
+            continue
+        circuit.success()
+        return result
+
+
+async def _failover(providers: list[Provider], call):
+    """Run `call(provider)` on the first healthy provider, moving down the list on failure."""
+    last_error = None
+    for provider in providers:
+        if not breaker(provider.name).allow():
+            continue
+        try:
+            return await _with_retries(provider, call)
+        except Exception as e:
+            if _status(e) in FATAL_STATUS:
+                raise
+            last_error = e
+            metrics.LLM_FAILOVERS.labels(provider.name).inc()
+            logger.warning("LLM provider %s failed (%s); trying the next one",
+                           provider.name, metrics.llm_outcome(e))
+    if last_error is not None:
+        raise last_error
+    raise UpstreamUnavailable(min((breaker(p.name).retry_after() for p in providers), default=LLM_BREAKER_COOLDOWN))
+
+
+def _payload_for(provider: Provider, payload: dict) -> dict:
+    return {**payload, "model": provider.model} if provider.model else payload
+
+
+# ---------------------------
+# Public API
+# ---------------------------
+async def complete(payload: dict, providers: list[Provider] | None = None) -> dict:
+    """
+    Non-streaming completion with retries, circuit breaking and failover.
+    With LLM_HEDGE_DELAY set and several providers, a second request goes to
+    the next provider if the first has not answered in time; the first
+    answer wins and the other request is cancelled.
+    Raises the last upstream error, or UpstreamUnavailable if every circuit is open.
+    """
+    providers = providers or list(PROVIDERS.values())
+
+    async def call(provider: Provider):
+        return await llm_client.chat_completion(
+            _payload_for(provider, payload), timeout=provider.timeout,
+            url=provider.url, api_key=provider.api_key, provider=provider.name,
+        )
+
+    if LLM_HEDGE_DELAY <= 0 or len(providers) < 2:
+        return await _failover(providers, call)
+    return await _hedged(providers, call)
+
+
+async def _hedged(providers: list[Provider], call):
+    primary = asyncio.create_task(_failover(providers[:1], call))
+    done, _ = await asyncio.wait({primary}, timeout=LLM_HEDGE_DELAY)
+    if done:
+        try:
+            return primary.result()
+        except Exception as e:
+            if _status(e) in FATAL_STATUS:
+                raise
+            return await _failover(providers[1:], call)
+
+    hedge = asyncio.create_task(_failover(providers[1:], call))
+    names = {primary: "primary", hedge: "hedge"}
+    pending = set(names)
+    errors = []
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    metrics.LLM_HEDGES.labels(names[task]).inc()
+                    return task.result()
+                errors.append(task.exception())
+        raise errors[0]
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def _open_stream(provider: Provider, payload: dict, on_usage):
+    """
+    Start a stream and wait for its first delta (within the provider's
+    deadline), so failures surface before anything is sent on.
+    """
+    upstream = llm_client.stream_chat_completion(
+        _payload_for(provider, payload), on_usage=on_usage,
+        url=provider.url, api_key=provider.api_key, provider=provider.name,
+    )
+    try:
+        first = await asyncio.wait_for(anext(upstream, None), provider.timeout or llm_client.LLM_REQUEST_TIMEOUT)
+    except BaseException:
+        await upstream.aclose()
+        raise
+    return upstream, first
+
+
+async def stream(payload: dict, providers: list[Provider] | None = None, on_usage=None):
+    """
+    Streaming completion. Retries and failover apply until the first delta
+    arrives; after that the stream is committed to its provider.
+    """
+    providers = providers or list(PROVIDERS.values())
+    upstream, first = await _failover(providers, lambda p: _open_stream(p, payload, on_usage))
+    try:
+        if first is not None:
+            yield first
+        async for delta in upstream:
+            yield delta
+    finally:
+        await upstream.aclose()
@@ -0,0 +1,197 @@
+# ---------------------------
+# File: services/metrics.py
+# ---------------------------
+
+import asyncio
+import time
+import httpx
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest,
+)
+from sqlalchemy import event
+from config import get_settings
+
+# ---------------------------
+# Configuration
+# ---------------------------
+settings = get_settings()
+METRICS_ENABLED = settings.metrics_enabled  # 0 = no middleware, no /metrics
+# With several server processes, point PROMETHEUS_MULTIPROC_DIR at an empty
+# directory so /metrics aggregates every process (prometheus_client multiprocess mode)
+MULTIPROC_DIR = settings.prometheus_multiproc_dir
+
+# Request latency buckets: sub-millisecond DB hits up to long LLM streams
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+
+# ---------------------------
+# HTTP
+# ---------------------------
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route template and status", ["method", "route", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time until the last response byte was sent",
+    ["method", "route"], buckets=LATENCY_BUCKETS,
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Requests currently being served", multiprocess_mode="livesum"
+)
+
+# ---------------------------
+# Database
+# ---------------------------
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds", "Cursor execution time per statement",
+    ["engine", "operation"], buckets=DB_BUCKETS,
+)
+DB_QUERY_ERRORS = Counter("db_query_errors_total", "Statements that raised", ["engine", "operation"])
+
+# ---------------------------
+# Upstream LLM
+# ---------------------------
+LLM_LATENCY = Histogram(
+    "llm_request_duration_seconds", "Upstream completion time (whole stream when streaming)",
+    ["provider", "mode"], buckets=LATENCY_BUCKETS,
+)
+LLM_FIRST_TOKEN = Histogram(
+    "llm_time_to_first_token_seconds", "Streaming: time until the first content delta",
+    buckets=LATENCY_BUCKETS,
+)
+LLM_REQUESTS = Counter("llm_requests_total", "Upstream completions by outcome", ["provider", "mode", "outcome"])
+LLM_TOKENS = Counter("llm_tokens_total", "Tokens reported by the upstream usage block", ["kind"])
+LLM_RETRIES = Counter("llm_retries_total", "Upstream attempts repeated after 429/5xx/timeouts", ["provider"])
+LLM_FAILOVERS = Counter("llm_failovers_total", "Requests moved on to the next provider", ["provider"])
+LLM_HEDGES = Counter("llm_hedged_requests_total", "Hedged second requests, by which one answered", ["winner"])
+LLM_CIRCUIT_OPEN = Gauge(
+    "llm_circuit_open", "1 while the provider's circuit breaker is open", ["provider"], multiprocess_mode="max"
+)
+
+# ---------------------------
+# WebSocket chat (/chat/ws)
+# ---------------------------
+WS_CONNECTIONS = Gauge(
+    "ws_connections", "Open /chat/ws connections", multiprocess_mode="livesum"
+)
+WS_STREAMS = Gauge(
+    "ws_streams", "Chat turns in progress on /chat/ws connections", multiprocess_mode="livesum"
+)
+
+# ---------------------------
+# Caches, auth and rate limits
+# ---------------------------
+CHAT_CACHE_LOOKUPS = Counter("chat_cache_lookups_total", "Chat reply cache lookups", ["result"])
+SEMANTIC_CACHE_LOOKUPS = Counter("semantic_cache_lookups_total", "Semantic answer cache lookups", ["result"])
+SEMANTIC_CACHE_SIMILARITY = Histogram(
+    "semantic_cache_similarity", "Best cosine similarity found per semantic cache lookup (for tuning the threshold)",
+    buckets=(0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.93, 0.95, 0.97, 0.99, 1.0),
+)
+AUTH_FAILURES = Counter("auth_failures_total", "Rejected bearer tokens", ["reason"])
+RATE_LIMITED = Counter("rate_limited_total", "Chat requests refused with 429", ["scope"])
+
+
+def llm_outcome(error: BaseException | None) -> str:
+    """Low-cardinality label for an upstream call: ok, timeout, http_<status> or error."""
+    if error is None:
+        return "ok"
+    if isinstance(error, (asyncio.TimeoutError, httpx.TimeoutException)):
+        return "timeout"
+    if isinstance(error, httpx.HTTPStatusError):
+        return f"http_{error.response.status_code}"
+    return "error"
+
+
+def record_usage(usage: dict | None):
+    """Count prompt/completion tokens from an OpenAI-style `usage` object."""
+    if not usage:
+        return
+    for kind in ("prompt_tokens", "completion_tokens"):
+        if usage.get(kind):
+            LLM_TOKENS.labels(kind.removesuffix("_tokens")).inc(usage[kind])
+
+
+# ---------------------------
+# SQLAlchemy engine events (hooked from database.py)
+# ---------------------------
+def _operation(statement: str) -> str:
+    head = statement.lstrip()[:8].split(None, 1)
+    return head[0].upper() if head else "OTHER"
+
+
+def instrument_engine(engine, name: str):
+    """Time every cursor execution of a sync Engine (use async_engine.sync_engine for async)."""
+    histograms = {}  # operation -> labelled child; skips the locked .labels() lookup per query
+
+    # The start time rides on the per-statement ExecutionContext
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._metrics_started
+        operation = _operation(statement)
+        histogram = histograms.get(operation)
+        if histogram is None:
+            histogram = histograms[operation] = DB_QUERY_LATENCY.labels(name, operation)
+        histogram.observe(elapsed)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        DB_QUERY_ERRORS.labels(name, _operation(context.statement or "")).inc()
+
+
+# ---------------------------
+# ASGI middleware (pure ASGI: no per-request task or body buffering, streams pass through)
+# ---------------------------
+class MetricsMiddleware:
+    """
+    Per-route latency histogram, request counter and in-flight gauge.
+    Routes are labelled by their template (/projects/{project_id}), never the raw path.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._children = {}  # (method, route, status) -> (histogram, counter)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            elapsed = time.perf_counter() - started
+            key = (scope["method"], getattr(scope.get("route"), "path", None) or "unmatched", status)
+            children = self._children.get(key)
+            if children is None:
+                children = self._children[key] = (
+                    HTTP_LATENCY.labels(key[0], key[1]), HTTP_REQUESTS.labels(key[0], key[1], str(status))
+                )
+            children[0].observe(elapsed)
+            children[1].inc()
+
+
+# ---------------------------
+# Exposition
+# ---------------------------
+def render() -> tuple[bytes, str]:
+    """Return (body, content type) of the Prometheus text format."""
+    if MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
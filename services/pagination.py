@@ -0,0 +1,101 @@
+# ---------------------------
+# File: services/pagination.py
+# ---------------------------
+
+import base64
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+from config import get_settings
+
+# ---------------------------
+# Server-side page limits
+# ---------------------------
+settings = get_settings()
+PAGE_SIZE_DEFAULT = settings.page_size_default
+PAGE_SIZE_MAX = settings.page_size_max
+
+
+def clamp_limit(limit: int | None) -> int:
+    if limit is None:
+        return PAGE_SIZE_DEFAULT
+    return max(1, min(limit, PAGE_SIZE_MAX))
+
+
+# ---------------------------
+# Opaque keyset cursors over (created_at, id)
+# ---------------------------
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.split("|")
+        return datetime.fromisoformat(created_at), int(row_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+# ---------------------------
+# Opaque offset cursors (ranked results have no stable keyset)
+# ---------------------------
+def encode_offset(offset: int) -> str:
+    return base64.urlsafe_b64encode(f"offset|{offset}".encode()).decode().rstrip("=")
+
+
+def decode_offset(cursor: str | None) -> int:
+    if not cursor:
+        return 0
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        kind, offset = raw.split("|")
+        if kind != "offset" or int(offset) < 0:
+            raise ValueError(raw)
+        return int(offset)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_page(query, created_col, id_col, cursor: str | None, limit: int):
+    """
+    Order by (created_at, id) and seek past `cursor`.
+    Fetches one extra row so the caller can tell whether a next page exists.
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            created_col > created_at,
+            and_(created_col == created_at, id_col > row_id),
+        ))
+    return query.order_by(created_col, id_col).limit(limit + 1)
+
+
+def split_page(rows, limit: int):
+    """Return (rows for this page, cursor for the next page or None)."""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last.created_at, last.id)
+
+
+# ---------------------------
+# ?fields= column projection
+# ---------------------------
+def select_columns(fields: str | None, columns: dict, always=("id", "created_at")):
+    """
+    Map a comma-separated `fields` parameter to model columns.
+    The cursor keys in `always` are selected even if not requested.
+    """
+    if not fields:
+        names = list(columns)
+    else:
+        names = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = [name for name in names if name not in columns]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        names = list(dict.fromkeys([*always, *names]))
+    return [columns[name].label(name) for name in names]
@@ -0,0 +1,86 @@
+# ---------------------------
+# File: services/principal_cache.py
+# ---------------------------
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+
+# ---------------------------
+# Authenticated caller, as seen by route handlers
+# ---------------------------
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    name: str
+    token_version: int = 0
+
+
+# ---------------------------
+# Bounded TTL cache of resolved principals
+# ---------------------------
+class PrincipalCache:
+    """
+    LRU cache of Principal objects keyed by (user_id, token).
+    Entries expire after `ttl` seconds (or at the token's own expiry, if
+    sooner) so a changed user row is picked up without explicit invalidation.
+    Thread-safe: sync dependencies run on the threadpool.
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[tuple[int, str], tuple[float, Principal]] = OrderedDict()
+        self._by_user: dict[int, set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, token: str) -> Principal | None:
+        key = (user_id, token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, principal = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return principal
+
+    def put(self, user_id: int, token: str, principal: Principal, token_exp: float | None = None):
+        ttl = self.ttl
+        if token_exp is not None:
+            ttl = min(ttl, token_exp - time.time())
+        if ttl <= 0:
+            return
+        key = (user_id, token)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, principal)
+            self._entries.move_to_end(key)
+            self._by_user.setdefault(user_id, set()).add(token)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: int):
+        """Drop every cached token of one user (logout, password or profile change)."""
+        with self._lock:
+            for token in self._by_user.pop(user_id, set()):
+                self._entries.pop((user_id, token), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        self._entries.pop(key, None)
+        tokens = self._by_user.get(key[0])
+        if tokens is not None:
+            tokens.discard(key[1])
+            if not tokens:
+                del self._by_user[key[0]]
@@ -0,0 +1,368 @@
+# ---------------------------
+# File: services/project_archive.py
+# ---------------------------
+
+import json
+import logging
+import os
+import tarfile
+import time
+from datetime import datetime
+import anyio
+from pydantic import BaseModel, Field, ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import AsyncSessionLocal
+from models import Project, Prompt, UploadedFile
+from services import file_store, llm_gateway
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------
+# Configuration
+# ---------------------------
+settings = get_settings()
+ARCHIVE_BATCH_ROWS = settings.archive_batch_rows  # Rows per NDJSON member / INSERT
+ARCHIVE_MAX_LINE = settings.archive_max_line      # Longest accepted NDJSON line
+ARCHIVE_MAX_MEMBER = settings.archive_max_member  # Largest non-blob member
+
+# ---------------------------
+# Archive layout (uncompressed ustar, members in this order):
+#   project.json                 {"format": 1, "name": ..., settings}
+#   prompts/000001.ndjson ...    {"text": ..., "created_at": ...} per line, ARCHIVE_BATCH_ROWS per member
+#   blobs/<sha256>               file content, once per distinct content
+#   files/000001.ndjson ...      {"filename", "kind", "sha256", "size", "content_type", "created_at"}
+# Every member is written as soon as it is ready and read as it arrives,
+# so memory stays flat whatever the number of prompts or the size of files.
+# ---------------------------
+ARCHIVE_FORMAT = 1
+BLOCK = 512
+END_OF_ARCHIVE = b"\0" * (2 * BLOCK)
+
+PROJECT_SETTINGS = ("description", "cache_enabled", "llm_providers", "model", "temperature", "max_tokens",
+                    "system_prompt")
+
+
+class ArchiveError(ValueError):
+    """The uploaded archive is malformed; callers answer 400."""
+
+
+class _ArchivedSettings(BaseModel):
+    """Settings read from project.json, with the bounds of routers.projects.ProjectSchema."""
+    description: str | None = None
+    cache_enabled: bool | None = None
+    model: str | None = None
+    temperature: float | None = Field(default=None, ge=0, le=2)
+    max_tokens: int | None = Field(default=None, ge=1, le=32768)
+    system_prompt: str | None = None
+
+
+def _header(name: str, size: int, mtime: datetime | None = None) -> bytes:
+    info = tarfile.TarInfo(name)
+    info.size = size
+    info.mode = 0o644
+    info.mtime = int(mtime.timestamp()) if mtime else int(time.time())
+    return info.tobuf(format=tarfile.USTAR_FORMAT)
+
+
+def _padding(size: int) -> bytes:
+    return b"\0" * (-size % BLOCK)
+
+
+def _member(name: str, data: bytes, mtime: datetime | None = None) -> bytes:
+    return _header(name, len(data), mtime) + data + _padding(len(data))
+
+
+def _ndjson(rows) -> bytes:
+    return b"".join(json.dumps(row, separators=(",", ":")).encode() + b"\n" for row in rows)
+
+
+def _iso(value: datetime | None) -> str | None:
+    return value.isoformat() if value else None
+
+
+# ---------------------------
+# Export
+# ---------------------------
+def _read_blob(f, size: int) -> bytes:
+    return f.read(size)
+
+
+async def export_tar(project_id: int):
+    """
+    Async iterator of tar bytes for one project. Uses its own session (the
+    response outlives the request's) and server-side cursors, so at most
+    one batch of rows or one file chunk is held at a time.
+    """
+    async with AsyncSessionLocal() as db:
+        project = await db.get(Project, project_id)
+        if project is None:
+            return
+        meta = {"format": ARCHIVE_FORMAT, "name": project.name,
+                **{field: getattr(project, field) for field in PROJECT_SETTINGS}}
+        yield _member("project.json", json.dumps(meta).encode(), project.created_at)
+
+        prompts = await db.stream(
+            select(Prompt.text, Prompt.created_at)
+            .where(Prompt.project_id == project_id)
+            .order_by(Prompt.created_at, Prompt.id)
+            .execution_options(yield_per=ARCHIVE_BATCH_ROWS)
+        )
+        n = 0
+        async for batch in prompts.partitions():
+            n += 1
+            rows = [{"text": text, "created_at": _iso(created_at)} for text, created_at in batch]
+            yield _member(f"prompts/{n:06d}.ndjson", _ndjson(rows))
+
+        files = await db.stream(
+            select(UploadedFile.filename, UploadedFile.kind, UploadedFile.sha256, UploadedFile.size,
+                   UploadedFile.content_type, UploadedFile.created_at)
+            .where(UploadedFile.project_id == project_id)
+            .order_by(UploadedFile.created_at, UploadedFile.id)
+            .execution_options(yield_per=ARCHIVE_BATCH_ROWS)
+        )
+        n = 0
+        sent = set()
+        async for batch in files.partitions():
+            rows = []
+            for filename, kind, sha256, size, content_type, created_at in batch:
+                path = file_store.blob_path(sha256)
+                if not await anyio.to_thread.run_sync(os.path.exists, path):
+                    logger.warning("export of project %s: blob %s is missing, skipping %r", project_id, sha256, filename)
+                    continue
+                if sha256 not in sent:
+                    yield _header(f"blobs/{sha256}", size, created_at)
+                    f = await anyio.to_thread.run_sync(open, path, "rb")
+                    try:
+                        left = size
+                        while left:
+                            chunk = await anyio.to_thread.run_sync(_read_blob, f, min(left, file_store.UPLOAD_CHUNK_SIZE))
+                            if not chunk:
+                                raise RuntimeError(f"blob {sha256} is shorter than its recorded size")
+                            left -= len(chunk)
+                            yield chunk
+                    finally:
+                        await anyio.to_thread.run_sync(f.close)
+                    yield _padding(size)
+                    sent.add(sha256)
+                rows.append({"filename": filename, "kind": kind, "sha256": sha256, "size": size,
+                             "content_type": content_type, "created_at": _iso(created_at)})
+            if rows:
+                n += 1
+                yield _member(f"files/{n:06d}.ndjson", _ndjson(rows))
+
+    yield END_OF_ARCHIVE
+
+
+# ---------------------------
+# Incremental tar reader
+# ---------------------------
+class _Reader:
+    """Exact-size reads over an async iterator of byte chunks of any size."""
+
+    def __init__(self, chunks):
+        self._chunks = chunks.__aiter__()
+        self._buffer = bytearray()
+
+    async def _fill(self) -> bool:
+        try:
+            self._buffer += await self._chunks.__anext__()
+            return True
+        except StopAsyncIteration:
+            return False
+
+    async def read(self, n: int) -> bytes:
+        while len(self._buffer) < n:
+            if not await self._fill():
+                raise ArchiveError("Archive is truncated")
+        data = bytes(self._buffer[:n])
+        del self._buffer[:n]
+        return data
+
+    async def at_eof(self) -> bool:
+        return not self._buffer and not await self._fill()
+
+    async def stream(self, n: int, chunk_size: int = file_store.UPLOAD_CHUNK_SIZE):
+        """Yield exactly `n` bytes in pieces of at most `chunk_size`."""
+        while n:
+            if not self._buffer and not await self._fill():
+                raise ArchiveError("Archive is truncated")
+            take = min(n, len(self._buffer), chunk_size)
+            data = bytes(self._buffer[:take])
+            del self._buffer[:take]
+            n -= take
+            yield data
+
+
+async def _members(chunks):
+    """Yield (TarInfo, body) per regular file; `body` must be consumed before the next member."""
+    reader = _Reader(chunks)
+    while True:
+        if await reader.at_eof():
+            return  # Tolerate a missing end-of-archive marker
+        header = await reader.read(BLOCK)
+        if header == b"\0" * BLOCK:
+            return
+        try:
+            info = tarfile.TarInfo.frombuf(header, "utf-8", "surrogateescape")
+        except tarfile.HeaderError as e:
+            raise ArchiveError(f"Invalid tar header: {e}")
+        body = reader.stream(info.size)
+        if info.isreg():
+            yield info, body
+        async for _ in body:  # Skip whatever the consumer left (and non-file members)
+            pass
+        await reader.read(-info.size % BLOCK)
+
+
+async def _lines(info: tarfile.TarInfo, body):
+    """Decoded NDJSON objects of one member, one line in memory at a time."""
+    if info.size > ARCHIVE_MAX_MEMBER:
+        raise ArchiveError(f"{info.name} is too large")
+    pending = b""
+    async for chunk in body:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        if len(pending) > ARCHIVE_MAX_LINE:
+            raise ArchiveError(f"{info.name}: line too long")
+        for line in lines:
+            if line.strip():
+                yield _decode(info.name, line)
+    if pending.strip():
+        yield _decode(info.name, pending)
+
+
+def _decode(name: str, raw: bytes):
+    try:
+        row = json.loads(raw)
+    except ValueError:
+        raise ArchiveError(f"{name}: invalid JSON")
+    if not isinstance(row, dict):
+        raise ArchiveError(f"{name}: expected a JSON object per line")
+    return row
+
+
+def _timestamp(name: str, value) -> datetime | None:
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ArchiveError(f"{name}: invalid created_at {value!r}")
+
+
+# ---------------------------
+# Import
+# ---------------------------
+def _project_from(meta: dict, user_id: int, name: str | None) -> Project:
+    if meta.get("format") != ARCHIVE_FORMAT:
+        raise ArchiveError(f"Unsupported archive format {meta.get('format')!r}")
+    if not isinstance(name or meta.get("name"), str):
+        raise ArchiveError("project.json: name is required")
+    settings = {field: meta.get(field) for field in PROJECT_SETTINGS}
+    try:
+        checked = _ArchivedSettings.model_validate(
+            {field: value for field, value in settings.items() if field in _ArchivedSettings.model_fields})
+    except ValidationError as e:
+        error = e.errors()[0]
+        raise ArchiveError(f"project.json: {'.'.join(map(str, error['loc']))}: {error['msg']}")
+    settings.update(checked.model_dump())
+    try:
+        llm_gateway.resolve_providers(settings["llm_providers"])
+    except (ValueError, TypeError, AttributeError):
+        settings["llm_providers"] = None  # Providers of another environment: use this one's
+    settings["cache_enabled"] = settings["cache_enabled"] is not False
+    return Project(name=name or meta["name"], user_id=user_id, **settings)
+
+
+async def import_tar(db: AsyncSession, user_id: int, chunks, name: str | None = None) -> tuple[Project, dict]:
+    """
+    Create a project for `user_id` from an export_tar() stream.
+    Rows are inserted ARCHIVE_BATCH_ROWS at a time in one transaction: on
+    any error nothing is committed and blobs stored by this import are
+    removed. Returns (project, {"prompts": n, "files": n}). Raises
+    ArchiveError or file_store.UploadTooLarge.
+    """
+    project = None
+    counts = {"prompts": 0, "files": 0}
+    blobs = {}            # sha256 -> size of the content received in this archive
+    stored = []           # StoredBlob of each, settled on success, removed if new on failure
+    quota_left = file_store.PROJECT_QUOTA_BYTES or None
+
+    async def flush(model, rows):
+        if rows:
+            await db.execute(insert(model), rows)
+            rows.clear()
+
+    try:
+        async for info, body in _members(chunks):
+            if info.name == "project.json":
+                if project is not None:
+                    raise ArchiveError("Duplicate project.json")
+                if info.size > ARCHIVE_MAX_LINE:
+                    raise ArchiveError("project.json is too large")
+                project = _project_from(_decode(info.name, b"".join([c async for c in body])), user_id, name)
+                db.add(project)
+                await db.flush()  # Assigns project.id
+                continue
+            if project is None:
+                raise ArchiveError("project.json must be the first member")
+
+            if info.name.startswith("prompts/"):
+                rows = []
+                async for row in _lines(info, body):
+                    if not isinstance(row.get("text"), str):
+                        raise ArchiveError(f"{info.name}: every prompt needs a text")
+                    rows.append({"project_id": project.id, "text": row["text"],
+                                 "created_at": _timestamp(info.name, row.get("created_at")) or datetime.utcnow()})
+                    counts["prompts"] += 1
+                    if len(rows) >= ARCHIVE_BATCH_ROWS:
+                        await flush(Prompt, rows)
+                await flush(Prompt, rows)
+
+            elif info.name.startswith("blobs/"):
+                limit = file_store.UPLOAD_MAX_BYTES if quota_left is None else min(file_store.UPLOAD_MAX_BYTES, quota_left)
+                if info.size > limit:
+                    raise file_store.UploadTooLarge()
+                blob = await file_store.store_stream(body, limit)
+                stored.append(blob)
+                if blob.sha256 != info.name.removeprefix("blobs/"):
+                    raise ArchiveError(f"{info.name}: content does not match its SHA-256")
+                blobs[blob.sha256] = blob.size
+                if quota_left is not None:
+                    quota_left -= blob.size
+
+            elif info.name.startswith("files/"):
+                rows = []
+                async for row in _lines(info, body):
+                    if row.get("sha256") not in blobs:
+                        raise ArchiveError(f"{info.name}: no blob for {row.get('filename')!r}")
+                    rows.append({
+                        "project_id": project.id,
+                        "kind": row.get("kind") if row.get("kind") in ("project", "chat") else "project",
+                        "filename": os.path.basename(str(row.get("filename") or "")) or row["sha256"],
+                        "sha256": row["sha256"],
+                        "size": blobs[row["sha256"]],
+                        "content_type": row.get("content_type"),
+                        "created_at": _timestamp(info.name, row.get("created_at")) or datetime.utcnow(),
+                    })
+                    counts["files"] += 1
+                    if len(rows) >= ARCHIVE_BATCH_ROWS:
+                        await flush(UploadedFile, rows)
+                await flush(UploadedFile, rows)
+
+        if project is None:
+            raise ArchiveError("Archive has no project.json")
+        await db.commit()
+    except BaseException:
+        with anyio.CancelScope(shield=True):
+            await db.rollback()
+            for blob in stored:
+                await file_store.discard_spare(blob)
+                if blob.created:
+                    await file_store.delete_unreferenced_blob(blob.sha256)
+        raise
+    for blob in stored:
+        await file_store.settle_blob(blob)
+    return project, counts
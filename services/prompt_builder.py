@@ -0,0 +1,80 @@
+# ---------------------------
+# File: services/prompt_builder.py
+# ---------------------------
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import Message
+from config import get_settings
+
+# ---------------------------
+# Context window limits
+# ---------------------------
+settings = get_settings()
+CHAT_HISTORY_MESSAGES = settings.chat_history_messages  # Most recent messages considered
+CHAT_CONTEXT_TOKENS = settings.chat_context_tokens      # Budget for system + history + message
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token plus per-message overhead)."""
+    return len(text) // 4 + 4
+
+
+# ---------------------------
+# Queries
+# ---------------------------
+async def load_recent_messages(db: AsyncSession, conversation_id: int, limit: int = CHAT_HISTORY_MESSAGES):
+    """
+    Last `limit` messages of a conversation, oldest first.
+    One range scan on ix_messages_conversation_id_created_at, whatever the history length.
+    """
+    result = await db.execute(
+        select(Message.role, Message.content)
+        .where(Message.conversation_id == conversation_id)
+        .order_by(Message.created_at.desc(), Message.id.desc())
+        .limit(limit)
+    )
+    return list(reversed(result.all()))
+
+
+# ---------------------------
+# Message assembly
+# ---------------------------
+def build_messages(system_prompt: str | None, history, user_message: str,
+                   token_budget: int = CHAT_CONTEXT_TOKENS, context: list[str] | None = None) -> list[dict]:
+    """
+    Assemble the upstream `messages` list: system prompt, retrieved file
+    excerpts (best first, while they fit), then as many of the newest history
+    turns as fit in `token_budget`, then the new user message.
+    The system prompt and the new message are always kept.
+    """
+    head = [{"role": "system", "content": system_prompt}] if system_prompt else []
+    tail = [{"role": "user", "content": user_message}]
+    remaining = token_budget - sum(estimate_tokens(m["content"]) for m in head + tail)
+
+    excerpts = []
+    for text in context or []:
+        cost = estimate_tokens(text)
+        if cost > remaining:
+            break
+        excerpts.append(text)
+        remaining -= cost
+    if excerpts:
+        head.append({
+            "role": "system",
+            "content": "Relevant excerpts from the project's files:\n\n" + "\n\n---\n\n".join(excerpts),
+        })
+
+    kept = []
+    for role, content in reversed(history):
+        cost = estimate_tokens(content)
+        if cost > remaining:
+            break
+        kept.append({"role": role, "content": content})
+        remaining -= cost
+
+    # Never start the window on a dangling assistant reply
+    while kept and kept[-1]["role"] != "user":
+        kept.pop()
+
+    return head + list(reversed(kept)) + tail
@@ -0,0 +1,102 @@
+# ---------------------------
+# File: services/prompt_cache.py
+# ---------------------------
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import Project, Prompt
+from services.prompt_builder import estimate_tokens
+from config import get_settings
+
+# ---------------------------
+# Configuration
+# ---------------------------
+settings = get_settings()
+PROMPT_CACHE_SIZE = settings.prompt_cache_size  # Compiled project prompts kept per process
+
+
+# ---------------------------
+# Compiled prompt of one project
+# ---------------------------
+@dataclass(frozen=True)
+class CompiledPrompt:
+    version: int                 # Project.prompt_version it was compiled from
+    created_at: datetime | None  # Project.created_at: SQLite reuses the id of a deleted project
+    system_prompt: str | None    # Project.system_prompt + Prompt rows, oldest first
+    tokens: int                  # Estimated size of the system message
+
+
+def compile_prompt(project: Project, prompt_texts) -> CompiledPrompt:
+    texts = [text for text in (project.system_prompt, *prompt_texts) if text and text.strip()]
+    joined = "\n\n".join(texts) if texts else None
+    return CompiledPrompt(project.prompt_version or 0, project.created_at, joined,
+                          estimate_tokens(joined) if joined else 0)
+
+
+# ---------------------------
+# Per-process cache, validated against the project row
+# ---------------------------
+class PromptCache:
+    """
+    LRU of CompiledPrompt per project. An entry is used only while its
+    version equals the project's prompt_version (and the row is the same
+    project, not a new one reusing its id), which the chat routes have
+    already loaded with the ownership check; so a hit costs no query, and a
+    change committed by any worker process invalidates every cache.
+    Only touched from the event loop, so no lock.
+    """
+
+    def __init__(self, maxsize: int = PROMPT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[int, CompiledPrompt] = OrderedDict()
+
+    async def get(self, db: AsyncSession, project: Project) -> CompiledPrompt:
+        compiled = self._entries.get(project.id)
+        if (compiled is not None and compiled.version == (project.prompt_version or 0)
+                and compiled.created_at == project.created_at):
+            self._entries.move_to_end(project.id)
+            return compiled
+
+        rows = await db.scalars(
+            select(Prompt.text).where(Prompt.project_id == project.id).order_by(Prompt.created_at, Prompt.id)
+        )
+        compiled = compile_prompt(project, rows)
+        self._entries[project.id] = compiled
+        self._entries.move_to_end(project.id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return compiled
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Shared instance used by routers/chat.py
+prompt_cache = PromptCache()
+
+
+# ---------------------------
+# Invalidation (called by the routes that change prompts or project settings)
+# ---------------------------
+async def bump_versions(db: AsyncSession, project_ids):
+    """
+    Increment prompt_version of the given projects (ids or a SELECT of ids).
+    Does not commit: run it in the transaction that makes the change, so the
+    new version is never visible without the new prompts.
+    """
+    if isinstance(project_ids, (set, list, tuple)):
+        project_ids = [pid for pid in project_ids if pid is not None]
+        if not project_ids:
+            return
+    await db.execute(
+        update(Project)
+        .where(Project.id.in_(project_ids))
+        .values(prompt_version=Project.prompt_version + 1)
+        .execution_options(synchronize_session=False)
+    )
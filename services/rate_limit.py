@@ -0,0 +1,223 @@
+# ---------------------------
+# File: services/rate_limit.py
+# ---------------------------
+
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from starlette.concurrency import run_in_threadpool
+from services.metrics import RATE_LIMITED
+from config import get_settings
+
+# ---------------------------
+# Configuration
+# ---------------------------
+settings = get_settings()
+RATE_LIMIT_ENABLED = settings.rate_limit_enabled
+RATE_LIMIT_BACKEND = settings.rate_limit_backend                  # "memory" or "sqlite"
+RATE_LIMIT_PATH = settings.rate_limit_path                        # SQLite backend file
+RATE_LIMIT_USER_RATE = settings.rate_limit_user_rate              # Chat requests/second per user
+RATE_LIMIT_USER_BURST = settings.rate_limit_user_burst            # Bucket size per user
+RATE_LIMIT_PROJECT_RATE = settings.rate_limit_project_rate        # Chat requests/second per project
+RATE_LIMIT_PROJECT_BURST = settings.rate_limit_project_burst      # Bucket size per project
+PROJECT_DAILY_TOKEN_BUDGET = settings.project_daily_token_budget  # Upstream tokens/day, 0 = unlimited
+RATE_LIMIT_MAX_KEYS = settings.rate_limit_max_keys                # Buckets kept by the memory backend
+
+
+class RateLimited(Exception):
+    """Raised when a request must be refused; callers answer 429 with Retry-After."""
+
+    def __init__(self, scope: str, retry_after: float):
+        super().__init__(f"{scope} limit exceeded")
+        self.scope = scope  # "user", "project" or "budget"
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+def _today() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def _seconds_until_midnight() -> float:
+    now = datetime.now(timezone.utc)
+    midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (midnight - now).total_seconds()
+
+
+def _refill(tokens: float, updated: float, now: float, rate: float, burst: float) -> float:
+    return min(burst, tokens + (now - updated) * rate)
+
+
+# ---------------------------
+# In-process backend
+# ---------------------------
+class MemoryBackend:
+    """Token buckets and daily usage counters in this process. Fast enough for the event loop."""
+
+    blocking = False
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()  # key -> (tokens, updated)
+        self._usage: dict[int, int] = {}  # project_id -> tokens used on self._day
+        self._day = None
+        self._lock = threading.Lock()
+
+    def take(self, buckets: list[tuple[str, float, float]], cost: float) -> tuple[str | None, float]:
+        """
+        Take `cost` tokens from every (key, rate, burst) bucket, all or nothing.
+        Returns (None, 0) when allowed, else (denied key, seconds until it refills).
+        """
+        now = time.monotonic()
+        with self._lock:
+            levels = []
+            for key, rate, burst in buckets:
+                need = min(cost, burst)  # A batch larger than the bucket waits for a full bucket
+                tokens, updated = self._buckets.get(key, (burst, now))
+                tokens = _refill(tokens, updated, now, rate, burst)
+                if tokens < need:
+                    return key, (need - tokens) / rate
+                levels.append((key, tokens - need))
+            for key, tokens in levels:
+                self._buckets[key] = (tokens, now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)  # Idle buckets are full anyway
+        return None, 0.0
+
+    def add_usage(self, project_id: int, day: str, tokens: int):
+        with self._lock:
+            if day != self._day:  # New day: yesterday's counters no longer matter
+                self._usage.clear()
+                self._day = day
+            self._usage[project_id] = self._usage.get(project_id, 0) + tokens
+
+    def get_usage(self, project_id: int, day: str) -> int:
+        return self._usage.get(project_id, 0) if day == self._day else 0
+
+
+# ---------------------------
+# Shared SQLite backend (limits shared by every worker process on one host)
+# ---------------------------
+class SQLiteBackend:
+    """Same API as MemoryBackend, stored in a local SQLite file. Calls block, so they run in the threadpool."""
+
+    blocking = True
+
+    def __init__(self, path: str = RATE_LIMIT_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS usage ("
+            " project_id INTEGER NOT NULL, day TEXT NOT NULL, tokens INTEGER NOT NULL,"
+            " PRIMARY KEY (project_id, day))"
+        )
+        self._lock = threading.Lock()
+
+    def take(self, buckets: list[tuple[str, float, float]], cost: float) -> tuple[str | None, float]:
+        now = time.time()  # Wall clock: shared across processes
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")  # Serialise read-modify-write across processes
+            try:
+                levels = []
+                for key, rate, burst in buckets:
+                    need = min(cost, burst)
+                    row = self._conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+                    tokens = _refill(*(row or (burst, now)), now, rate, burst)
+                    if tokens < need:
+                        self._conn.execute("ROLLBACK")
+                        return key, (need - tokens) / rate
+                    levels.append((key, tokens - need, now))
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)", levels
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                raise
+        return None, 0.0
+
+    def add_usage(self, project_id: int, day: str, tokens: int):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO usage (project_id, day, tokens) VALUES (?, ?, ?)"
+                " ON CONFLICT (project_id, day) DO UPDATE SET tokens = tokens + excluded.tokens",
+                (project_id, day, tokens),
+            )
+
+    def get_usage(self, project_id: int, day: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT tokens FROM usage WHERE project_id = ? AND day = ?", (project_id, day)
+            ).fetchone()
+        return row[0] if row else 0
+
+
+# ---------------------------
+# Limiter front-end
+# ---------------------------
+class RateLimiter:
+    """
+    Per-user and per-project token buckets plus a daily upstream-token budget
+    per project. Checks touch only the limiter backend, never the app database.
+    """
+
+    def __init__(self, backend, enabled: bool = True, daily_budget: int = PROJECT_DAILY_TOKEN_BUDGET):
+        self.backend = backend
+        self.enabled = enabled
+        self.daily_budget = daily_budget
+
+    async def _backend(self, fn, *args):
+        if self.backend.blocking:
+            return await run_in_threadpool(fn, *args)
+        return fn(*args)
+
+    async def check(self, user_id: int, project_id: int, cost: int = 1):
+        """Spend `cost` requests for this user and project, or raise RateLimited."""
+        if not self.enabled:
+            return
+        if self.daily_budget and await self._backend(self.backend.get_usage, project_id, _today()) >= self.daily_budget:
+            RATE_LIMITED.labels("budget").inc()
+            raise RateLimited("budget", _seconds_until_midnight())
+
+        denied, retry_after = await self._backend(self.backend.take, [
+            (f"user:{user_id}", RATE_LIMIT_USER_RATE, RATE_LIMIT_USER_BURST),
+            # Ownership is not verified yet, so the caller is part of the project key:
+            # requests naming someone else's project cannot drain the owner's bucket
+            (f"project:{project_id}:{user_id}", RATE_LIMIT_PROJECT_RATE, RATE_LIMIT_PROJECT_BURST),
+        ], cost)
+        if denied is not None:
+            scope = denied.split(":", 1)[0]
+            RATE_LIMITED.labels(scope).inc()
+            raise RateLimited(scope, retry_after)
+
+    async def record_usage(self, project_id: int, tokens: int):
+        """Add upstream tokens to the project's count for today (UTC)."""
+        if self.enabled and tokens > 0:
+            await self._backend(self.backend.add_usage, project_id, _today(), tokens)
+
+    async def usage_today(self, project_id: int) -> int:
+        return await self._backend(self.backend.get_usage, project_id, _today())
+
+
+def _backend_from_env():
+    if RATE_LIMIT_BACKEND == "sqlite":
+        return SQLiteBackend()
+    return MemoryBackend()
+
+
+# Shared instance used by routers/chat.py
+rate_limiter = RateLimiter(_backend_from_env() if RATE_LIMIT_ENABLED else MemoryBackend(),
+                           enabled=RATE_LIMIT_ENABLED)
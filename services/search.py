@@ -0,0 +1,96 @@
+# ---------------------------
+# File: services/search.py
+# ---------------------------
+
+import re
+from sqlalchemy import column as sql_column, func, literal_column, table as sql_table
+from sqlalchemy.ext.asyncio import AsyncSession
+from services.pagination import decode_offset, encode_offset
+from config import get_settings
+
+# ---------------------------
+# Configuration
+# ---------------------------
+settings = get_settings()
+SEARCH_MAX_TERMS = settings.search_max_terms          # Words of `q` used, the rest is ignored
+SEARCH_SNIPPET_WORDS = settings.search_snippet_words  # Length of the highlighted excerpt
+
+# Postgres text search configuration (the generated columns of migration 0004 use it too)
+TS_CONFIG = "english"
+
+
+class SearchQueryError(ValueError):
+    """The query has no searchable words."""
+
+
+def query_terms(q: str) -> list[str]:
+    """
+    Words of the user's query. Operators and punctuation are dropped, so
+    every search is a plain AND of terms on both backends and user input
+    never reaches the FTS5 / tsquery parsers as syntax.
+    """
+    terms = re.findall(r"\w+", q or "")[:SEARCH_MAX_TERMS]
+    if not terms:
+        raise SearchQueryError("Search query has no words")
+    return terms
+
+
+# ---------------------------
+# Dialect-specific match, rank and snippet
+# ---------------------------
+def _sqlite_match(query, column, terms: list[str]):
+    """FTS5: bm25 over the external-content table <table>_fts."""
+    name = f"{column.table.name}_fts"
+    fts = sql_table(name, sql_column("rowid"))
+    fts_ref = literal_column(name)
+    # Each term quoted as an FTS5 string, so it is matched literally
+    match = " ".join('"%s"' % term for term in terms)
+    query = query.join(fts, fts.c.rowid == column.table.c.id).where(fts_ref.op("MATCH")(match))
+    rank = -func.bm25(fts_ref)  # bm25 is lower for better matches
+    snippet = func.snippet(fts_ref, 0, "[", "]", "…", SEARCH_SNIPPET_WORDS)
+    return query, rank, snippet
+
+
+def _postgres_match(query, column, terms: list[str]):
+    """tsvector: the GIN-indexed search_vector column, ranked by cover density."""
+    config = literal_column(f"'{TS_CONFIG}'")
+    tsquery = func.plainto_tsquery(config, " ".join(terms))
+    vector = literal_column(f"{column.table.name}.search_vector")
+    query = query.where(vector.op("@@")(tsquery))
+    rank = func.ts_rank_cd(vector, tsquery)
+    # Evaluated only for the rows of the page (Postgres projects after the LIMIT)
+    snippet = func.ts_headline(
+        config, column, tsquery,
+        f"StartSel=[, StopSel=], MaxFragments=1, MaxWords={SEARCH_SNIPPET_WORDS}, "
+        f"MinWords={max(1, SEARCH_SNIPPET_WORDS // 2)}"
+    )
+    return query, rank, snippet
+
+
+# ---------------------------
+# One page of ranked matches
+# ---------------------------
+async def ranked_page(db: AsyncSession, query, column, q: str, cursor: str | None, limit: int):
+    """
+    Restrict `query` (a SELECT over column's table, already scoped to the
+    caller's rows) to rows whose `column` matches `q`, best first.
+    The indexed columns are prompts.text, messages.content and
+    file_chunks.text (migration 0004).
+    Each row gains `score` (higher is better) and `snippet` (the matching
+    excerpt with terms in [brackets]).
+    Returns (rows, cursor for the next page or None).
+    """
+    terms = query_terms(q)
+    offset = decode_offset(cursor)
+    if db.bind.dialect.name == "postgresql":
+        query, rank, snippet = _postgres_match(query, column, terms)
+    else:
+        query, rank, snippet = _sqlite_match(query, column, terms)
+    score = rank.label("score")  # Not "rank": FTS5 tables have a hidden column of that name
+    query = query.add_columns(score, snippet.label("snippet")) \
+        .order_by(score.desc(), column.table.c.id) \
+        .offset(offset).limit(limit + 1)  # One extra row tells whether a next page exists
+    rows = (await db.execute(query)).all()
+    if len(rows) <= limit:
+        return rows, None
+    return rows[:limit], encode_offset(offset + limit)
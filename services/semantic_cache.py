@@ -0,0 +1,241 @@
+# ---------------------------
+# File: services/semantic_cache.py
+# ---------------------------
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+import numpy as np
+from starlette.concurrency import run_in_threadpool
+from models import Project
+from config import get_settings
+from services.embeddings import get_cache_embedder
+from services.metrics import SEMANTIC_CACHE_LOOKUPS, SEMANTIC_CACHE_SIMILARITY
+
+# ---------------------------
+# Configuration
+# ---------------------------
+settings = get_settings()
+SEMANTIC_CACHE_ENABLED = settings.semantic_cache_enabled            # Opt-in
+SEMANTIC_CACHE_THRESHOLD = settings.semantic_cache_threshold        # Cosine similarity for a hit
+SEMANTIC_CACHE_TTL = settings.semantic_cache_ttl                    # Seconds an answer stays valid
+SEMANTIC_CACHE_SIZE = settings.semantic_cache_size                  # Max answers per process
+SEMANTIC_CACHE_PROJECT_SIZE = settings.semantic_cache_project_size  # Max answers per project
+
+
+# Words that do not change what a question asks: articles, pronouns, present
+# tense auxiliaries, greetings. Everything else (negations, question words,
+# verbs, numbers) must be the same for an answer to be reused: embeddings
+# score "delete my account" / "export my account" or "two adults" / "four
+# adults" as near-equal
+_FILLER = frozenset("""
+a an the am is are be being do does can could may please kindly hi hey hello so
+i me my mine you your yours we us our it its this that these those there here
+""".split())
+
+_WORD = re.compile(r"\w+(?:['’]\w+)?", re.UNICODE)
+
+# Contractions, apostrophe normalised: "what's" -> "what is", "can't" -> "can not"
+_NOT_STEMS = {"ca": "can", "wo": "will", "sha": "shall", "ai": "is"}
+_SUFFIXES = {"s": "is", "re": "are", "m": "am", "ve": "have", "d": "would", "ll": "will"}
+
+
+def _expand(word: str) -> list[str]:
+    if word == "cannot":
+        return ["can", "not"]
+    if word.endswith("n't"):
+        stem = word[:-3]
+        return [_NOT_STEMS.get(stem, stem), "not"]
+    stem, _, suffix = word.partition("'")
+    return [stem, _SUFFIXES[suffix]] if suffix in _SUFFIXES else [word]
+
+
+def content_words(message: str) -> list[str]:
+    """Words of `message` that decide what it asks, in order: lowercased, contractions expanded, filler dropped."""
+    words = (_expand(word) for word in _WORD.findall(message.lower().replace("’", "'")))
+    return [word for parts in words for word in parts if word not in _FILLER]
+
+
+def context_digest(payload: dict, words: list[str]) -> int:
+    """
+    64-bit digest of everything in the upstream request except the wording
+    of the user's message: model settings, system prompt, retrieved file
+    excerpts, and the set of the message's content words.
+    An answer is only reused for a request with the same digest.
+    """
+    raw = json.dumps([payload["model"], payload["max_tokens"], payload.get("temperature"), payload["messages"][:-1],
+                      sorted(set(words))],
+                     sort_keys=True, separators=(",", ":"))
+    return int.from_bytes(hashlib.sha256(raw.encode()).digest()[:8], "little", signed=True)
+
+
+def _key(payload: dict) -> tuple[str, int]:
+    """(text to embed, context digest) of a request: the embedding only has to tell word order apart."""
+    words = content_words(payload["messages"][-1]["content"])
+    return " ".join(words), context_digest(payload, words)
+
+
+# ---------------------------
+# Answers of one project: a matrix of message vectors searched in one product
+# ---------------------------
+class _ProjectAnswers:
+    def __init__(self, version: int, created_at: datetime | None, dim: int):
+        self.version = version          # Project.prompt_version the answers were given under
+        self.created_at = created_at    # Project.created_at: SQLite reuses the id of a deleted project
+        self.count = 0
+        self.vectors = np.empty((16, dim), dtype=np.float32)  # Rows [0, count) are in use
+        self.digests = np.empty(16, dtype=np.int64)
+        self.expires = np.empty(16, dtype=np.float64)
+        self.used = np.empty(16, dtype=np.float64)
+        self.answers: list[str] = []
+
+    def best(self, vector: np.ndarray, digest: int, now: float) -> tuple[int, float]:
+        """(row, similarity) of the closest live answer with this digest, or (-1, -inf)."""
+        if not self.count:
+            return -1, float("-inf")
+        n = self.count
+        live = (self.digests[:n] == digest) & (self.expires[:n] > now)
+        scores = np.where(live, self.vectors[:n] @ vector, -np.inf)
+        row = int(np.argmax(scores))
+        return row, float(scores[row])
+
+    def put(self, row: int, vector: np.ndarray, digest: int, answer: str, expires: float, now: float):
+        self.vectors[row] = vector
+        self.digests[row] = digest
+        self.expires[row] = expires
+        self.used[row] = now
+        if row == len(self.answers):
+            self.answers.append(answer)
+        else:
+            self.answers[row] = answer
+
+    def free_row(self, maxsize: int, now: float) -> tuple[int, bool]:
+        """A row for a new answer: (row, True) if it adds one, (row, False) if it replaces one."""
+        n = self.count
+        if n < maxsize:
+            if n == len(self.vectors):
+                size = min(maxsize, 2 * n)
+                self.vectors = np.resize(self.vectors, (size, self.vectors.shape[1]))
+                self.digests = np.resize(self.digests, size)
+                self.expires = np.resize(self.expires, size)
+                self.used = np.resize(self.used, size)
+            self.count += 1
+            return n, True
+        # Full: reuse an expired row, else the least recently used one
+        expired = np.flatnonzero(self.expires[:n] <= now)
+        return (int(expired[0]) if len(expired) else int(np.argmin(self.used[:n]))), False
+
+
+# ---------------------------
+# Per-process cache of answers, found by message similarity
+# ---------------------------
+class SemanticCache:
+    """
+    Answers to first chat turns, per project, reused for later messages
+    with the same content words whose embedding is at least `threshold`
+    cosine-similar and whose context (model settings, system prompt, file
+    excerpts) is identical. A project's
+    answers are dropped when its prompt_version changes, which every route
+    that changes Prompt rows or project settings bumps; the chat routes have
+    already loaded the project, so the check costs no query.
+    Bounded per project (LRU rows) and per process (LRU projects).
+    Lookups run on the threadpool, so state is guarded by a lock.
+    """
+
+    def __init__(self, threshold: float = SEMANTIC_CACHE_THRESHOLD, ttl: float = SEMANTIC_CACHE_TTL,
+                 maxsize: int = SEMANTIC_CACHE_SIZE, project_maxsize: int = SEMANTIC_CACHE_PROJECT_SIZE,
+                 enabled: bool = True):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.project_maxsize = project_maxsize
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._entries = 0
+        self._projects: OrderedDict[int, _ProjectAnswers] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cacheable(payload: dict) -> bool:
+        """Only first turns: with history, the same words can ask something else."""
+        return all(message["role"] == "system" for message in payload["messages"][:-1])
+
+    def _answers(self, project: Project, create: bool) -> _ProjectAnswers | None:
+        """The project's answers if still valid for its prompt_version (caller holds the lock)."""
+        answers = self._projects.get(project.id)
+        version = project.prompt_version or 0
+        if answers is not None and (answers.version != version or answers.created_at != project.created_at):
+            self._entries -= answers.count
+            del self._projects[project.id]
+            answers = None
+        if answers is None and create:
+            answers = self._projects[project.id] = _ProjectAnswers(version, project.created_at, get_cache_embedder().dim)
+        if answers is not None:
+            self._projects.move_to_end(project.id)
+        return answers
+
+    def _lookup(self, project: Project, payload: dict) -> tuple[str | None, np.ndarray]:
+        text, digest = _key(payload)
+        vector = get_cache_embedder().embed([text])[0]
+        now = time.monotonic()
+        with self._lock:
+            answers = self._answers(project, create=False)
+            row, score = answers.best(vector, digest, now) if answers else (-1, float("-inf"))
+            if row >= 0 and score >= self.threshold:
+                answers.used[row] = now
+                self.hits += 1
+                reply = answers.answers[row]
+            else:
+                self.misses += 1
+                reply = None
+        if score > float("-inf"):
+            SEMANTIC_CACHE_SIMILARITY.observe(score)
+        SEMANTIC_CACHE_LOOKUPS.labels("miss" if reply is None else "hit").inc()
+        return reply, vector
+
+    def _store(self, project: Project, payload: dict, vector: np.ndarray, answer: str):
+        _, digest = _key(payload)
+        now = time.monotonic()
+        with self._lock:
+            answers = self._answers(project, create=True)
+            # A concurrent miss may have stored the same question meanwhile: refresh it instead
+            row, score = answers.best(vector, digest, now)
+            if row < 0 or score < self.threshold:
+                row, added = answers.free_row(self.project_maxsize, now)
+                self._entries += added
+            answers.put(row, vector, digest, answer, now + self.ttl, now)
+            # Over the process bound: drop whole least recently used projects
+            while self._entries > self.maxsize and len(self._projects) > 1:
+                _, evicted = self._projects.popitem(last=False)
+                self._entries -= evicted.count
+
+    async def lookup(self, project: Project, payload: dict) -> tuple[str | None, np.ndarray]:
+        """(cached answer or None, message vector to pass to store() after a miss)."""
+        return await run_in_threadpool(self._lookup, project, payload)
+
+    async def store(self, project: Project, payload: dict, vector: np.ndarray, answer: str):
+        await run_in_threadpool(self._store, project, payload, vector, answer)
+
+    def clear(self):
+        with self._lock:
+            self._projects.clear()
+            self._entries = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": self._entries,
+            "projects": len(self._projects),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# Shared instance used by routers/chat.py
+semantic_cache = SemanticCache(enabled=SEMANTIC_CACHE_ENABLED)
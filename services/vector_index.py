@@ -0,0 +1,207 @@
+# ---------------------------
+# File: services/vector_index.py
+# ---------------------------
+
+import fcntl
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+import numpy as np
+from config import get_settings
+
+# ---------------------------
+# On-disk layout per project: index/<project_id>/
+#   meta.json    {"dim": 256}
+#   vectors.f32  row-major float32 matrix, one row per chunk
+#   ids.i64      int64 chunk id for each row
+#   lock         flock'ed by writers (every worker process appends and compacts),
+#                and shared-locked by readers while they map the two files
+# ---------------------------
+settings = get_settings()
+INDEX_DIR = settings.vector_index_dir
+
+
+class ProjectIndex:
+    """
+    Append-only vector index for one project, memory-mapped for queries.
+    Writers append rows under a lock (a thread lock plus an flock on the
+    directory's lock file, as several worker processes write to the same
+    files); readers remap when either file grows or is replaced.
+    Vectors must be L2-normalised so the dot product is cosine similarity.
+    """
+
+    def __init__(self, project_id: int, dim: int):
+        self.dir = os.path.join(INDEX_DIR, str(project_id))
+        self.dim = dim
+        self._lock = threading.Lock()
+        self._state = (None, None, None)  # (key, vectors, ids), swapped as one tuple by readers
+
+    # ---------------------------
+    # Paths and sizing
+    # ---------------------------
+    @property
+    def _vectors_path(self):
+        return os.path.join(self.dir, "vectors.f32")
+
+    @property
+    def _ids_path(self):
+        return os.path.join(self.dir, "ids.i64")
+
+    @property
+    def _lock_path(self):
+        return os.path.join(self.dir, "lock")
+
+    def _rows_on_disk(self) -> int:
+        try:
+            vector_rows = os.path.getsize(self._vectors_path) // (4 * self.dim)
+            id_rows = os.path.getsize(self._ids_path) // 8
+        except FileNotFoundError:
+            return 0
+        # A write may be half-done: only rows present in both files count
+        return min(vector_rows, id_rows)
+
+    def _check_meta(self):
+        meta_path = os.path.join(self.dir, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                if json.load(f)["dim"] != self.dim:
+                    raise ValueError(f"{self.dir} was built with a different embedding dimension")
+        else:
+            os.makedirs(self.dir, exist_ok=True)
+            with open(meta_path, "w") as f:
+                json.dump({"dim": self.dim}, f)
+
+    # ---------------------------
+    # Writes
+    # ---------------------------
+    @contextmanager
+    def _writing(self):
+        """Exclusive against writers in this process and in other processes."""
+        with self._lock:
+            os.makedirs(self.dir, exist_ok=True)
+            fd = os.open(self._lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                yield
+            finally:
+                os.close(fd)  # Releases the flock
+
+    def add(self, chunk_ids, vectors: np.ndarray):
+        """Append rows for new chunks (incremental: existing rows are untouched)."""
+        if len(chunk_ids) == 0:
+            return
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        with self._writing():
+            self._check_meta()
+            # Drop the tail of an append interrupted between the two files,
+            # which would shift every later row against its id
+            rows = self._rows_on_disk()
+            for path, width in ((self._vectors_path, 4 * self.dim), (self._ids_path, 8)):
+                if os.path.exists(path) and os.path.getsize(path) > rows * width:
+                    os.truncate(path, rows * width)
+            # Vectors first, ids second: readers only see rows present in both
+            with open(self._vectors_path, "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self._ids_path, "ab") as f:
+                f.write(np.asarray(chunk_ids, dtype=np.int64).tobytes())
+
+    def remove(self, chunk_ids):
+        """Drop rows for the given chunk ids by rewriting the (compacted) files."""
+        drop = np.asarray(list(chunk_ids), dtype=np.int64)
+        if len(drop) == 0 or not os.path.isdir(self.dir):
+            return
+        with self._writing():
+            rows = self._rows_on_disk()
+            if rows == 0:
+                return
+            vectors = np.fromfile(self._vectors_path, dtype=np.float32, count=rows * self.dim).reshape(rows, self.dim)
+            ids = np.fromfile(self._ids_path, dtype=np.int64, count=rows)
+            keep = ~np.isin(ids, drop)
+            for path, data in ((self._vectors_path, vectors[keep]), (self._ids_path, ids[keep])):
+                tmp = path + ".tmp"
+                data.tofile(tmp)
+                os.replace(tmp, path)  # Open memmaps keep reading the old inode until remapped
+
+    # ---------------------------
+    # Queries
+    # ---------------------------
+    def _key(self):
+        try:
+            # Both inodes change when another process compacts the files
+            return self._rows_on_disk(), os.stat(self._vectors_path).st_ino, os.stat(self._ids_path).st_ino
+        except FileNotFoundError:
+            return 0, None, None
+
+    def _map(self):
+        """
+        Map both files under a shared flock: remove() replaces them one after
+        the other, and a pair taken in between would match vectors to the
+        wrong ids.
+        """
+        try:
+            fd = os.open(self._lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        except FileNotFoundError:
+            return (0, None, None), None, None  # Nothing indexed yet
+        try:
+            fcntl.flock(fd, fcntl.LOCK_SH)
+            key = self._key()
+            rows = key[0]
+            if rows == 0:
+                return key, None, None
+            vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+            ids = np.memmap(self._ids_path, dtype=np.int64, mode="r", shape=(rows,))
+            return key, vectors, ids
+        finally:
+            os.close(fd)
+
+    def _mapped(self):
+        state = self._state
+        if self._key() != state[0]:
+            state = self._state = self._map()
+        return state[1], state[2]
+
+    def search(self, query: np.ndarray, k: int) -> list[tuple[int, float]]:
+        """Top-k (chunk_id, cosine score) pairs, best first."""
+        vectors, ids = self._mapped()
+        if vectors is None:
+            return []
+        scores = vectors @ np.asarray(query, dtype=np.float32).reshape(-1)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top]
+
+    def contains(self, chunk_ids) -> np.ndarray:
+        """Boolean mask: which of `chunk_ids` have a row in the index."""
+        _, ids = self._mapped()
+        chunk_ids = np.asarray(chunk_ids, dtype=np.int64)
+        if ids is None:
+            return np.zeros(len(chunk_ids), dtype=bool)
+        return np.isin(chunk_ids, ids)
+
+    def __len__(self):
+        return self._rows_on_disk()
+
+
+# ---------------------------
+# One open index per project per process
+# ---------------------------
+_indexes: dict[int, ProjectIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(project_id: int, dim: int) -> ProjectIndex:
+    with _indexes_lock:
+        index = _indexes.get(project_id)
+        if index is None or index.dim != dim:
+            index = _indexes[project_id] = ProjectIndex(project_id, dim)
+        return index
+
+
+def drop_index(project_id: int):
+    """Delete a project's index files (the project is gone)."""
+    with _indexes_lock:
+        index = _indexes.pop(project_id, None)
+    shutil.rmtree(index.dir if index else os.path.join(INDEX_DIR, str(project_id)), ignore_errors=True)
@@ -0,0 +1,161 @@
+# ---------------------------
+# File: services/ws_channel.py
+# ---------------------------
+
+import asyncio
+import json
+import logging
+from starlette.websockets import WebSocket
+from services.metrics import WS_STREAMS
+
+logger = logging.getLogger(__name__)
+
+
+class StreamRejected(Exception):
+    """Raised when a stream cannot be opened (tag in use, or too many streams)."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+# ---------------------------
+# One tagged stream on a channel
+# ---------------------------
+class _Stream:
+    def __init__(self, window: int | None):
+        self.credit = window  # Frames the client will still accept; None = no flow control
+        self.granted = asyncio.Event()
+        self.task: asyncio.Task | None = None
+
+
+# ---------------------------
+# Multiplexed JSON frames over one WebSocket
+# ---------------------------
+class Channel:
+    """
+    Runs several tagged streams over one WebSocket.
+
+    Every outgoing frame goes through one bounded queue drained by a single
+    writer task, so a client that reads slowly makes the producers wait (and
+    stop reading from their upstreams) instead of buffering without bound.
+    A stream opened with a window additionally pauses after that many
+    deltas until the client grants more credit, which lets a client hold
+    back one conversation without stalling the others.
+    """
+
+    def __init__(self, websocket: WebSocket, max_streams: int, queue_size: int):
+        self.websocket = websocket
+        self.max_streams = max_streams
+        self.streams: dict[str | int, _Stream] = {}
+        self.closed = False
+        self._queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=queue_size)
+        self._writer: asyncio.Task | None = None
+
+    # ---------------------------
+    # Outgoing frames
+    # ---------------------------
+    async def send(self, frame: dict):
+        """Queue a frame; waits while the queue is full. Dropped once the channel is closed."""
+        if self.closed:
+            return
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._write())
+        await self._queue.put(frame)
+
+    async def delta(self, tag, frame: dict):
+        """Queue a frame of stream `tag`, first waiting for credit if the stream has a window."""
+        stream = self.streams[tag]
+        if stream.credit is not None:
+            while stream.credit <= 0:
+                stream.granted.clear()
+                await stream.granted.wait()
+            stream.credit -= 1
+        await self.send(frame)
+
+    async def flush(self):
+        """Wait until every queued frame has been written."""
+        if self._writer is not None and not self.closed:
+            await self._queue.join()
+
+    async def _write(self):
+        try:
+            while True:
+                frame = await self._queue.get()
+                try:
+                    await self.websocket.send_text(json.dumps(frame))
+                finally:
+                    self._queue.task_done()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Client gone: stop producers, they would otherwise wait on a full queue forever
+            logger.debug("websocket write failed: %s", e)
+            self.closed = True
+            self._discard()
+            for stream in self.streams.values():
+                stream.task.cancel()
+
+    def _discard(self):
+        while not self._queue.empty():
+            self._queue.get_nowait()
+            self._queue.task_done()
+
+    # ---------------------------
+    # Streams
+    # ---------------------------
+    def open(self, tag, window: int | None, coro):
+        """Run `coro` as stream `tag`. Raises StreamRejected (and closes `coro`) if it cannot start."""
+        if tag in self.streams:
+            coro.close()
+            raise StreamRejected(409, "A stream with this id is already running")
+        if len(self.streams) >= self.max_streams:
+            coro.close()
+            raise StreamRejected(429, f"At most {self.max_streams} concurrent streams per connection")
+        stream = self.streams[tag] = _Stream(window)
+        stream.task = asyncio.create_task(self._run(tag, coro))
+
+    async def _run(self, tag, coro):
+        WS_STREAMS.inc()
+        try:
+            await coro
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("websocket stream %r failed", tag)
+            await self.send({"type": "error", "id": tag, "status": 500, "detail": "Internal server error"})
+        finally:
+            coro.close()  # No-op once it has run; avoids a never-awaited warning if cancelled before starting
+            self.streams.pop(tag, None)
+            WS_STREAMS.dec()
+
+    def grant(self, tag, credit: int) -> bool:
+        """Let stream `tag` send `credit` more deltas; False if no such stream is running."""
+        stream = self.streams.get(tag)
+        if stream is None:
+            return False
+        if stream.credit is not None:
+            stream.credit += credit
+            stream.granted.set()
+        return True
+
+    def cancel(self, tag) -> bool:
+        """Cancel stream `tag`; False if no such stream is running."""
+        stream = self.streams.get(tag)
+        if stream is None:
+            return False
+        stream.task.cancel()
+        return True
+
+    async def close(self):
+        """Cancel every stream, wait for their cleanup, then stop the writer."""
+        tasks = [stream.task for stream in self.streams.values()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.closed = True
+        if self._writer is not None:
+            self._writer.cancel()
+            await asyncio.gather(self._writer, return_exceptions=True)
+        self._discard()
@@ -0,0 +1,41 @@
+# ---------------------------
+# File: tests/conftest.py
+# ---------------------------
+
+import os
+import tempfile
+import uuid
+
+import pytest
+
+# The app reads its settings at import time: point it at a throwaway database first
+_workdir = tempfile.mkdtemp(prefix="chatbot-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_workdir, 'test.sqlite3')}"
+os.environ["UPLOAD_DIR"] = os.path.join(_workdir, "uploads")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("WARMUP", "0")
+os.environ.setdefault("JOB_WORKERS", "0")
+os.environ["CHAT_API_URL"] = "http://127.0.0.1:9/openai/v1/chat/completions"  # Nothing listens: upstream calls fail
+os.environ.setdefault("LLM_RETRIES", "0")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+
+@pytest.fixture(scope="session")
+def client():
+    import create_tables
+    from fastapi.testclient import TestClient
+    from main import app
+
+    create_tables.upgrade_database()
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def auth_headers(client):
+    """Bearer header of a freshly registered user."""
+    email = f"{uuid.uuid4().hex}@example.com"
+    client.post("/auth/register", json={"name": "test", "email": email, "password": "pw"})
+    token = client.post("/auth/login", json={"email": email, "password": "pw"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
@@ -0,0 +1,29 @@
+# ---------------------------
+# File: tests/test_auth.py
+# ---------------------------
+
+import uuid
+
+from sqlalchemy import delete
+
+from database import SessionLocal
+from models import User
+from routers import auth
+
+
+def test_logout_of_deleted_user_in_stateless_mode(client, monkeypatch):
+    monkeypatch.setattr(auth, "AUTH_STATELESS", True)
+    email = f"{uuid.uuid4().hex}@example.com"
+    client.post("/auth/register", json={"name": "gone", "email": email, "password": "pw"})
+    token = client.post("/auth/login", json={"email": email, "password": "pw"}).json()["access_token"]
+    with SessionLocal() as db:
+        db.execute(delete(User).where(User.email == email))
+        db.commit()
+
+    response = client.post("/auth/logout", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
+
+
+def test_logout_revokes_token(client, auth_headers):
+    assert client.post("/auth/logout", headers=auth_headers).status_code == 200
+    assert client.get("/projects/", headers=auth_headers).status_code == 401
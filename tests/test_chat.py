@@ -0,0 +1,24 @@
+# ---------------------------
+# File: tests/test_chat.py
+# ---------------------------
+
+from sqlalchemy import func, select
+
+from database import SessionLocal
+from models import Conversation
+
+
+def conversations(project_id: int) -> int:
+    with SessionLocal() as db:
+        return db.scalar(select(func.count()).select_from(Conversation).where(Conversation.project_id == project_id))
+
+
+def test_failed_upstream_call_leaves_no_conversation(client, auth_headers):
+    project = client.post("/projects/", json={"name": "p"}, headers=auth_headers).json()
+    for path in ("/chat/", "/chat/stream"):
+        response = client.post(path, json={"project_id": project["id"], "message": "hello"}, headers=auth_headers)
+        assert response.status_code >= 500
+    response = client.post("/chat/batch", json={"project_id": project["id"], "messages": ["a", "b"]},
+                           headers=auth_headers)
+    assert all("error" in result for result in response.json()["results"])
+    assert conversations(project["id"]) == 0
@@ -0,0 +1,40 @@
+# ---------------------------
+# File: tests/test_chat_ws.py
+# ---------------------------
+
+import pytest
+
+
+@pytest.fixture
+def ws_url(client, auth_headers):
+    project = client.post("/projects/", json={"name": "ws"}, headers=auth_headers).json()
+    return f"/chat/ws?project_id={project['id']}"
+
+
+@pytest.mark.parametrize("frame", [
+    {"type": "cancel", "id": [1]},
+    {"type": "cancel", "id": {"a": 1}},
+    {"type": "cancel"},
+    {"type": "credit", "id": [1], "n": 5},
+    {"type": "credit", "id": "t", "n": 0},
+    {"type": "chat", "id": [1], "message": "hi"},
+])
+def test_malformed_stream_frame_keeps_connection(client, auth_headers, ws_url, frame):
+    with client.websocket_connect(ws_url, headers=auth_headers) as ws:
+        assert ws.receive_json()["type"] == "ready"
+        ws.send_json(frame)
+        error = ws.receive_json()
+        assert error["type"] == "error" and error["status"] == 422
+        ws.send_json({"type": "ping"})
+        assert ws.receive_json() == {"type": "pong"}
+
+
+def test_unknown_stream_credit(client, auth_headers, ws_url):
+    with client.websocket_connect(ws_url, headers=auth_headers) as ws:
+        ws.receive_json()
+        ws.send_json({"type": "credit", "id": "nope", "n": 1})
+        assert ws.receive_json() == {"type": "error", "id": "nope", "status": 400,
+                                     "detail": "Unknown stream or invalid credit"}
+        ws.send_json({"type": "cancel", "id": "nope"})
+        ws.send_json({"type": "ping"})
+        assert ws.receive_json() == {"type": "pong"}
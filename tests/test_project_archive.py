@@ -0,0 +1,44 @@
+# ---------------------------
+# File: tests/test_project_archive.py
+# ---------------------------
+
+import io
+import json
+import tarfile
+
+import pytest
+
+
+def archive(project: dict) -> bytes:
+    """An archive holding only project.json."""
+    body = json.dumps({"format": 1, **project}).encode()
+    out = io.BytesIO()
+    with tarfile.open(fileobj=out, mode="w", format=tarfile.USTAR_FORMAT) as tar:
+        info = tarfile.TarInfo("project.json")
+        info.size = len(body)
+        tar.addfile(info, io.BytesIO(body))
+    return out.getvalue()
+
+
+def test_import_roundtrip(client, auth_headers):
+    project = client.post("/projects/", json={"name": "src", "temperature": 0.5, "max_tokens": 300},
+                          headers=auth_headers).json()
+    client.post("/prompts/", json={"text": "be brief", "project_id": project["id"]}, headers=auth_headers)
+    exported = client.get(f"/projects/{project['id']}/export", headers=auth_headers).content
+
+    response = client.post("/projects/import", content=exported, headers=auth_headers)
+    assert response.status_code == 201
+    assert response.json()["prompts"] == 1
+    assert response.json()["project"]["temperature"] == 0.5
+
+
+@pytest.mark.parametrize("settings", [
+    {"temperature": 7},
+    {"temperature": "hot"},
+    {"max_tokens": 0},
+    {"max_tokens": 10**9},
+    {"model": ["a", "b"]},
+])
+def test_import_rejects_out_of_range_settings(client, auth_headers, settings):
+    response = client.post("/projects/import", content=archive({"name": "bad", **settings}), headers=auth_headers)
+    assert response.status_code == 400
@@ -0,0 +1,39 @@
+# ---------------------------
+# File: tests/test_prompts.py
+# ---------------------------
+
+import pytest
+
+
+@pytest.fixture
+def prompt(client, auth_headers):
+    project = client.post("/projects/", json={"name": "p"}, headers=auth_headers).json()
+    return client.post("/prompts/", json={"text": "hello", "project_id": project["id"]}, headers=auth_headers).json()
+
+
+@pytest.mark.parametrize("field", ["text", "project_id"])
+def test_bulk_update_rejects_null(client, auth_headers, prompt, field):
+    response = client.put("/prompts/bulk", json={"prompts": [{"id": prompt["id"], field: None}]},
+                           headers=auth_headers)
+    assert response.status_code == 422
+
+    # The prompt is untouched
+    listed = client.get("/prompts/", params={"project_id": prompt["project_id"]}, headers=auth_headers).json()
+    assert [(p["id"], p["text"]) for p in listed] == [(prompt["id"], "hello")]
+
+
+def test_bulk_update_leaves_omitted_fields(client, auth_headers, prompt):
+    response = client.put("/prompts/bulk", json={"prompts": [{"id": prompt["id"], "text": "changed"}]},
+                           headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()[0]["text"] == "changed"
+    assert response.json()[0]["project_id"] == prompt["project_id"]
+
+
+def test_bulk_create_returns_prompts_in_request_order(client, auth_headers):
+    project = client.post("/projects/", json={"name": "p"}, headers=auth_headers).json()
+    texts = [f"prompt {i}" for i in range(20)]
+    response = client.post("/prompts/bulk", json={"prompts": [{"text": t, "project_id": project["id"]} for t in texts]},
+                           headers=auth_headers)
+    assert response.status_code == 200
+    assert [p["text"] for p in response.json()] == texts
@@ -0,0 +1,66 @@
+# ---------------------------
+# File: tests/test_semantic_cache.py
+# ---------------------------
+
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from services.semantic_cache import SemanticCache
+
+PROJECT = SimpleNamespace(id=1, prompt_version=0, created_at=datetime(2024, 1, 1))
+
+
+def payload(message: str) -> dict:
+    return {"model": "m", "max_tokens": 100, "messages": [{"role": "user", "content": message}]}
+
+
+def cached_reply(first: str, second: str) -> str | None:
+    """Store an answer to `first`, then look up `second` at the default threshold."""
+    async def run():
+        cache = SemanticCache()
+        reply, vector = await cache.lookup(PROJECT, payload(first))
+        assert reply is None
+        await cache.store(PROJECT, payload(first), vector, "answer")
+        reply, _ = await cache.lookup(PROJECT, payload(second))
+        return reply
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("first, second", [
+    ("Is smoking allowed in the room?", "is smoking allowed in the room"),
+    ("What is your refund policy?", "What's your refund policy?"),
+    ("How do I reset my password?", "How can I reset my password?"),
+    ("Can you tell me the opening hours?", "Hi, could you please tell me the opening hours"),
+    ("Why can't I log in?", "Why cannot I log in?"),
+])
+def test_paraphrase_hits(first, second):
+    assert cached_reply(first, second) == "answer"
+
+
+@pytest.mark.parametrize("first, second", [
+    ("Is smoking allowed in the room?", "Is smoking not allowed in the room?"),
+    ("Can I bring my dog to the hotel?", "Why can't I bring my dog to the hotel?"),
+    ("What is the refund policy?", "Why is the refund policy?"),
+    ("How do I configure the proxy server for the staging environment when deploying on weekends?",
+     "How do I not configure the proxy server for the staging environment when deploying on weekends?"),
+])
+def test_negation_and_question_word_miss(first, second):
+    assert cached_reply(first, second) is None
+
+
+@pytest.mark.parametrize("first, second", [
+    ("Please delete my account and all of my data from your servers today",
+     "Please export my account and all of my data from your servers today"),
+    ("Do you have a room for two adults and one child next weekend?",
+     "Do you have a room for four adults and one child next weekend?"),
+    ("How do I cancel my booking 2 days before arrival?", "How do I cancel my booking 3 days before arrival?"),
+    ("Convert 100 dollars to euros", "Convert 100 euros to dollars"),
+    ("What was the refund policy?", "What is the refund policy?"),
+    ("How do I reset my password?", "How do I reset my PIN?"),
+])
+def test_changed_verb_number_or_order_miss(first, second):
+    assert cached_reply(first, second) is None
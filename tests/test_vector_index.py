@@ -0,0 +1,36 @@
+# ---------------------------
+# File: tests/test_vector_index.py
+# ---------------------------
+
+import numpy as np
+
+from services import vector_index
+
+
+def test_append_after_interrupted_write_stays_aligned(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_index, "INDEX_DIR", str(tmp_path))
+    rows = np.eye(4, dtype=np.float32)
+    index = vector_index.ProjectIndex(1, 4)
+    index.add([1, 2], rows[:2])
+
+    # A writer died after the vectors of chunk 3 but before its id
+    with open(index._vectors_path, "ab") as f:
+        f.write(rows[2].tobytes())
+
+    index.add([4], rows[3:])
+    assert len(index) == 3
+    assert index.search(rows[3], 1) == [(4, 1.0)]
+    assert index.search(rows[1], 1) == [(2, 1.0)]
+
+
+def test_remove_compacts_both_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_index, "INDEX_DIR", str(tmp_path))
+    rows = np.eye(4, dtype=np.float32)
+    index = vector_index.ProjectIndex(1, 4)
+    index.add([1, 2, 3, 4], rows)
+    assert index.search(rows[2], 1) == [(3, 1.0)]  # Mapped before the compaction
+
+    index.remove([1, 3])
+    assert len(index) == 2
+    assert index.contains([1, 2, 3, 4]).tolist() == [False, True, False, True]
+    assert index.search(rows[3], 1) == [(4, 1.0)]